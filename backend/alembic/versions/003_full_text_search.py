@@ -0,0 +1,84 @@
+"""Add full-text search indexes for properties
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19
+
+SQLite: FTS5 trigram table (properties_fts) synced by triggers.
+PostgreSQL: generated search_vector tsvector + GIN, pg_trgm GIN on city/location.
+"""
+from alembic import op
+
+
+# revision identifiers
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_COLUMNS = "title, location, area, city, amenities, description"
+NEW_VALUES = "new.title, new.location, new.area, new.city, new.amenities, new.description"
+OLD_VALUES = "old.title, old.location, old.area, old.city, old.amenities, old.description"
+
+
+def upgrade():
+    """Add full-text search structures for the current backend"""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+                {SEARCH_COLUMNS}, content='properties', content_rowid='id', tokenize='trigram'
+            )
+        """)
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS properties_fts_ai AFTER INSERT ON properties BEGIN
+                INSERT INTO properties_fts(rowid, {SEARCH_COLUMNS}) VALUES (new.id, {NEW_VALUES});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS properties_fts_ad AFTER DELETE ON properties BEGIN
+                INSERT INTO properties_fts(properties_fts, rowid, {SEARCH_COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS properties_fts_au AFTER UPDATE OF {SEARCH_COLUMNS} ON properties BEGIN
+                INSERT INTO properties_fts(properties_fts, rowid, {SEARCH_COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES});
+                INSERT INTO properties_fts(rowid, {SEARCH_COLUMNS}) VALUES (new.id, {NEW_VALUES});
+            END
+        """)
+        # Index existing rows
+        op.execute("INSERT INTO properties_fts(properties_fts) VALUES ('rebuild')")
+
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("""
+            ALTER TABLE properties ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(location, '') || ' ' || coalesce(area, '') || ' ' || coalesce(city, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(amenities, '')), 'C') ||
+                setweight(to_tsvector('simple', coalesce(description, '')), 'D')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX IF NOT EXISTS idx_properties_search_vector ON properties USING GIN (search_vector)")
+        op.execute("CREATE INDEX IF NOT EXISTS idx_properties_city_trgm ON properties USING GIN (city gin_trgm_ops)")
+        op.execute("CREATE INDEX IF NOT EXISTS idx_properties_location_trgm ON properties USING GIN (location gin_trgm_ops)")
+
+
+def downgrade():
+    """Remove full-text search structures"""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS properties_fts_ai")
+        op.execute("DROP TRIGGER IF EXISTS properties_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS properties_fts_au")
+        op.execute("DROP TABLE IF EXISTS properties_fts")
+
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS idx_properties_location_trgm")
+        op.execute("DROP INDEX IF EXISTS idx_properties_city_trgm")
+        op.execute("DROP INDEX IF EXISTS idx_properties_search_vector")
+        op.execute("ALTER TABLE properties DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,29 @@
+"""Add public reference to leads
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+
+Buffered lead ingestion returns the reference before the row is written.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add leads.reference with a unique index"""
+    op.add_column('leads', sa.Column('reference', sa.String(32), nullable=True))
+    op.create_index('ix_leads_reference', 'leads', ['reference'], unique=True)
+
+
+def downgrade():
+    """Remove leads.reference"""
+    op.drop_index('ix_leads_reference')
+    op.drop_column('leads', 'reference')
@@ -0,0 +1,30 @@
+"""Add submission counter to leads
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+
+Repeat submissions from the same prospect are merged into one lead.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add leads.submission_count"""
+    op.add_column(
+        'leads',
+        sa.Column('submission_count', sa.Integer(), nullable=False, server_default='1'),
+    )
+
+
+def downgrade():
+    """Remove leads.submission_count"""
+    op.drop_column('leads', 'submission_count')
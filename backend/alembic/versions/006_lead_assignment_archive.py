@@ -0,0 +1,31 @@
+"""Add lead assignment and archival
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+
+Set in bulk through POST /leads/bulk.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add leads.assigned_to and leads.archived_at"""
+    op.add_column('leads', sa.Column('assigned_to', sa.Integer(), sa.ForeignKey('users.id'), nullable=True))
+    op.add_column('leads', sa.Column('archived_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_leads_assigned_to', 'leads', ['assigned_to'])
+
+
+def downgrade():
+    """Remove leads.assigned_to and leads.archived_at"""
+    op.drop_index('ix_leads_assigned_to')
+    op.drop_column('leads', 'archived_at')
+    op.drop_column('leads', 'assigned_to')
@@ -0,0 +1,31 @@
+"""Add lead conversion score
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+
+Maintained in batches by app.services.lead_scoring; GET /leads/?sort=score.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add leads.score and leads.scored_at"""
+    op.add_column('leads', sa.Column('score', sa.Float(), nullable=True))
+    op.add_column('leads', sa.Column('scored_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_leads_score', 'leads', ['score'])
+
+
+def downgrade():
+    """Remove leads.score and leads.scored_at"""
+    op.drop_index('ix_leads_score')
+    op.drop_column('leads', 'scored_at')
+    op.drop_column('leads', 'score')
@@ -0,0 +1,43 @@
+"""Add notification outbox
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+
+New-lead alerts are written here with the lead and sent by the dispatcher.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create notification_outbox"""
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('event', sa.String(50), nullable=False),
+        sa.Column('channel', sa.String(20), nullable=False),
+        sa.Column('lead_reference', sa.String(32), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_notification_outbox_id', 'notification_outbox', ['id'])
+    op.create_index('ix_notification_outbox_lead_reference', 'notification_outbox', ['lead_reference'])
+    op.create_index('idx_outbox_status_due', 'notification_outbox', ['status', 'next_attempt_at'])
+
+
+def downgrade():
+    """Drop notification_outbox"""
+    op.drop_table('notification_outbox')
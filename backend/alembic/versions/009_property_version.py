@@ -0,0 +1,27 @@
+"""Add property version for optimistic concurrency
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19
+
+Bookings and availability flips update properties with WHERE version = :v.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add properties.version"""
+    op.add_column('properties', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    """Remove properties.version"""
+    op.drop_column('properties', 'version')
@@ -0,0 +1,49 @@
+"""Add availability event log and daily snapshots
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19
+
+Availability changes are logged per event and compacted nightly into one
+snapshot row per day. Old events are deleted by created_at range (indexed).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create property_availability_events and daily_availability_snapshot"""
+    op.create_table(
+        'property_availability_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('property_id', sa.Integer(), nullable=False),
+        sa.Column('previous', sa.Boolean(), nullable=True),
+        sa.Column('is_available', sa.Boolean(), nullable=True),
+        sa.Column('reason', sa.String(30), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_property_availability_events_id', 'property_availability_events', ['id'])
+    op.create_index('ix_property_availability_events_property_id', 'property_availability_events', ['property_id'])
+    op.create_index('ix_property_availability_events_created_at', 'property_availability_events', ['created_at'])
+
+    op.create_table(
+        'daily_availability_snapshot',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('total_properties', sa.Integer(), nullable=False),
+        sa.Column('available_properties', sa.Integer(), nullable=False),
+        sa.Column('changes', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    """Drop the availability history tables"""
+    op.drop_table('daily_availability_snapshot')
+    op.drop_table('property_availability_events')
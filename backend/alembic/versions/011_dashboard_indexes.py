@@ -0,0 +1,31 @@
+"""Add covering indexes for the dashboard summary
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19
+
+The dashboard aggregates properties by (type, city) and leads by (status,
+source) in one statement; these indexes let both halves run index-only.
+"""
+from alembic import op
+
+
+# revision identifiers
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create the dashboard covering indexes"""
+    op.create_index(
+        'idx_property_type_city_stats', 'properties', ['property_type', 'city', 'is_available', 'created_at']
+    )
+    op.create_index('idx_lead_status_source_created', 'leads', ['status', 'source', 'created_at'])
+
+
+def downgrade():
+    """Drop the dashboard covering indexes"""
+    op.drop_index('idx_lead_status_source_created', table_name='leads')
+    op.drop_index('idx_property_type_city_stats', table_name='properties')
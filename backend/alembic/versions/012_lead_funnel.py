@@ -0,0 +1,71 @@
+"""Add lead status transitions and the weekly cohort funnel matrix
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19
+
+Status changes are logged with the time spent in the previous status and
+counted into lead_cohort_stages as they happen. Existing leads are
+backfilled as created in their current status (earlier history is unknown).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create lead_status_transitions and lead_cohort_stages, backfill existing leads"""
+    op.add_column('leads', sa.Column('status_changed_at', sa.DateTime(timezone=True), nullable=True))
+
+    op.create_table(
+        'lead_status_transitions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('lead_id', sa.Integer(), sa.ForeignKey('leads.id'), nullable=False),
+        sa.Column('from_status', sa.String(50), nullable=True),
+        sa.Column('to_status', sa.String(50), nullable=False),
+        sa.Column('cohort_week', sa.Date(), nullable=False),
+        sa.Column('seconds_in_previous', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_lead_status_transitions_id', 'lead_status_transitions', ['id'])
+    op.create_index('ix_lead_status_transitions_lead_id', 'lead_status_transitions', ['lead_id'])
+    op.create_index('ix_lead_status_transitions_created_at', 'lead_status_transitions', ['created_at'])
+
+    op.create_table(
+        'lead_cohort_stages',
+        sa.Column('cohort_week', sa.Date(), primary_key=True),
+        sa.Column('stage', sa.String(50), primary_key=True),
+        sa.Column('entered', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('current', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('exited', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('seconds_in_stage', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    # Monday of the (UTC) creation week
+    if op.get_bind().dialect.name == 'postgresql':
+        week = "date_trunc('week', created_at AT TIME ZONE 'UTC')::date"
+    else:
+        week = "date(created_at, 'weekday 0', '-6 days')"
+    op.execute(
+        "INSERT INTO lead_status_transitions (lead_id, from_status, to_status, cohort_week, created_at) "
+        f"SELECT id, NULL, COALESCE(status, 'new'), {week}, created_at FROM leads"
+    )
+    op.execute(
+        "INSERT INTO lead_cohort_stages (cohort_week, stage, entered, current, exited, seconds_in_stage) "
+        "SELECT cohort_week, to_status, COUNT(*), COUNT(*), 0, 0 FROM lead_status_transitions "
+        "GROUP BY cohort_week, to_status"
+    )
+
+
+def downgrade():
+    """Drop the funnel tables and leads.status_changed_at"""
+    op.drop_table('lead_cohort_stages')
+    op.drop_table('lead_status_transitions')
+    op.drop_column('leads', 'status_changed_at')
@@ -0,0 +1,63 @@
+"""Add per-property lead counters for listing performance
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19
+
+property_lead_stats keeps total leads and conversions per property and
+property_lead_daily the same counters per UTC creation day; both are
+updated with every lead write. Existing leads are backfilled.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create property_lead_stats and property_lead_daily, backfill from leads"""
+    op.create_table(
+        'property_lead_stats',
+        sa.Column('property_id', sa.Integer(), sa.ForeignKey('properties.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('total_leads', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('conversions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('idx_property_lead_stats_total', 'property_lead_stats', ['total_leads', 'property_id'])
+
+    op.create_table(
+        'property_lead_daily',
+        sa.Column('property_id', sa.Integer(), sa.ForeignKey('properties.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('leads', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('conversions', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_index(
+        'idx_property_lead_daily_day', 'property_lead_daily', ['day', 'property_id', 'leads', 'conversions']
+    )
+
+    # UTC creation day
+    if op.get_bind().dialect.name == 'postgresql':
+        day = "(created_at AT TIME ZONE 'UTC')::date"
+    else:
+        day = "date(created_at)"
+    op.execute(
+        "INSERT INTO property_lead_daily (property_id, day, leads, conversions) "
+        f"SELECT property_id, {day}, COUNT(*), SUM(CASE WHEN status = 'converted' THEN 1 ELSE 0 END) "
+        f"FROM leads WHERE property_id IS NOT NULL GROUP BY property_id, {day}"
+    )
+    op.execute(
+        "INSERT INTO property_lead_stats (property_id, total_leads, conversions) "
+        "SELECT property_id, SUM(leads), SUM(conversions) FROM property_lead_daily GROUP BY property_id"
+    )
+
+
+def downgrade():
+    """Drop the per-property lead counters"""
+    op.drop_table('property_lead_daily')
+    op.drop_table('property_lead_stats')
@@ -0,0 +1,36 @@
+"""Add HyperLogLog sketches for unique visitor and inquirer counts
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19
+
+One row per key (metric, property or city) per UTC day, holding the
+sketch's registers. Only written when Redis is disabled; with Redis the
+same sketches are PFADD keys.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create hll_sketches"""
+    op.create_table(
+        'hll_sketches',
+        sa.Column('key', sa.String(160), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('registers', sa.LargeBinary(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_hll_sketches_day', 'hll_sketches', ['day'])
+
+
+def downgrade():
+    """Drop hll_sketches"""
+    op.drop_table('hll_sketches')
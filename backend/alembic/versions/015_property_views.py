@@ -0,0 +1,44 @@
+"""Add buffered property view counters
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-19
+
+property_view_stats keeps all-time detail-page views per property and
+property_view_daily the same per UTC day. Views are buffered in process
+and added in one batched upsert per flush, never per request.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create property_view_stats and property_view_daily"""
+    op.create_table(
+        'property_view_stats',
+        sa.Column('property_id', sa.Integer(), sa.ForeignKey('properties.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('views', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('idx_property_view_stats_views', 'property_view_stats', ['views', 'property_id'])
+
+    op.create_table(
+        'property_view_daily',
+        sa.Column('property_id', sa.Integer(), sa.ForeignKey('properties.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('views', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_index('idx_property_view_daily_day', 'property_view_daily', ['day', 'property_id', 'views'])
+
+
+def downgrade():
+    """Drop the property view counters"""
+    op.drop_table('property_view_daily')
+    op.drop_table('property_view_stats')
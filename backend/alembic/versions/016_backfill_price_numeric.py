@@ -0,0 +1,66 @@
+"""Backfill properties.price_numeric from the display price
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-19
+
+Price analytics read price_numeric only, which listings created before it
+was derived on write never had. Rows with a NULL price_numeric get the
+value parsed from price (same rules as crud.parse_display_price, copied
+here so later changes to it don't alter this migration). Downgrade leaves
+the values in place.
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def parse_display_price(price):
+    if not price:
+        return None
+    match = re.search(r"(\d+(?:\.\d+)?)\s*(l|lakh|lac|k)?\b", price.replace(",", "").lower())
+    if not match:
+        return None
+    multiplier = {"k": 1000, "l": 100000, "lakh": 100000, "lac": 100000}.get(match.group(2), 1)
+    return float(match.group(1)) * multiplier
+
+
+def upgrade():
+    """Parse price into price_numeric where it is missing"""
+    conn = op.get_bind()
+    properties = sa.table(
+        'properties',
+        sa.column('id', sa.Integer()),
+        sa.column('price', sa.String()),
+        sa.column('price_numeric', sa.Float()),
+    )
+    rows = conn.execute(
+        sa.select(properties.c.id, properties.c.price)
+        .where(properties.c.price_numeric.is_(None), properties.c.price.isnot(None))
+    ).all()
+    values = [
+        {"property_id": property_id, "value": parse_display_price(price)}
+        for property_id, price in rows
+    ]
+    values = [v for v in values if v["value"] is not None]
+    stmt = (
+        sa.update(properties)
+        .where(properties.c.id == sa.bindparam('property_id'))
+        .values(price_numeric=sa.bindparam('value'))
+    )
+    for start in range(0, len(values), BATCH_SIZE):
+        conn.execute(stmt, values[start:start + BATCH_SIZE])
+
+
+def downgrade():
+    """Nothing to undo (the parsed values are still correct)"""
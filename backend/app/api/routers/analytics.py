@@ -4,19 +4,29 @@ IndoHomz Analytics Router
 Provides dashboard analytics and insights.
 """
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import Optional
-from datetime import datetime, timedelta
+from typing import List, Literal, Optional, Tuple
+from datetime import date, datetime, time, timedelta
 
 from app.database.connection import get_db
-from app.database import models
 from app.services.crud import property_service, lead_service
-from app.core.security import get_current_user
+from app.services.price_analytics import price_histogram
+from app.services.availability_history import availability_trend
+from app.services.dashboard import get_dashboard
+from app.services.lead_funnel import cohort_matrix
+from app.services.lead_analytics import source_performance
+from app.services.live_events import live_events
+from app.services.property_views import property_views, trending_listings, view_conversion
+from app.services.unique_counts import UniqueCountsUnavailable, unique_counter, utc_today
+from app.core.config import settings
+from app.core.security import get_current_user, get_current_user_for_stream
 
 router = APIRouter()
 
+MAX_PRICE_EDGES = 50
+
 
 @router.get("/dashboard")
 async def get_dashboard_analytics(
@@ -27,43 +37,34 @@ async def get_dashboard_analytics(
     Get comprehensive dashboard analytics.
     
     Requires authentication.
-    Returns property stats, lead metrics, and recent activity.
+    Returns property stats, lead metrics, and recent activity, computed in
+    one statement and cached until the next property or lead write.
     """
-    property_stats = property_service.get_property_stats(db)
-    lead_stats = lead_service.get_lead_stats(db)
-    
-    # Recent properties (last 7 days)
-    week_ago = datetime.now() - timedelta(days=7)
-    recent_properties = db.query(func.count(models.Property.id)).filter(
-        models.Property.created_at >= week_ago
-    ).scalar() or 0
-    
-    # Recent leads (last 7 days)
-    recent_leads = db.query(func.count(models.Lead.id)).filter(
-        models.Lead.created_at >= week_ago
-    ).scalar() or 0
+    return get_dashboard(db)
+
+
+@router.get("/stream")
+async def stream_dashboard_events(current_user: dict = Depends(get_current_user_for_stream)):
+    """
+    Live dashboard deltas as Server-Sent Events.
     
-    return {
-        "overview": {
-            "total_properties": property_stats["total_properties"],
-            "available_properties": property_stats["available_properties"],
-            "rented_properties": property_stats["rented_properties"],
-            "total_leads": lead_stats["total_leads"],
-            "conversion_rate": lead_stats["conversion_rate"],
-        },
-        "recent_activity": {
-            "new_properties_this_week": recent_properties,
-            "new_leads_this_week": recent_leads,
-        },
-        "property_breakdown": {
-            "by_type": property_stats["property_types"],
-            "by_location": property_stats["top_locations"],
-        },
-        "lead_breakdown": {
-            "by_status": lead_stats["by_status"],
-            "by_source": lead_stats["by_source"],
-        },
-    }
+    Requires authentication (Authorization header, or ?token= for
+    EventSource). Events: lead.created, lead.status_changed,
+    leads.status_changed, property.created, properties.imported and
+    property.availability_changed, each with a JSON `data` payload. On
+    "ready" and "resync" clients should (re)fetch /dashboard, then apply
+    deltas. Holds no database session while open.
+    """
+    if live_events.full:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live connections, fall back to polling",
+        )
+    return StreamingResponse(
+        live_events.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/properties/overview")
@@ -92,8 +93,29 @@ async def get_lead_analytics(
     return lead_service.get_lead_stats(db)
 
 
+def parse_price_edges(value: Optional[str]) -> Optional[List[float]]:
+    """Parse comma-separated bucket edges (strictly ascending, in ₹)"""
+    if not value:
+        return None
+    try:
+        edges = [float(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="edges must be comma-separated numbers")
+    if not edges or len(edges) > MAX_PRICE_EDGES or any(a >= b for a, b in zip(edges, edges[1:])):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"edges must be 1-{MAX_PRICE_EDGES} strictly ascending amounts",
+        )
+    return edges
+
+
 @router.get("/properties/price-distribution")
 async def get_price_distribution(
+    edges: Optional[str] = Query(None, description="Bucket edges in ₹, comma-separated (e.g. 25000,50000,100000)"),
+    quantiles: Optional[int] = Query(None, ge=2, le=20, description="Auto buckets: this many equal-count buckets"),
+    group_by: Optional[Literal["city", "property_type", "bedrooms"]] = Query(None),
+    city: Optional[str] = Query(None),
+    property_type: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -101,46 +123,21 @@ async def get_price_distribution(
     Get price distribution of properties.
     
     Requires authentication.
-    Returns properties grouped by price ranges.
+    Returns counts per rent bucket (default: under ₹50K ... above ₹3L) with
+    p10/p50/p90, optionally per city, type or bedroom count. Computed in the
+    database from price_numeric; listings without it are counted as unpriced.
     """
-    # Note: This is simplified - in production you'd parse the price string
-    properties = db.query(models.Property).all()
-    
-    price_ranges = {
-        "Under ₹50K": 0,
-        "₹50K - ₹1L": 0,
-        "₹1L - ₹2L": 0,
-        "₹2L - ₹3L": 0,
-        "Above ₹3L": 0,
-    }
-    
-    for prop in properties:
-        try:
-            # Extract numeric value from price string
-            price_str = prop.price.replace('₹', '').replace(',', '').replace('/month', '').strip()
-            if 'L' in price_str:
-                price = float(price_str.replace('L', '')) * 100000
-            elif 'K' in price_str:
-                price = float(price_str.replace('K', '')) * 1000
-            else:
-                price = float(price_str)
-            
-            if price < 50000:
-                price_ranges["Under ₹50K"] += 1
-            elif price < 100000:
-                price_ranges["₹50K - ₹1L"] += 1
-            elif price < 200000:
-                price_ranges["₹1L - ₹2L"] += 1
-            elif price < 300000:
-                price_ranges["₹2L - ₹3L"] += 1
-            else:
-                price_ranges["Above ₹3L"] += 1
-        except (ValueError, AttributeError):
-            continue
-    
-    return {
-        "distribution": [{"range": k, "count": v} for k, v in price_ranges.items()]
-    }
+    price_edges = parse_price_edges(edges)
+    if price_edges and quantiles:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either edges or quantiles")
+    return price_histogram(
+        db,
+        edges=price_edges,
+        quantile_buckets=quantiles,
+        group_by=group_by,
+        city=city,
+        property_type=property_type,
+    )
 
 
 @router.get("/properties/availability-trend")
@@ -153,18 +150,17 @@ async def get_availability_trend(
     Get property availability trend over time.
     
     Requires authentication.
+    Returns one point per day from the nightly snapshots (days before history
+    tracking started are absent), ending with today's live counts.
     """
-    # Simplified - in production you'd track historical availability
-    total = db.query(func.count(models.Property.id)).scalar() or 0
-    available = db.query(func.count(models.Property.id)).filter(
-        models.Property.is_available == True
-    ).scalar() or 0
-    
+    series = availability_trend(db, days)
+    today = series[-1]
     return {
         "period_days": days,
-        "current_availability_rate": round(available / total * 100, 2) if total > 0 else 0,
-        "total_properties": total,
-        "available_properties": available,
+        "current_availability_rate": today["availability_rate"],
+        "total_properties": today["total_properties"],
+        "available_properties": today["available_properties"],
+        "series": series,
     }
 
 
@@ -198,8 +194,28 @@ async def get_conversion_funnel(
     }
 
 
+@router.get("/leads/cohorts")
+async def get_lead_cohorts(
+    weeks: int = Query(12, ge=1, le=104),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get weekly lead cohorts through the funnel.
+    
+    Requires authentication.
+    For each creation week: leads that reached each stage (share of the
+    cohort and of the previous stage), leads in it now, and average days
+    spent in it. Read from a matrix updated on every status change.
+    """
+    return cohort_matrix(db, weeks)
+
+
 @router.get("/leads/source-performance")
 async def get_source_performance(
+    start_date: Optional[date] = Query(None, description="Leads created on or after this day"),
+    end_date: Optional[date] = Query(None, description="Leads created on or before this day"),
+    property_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -207,24 +223,131 @@ async def get_source_performance(
     Get lead source performance metrics.
     
     Requires authentication.
+    Per source: leads, conversions, conversion rate and median days from
+    inquiry to conversion. Cached per filter set until the next lead write.
     """
-    stats = lead_service.get_lead_stats(db)
+    return source_performance(db, {
+        "created_after": datetime.combine(start_date, time.min) if start_date else None,
+        "created_before": datetime.combine(end_date + timedelta(days=1), time.min) if end_date else None,
+        "property_id": property_id,
+    })
+
+
+def _day_window(start_date: Optional[date], end_date: Optional[date], max_days: int) -> Tuple[date, date]:
+    """Inclusive UTC day window, default the 30 days ending today; 400 if reversed or too long"""
+    end = end_date or utc_today()
+    start = start_date or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start_date is after end_date")
+    if (end - start).days + 1 > max_days:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Window is limited to {max_days} days")
+    return start, end
+
+
+@router.get("/unique-counts")
+async def get_unique_counts(
+    property_id: Optional[int] = Query(None),
+    city: Optional[str] = Query(None),
+    start_date: Optional[date] = Query(None, description="First day (UTC), default 29 days before end_date"),
+    end_date: Optional[date] = Query(None, description="Last day (UTC), default today"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get approximate unique visitors and inquirers for a property or a city.
     
-    # Calculate conversion rate by source (simplified)
-    source_data = []
-    for source in stats["by_source"]:
-        source_data.append({
-            "source": source["source"].replace("_", " ").title(),
-            "leads": source["count"],
-            "percentage": round(source["count"] / stats["total_leads"] * 100, 1) if stats["total_leads"] > 0 else 0
-        })
+    Requires authentication.
+    Distinct detail-page visitors and lead phone numbers between start_date
+    and end_date (inclusive), from per-day HyperLogLog sketches merged over
+    the window: constant memory per property and day, and a query cost that
+    grows with the days in the window, not the traffic.
+    """
+    if (property_id is None) == (city is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Pass either property_id or city")
+    start, end = _day_window(start_date, end_date, settings.UNIQUE_COUNTS_MAX_WINDOW_DAYS)
     
+    scope, ident = ("property", property_id) if property_id is not None else ("city", city)
+    try:
+        counts = unique_counter.window(db, scope, ident, start, end)
+    except UniqueCountsUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Unique counts are temporarily unavailable",
+            headers={"Retry-After": "5"},
+        )
     return {
-        "sources": source_data,
-        "total_leads": stats["total_leads"],
+        "scope": scope,
+        "id": ident,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        **counts,
+    }
+
+
+@router.get("/properties/views")
+async def get_property_views(
+    property_id: int = Query(...),
+    start_date: Optional[date] = Query(None, description="First day (UTC), default 29 days before end_date"),
+    end_date: Optional[date] = Query(None, description="Last day (UTC), default today"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get detail-page views of a property.
+    
+    Requires authentication.
+    All-time views plus views per UTC day in the window. Views are buffered
+    and flushed every few seconds, so the latest ones may not show yet.
+    """
+    start, end = _day_window(start_date, end_date, settings.PROPERTY_VIEW_MAX_WINDOW_DAYS)
+    return {
+        "property_id": property_id,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        **property_views(db, property_id, start, end),
     }
 
 
+@router.get("/properties/view-conversion")
+async def get_view_conversion(
+    start_date: Optional[date] = Query(None, description="First day (UTC), default 29 days before end_date"),
+    end_date: Optional[date] = Query(None, description="Last day (UTC), default today"),
+    limit: int = Query(10, ge=1, le=100),
+    min_views: int = Query(1, ge=1, description="Skip properties with fewer views in the window"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get view-to-lead conversion of the most viewed properties.
+    
+    Requires authentication.
+    Views and leads created over the same window, and leads per 100 views.
+    """
+    start, end = _day_window(start_date, end_date, settings.PROPERTY_VIEW_MAX_WINDOW_DAYS)
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "properties": view_conversion(db, start, end, limit=limit, min_views=min_views),
+    }
+
+
+@router.get("/properties/trending")
+async def get_trending_properties(
+    days: int = Query(7, ge=1, le=90),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get trending properties.
+    
+    Requires authentication.
+    Properties whose views over the last `days` days grew the most over the
+    `days` days before; growth is a percentage (null if new this period).
+    """
+    return {"days": days, "properties": trending_listings(db, days=days, limit=limit)}
+
+
 # Legacy endpoints for backward compatibility
 @router.get("/sales-overview")
 async def legacy_sales_overview(db: Session = Depends(get_db)):
@@ -0,0 +1,101 @@
+"""
+IndoHomz Bookings Router
+
+Handles booking endpoints. Overlapping stays and lost optimistic-concurrency
+races on the property version both come back as 409 Conflict.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database.connection import get_db
+from app.schemas.schemas import Booking, BookingCreate, BookingUpdate
+from app.services.crud import booking_service
+from app.services.booking_calendar import BookingConflictError, PropertyVersionConflict
+from app.core.security import get_current_user
+
+router = APIRouter()
+
+
+def conflict(error: Exception) -> HTTPException:
+    """409 for an overlap or a property changed underneath the request"""
+    headers = {"Retry-After": "1"} if isinstance(error, PropertyVersionConflict) else None
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error), headers=headers)
+
+
+@router.get("/", response_model=List[Booking])
+async def get_bookings(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """List bookings, newest first. Requires authentication."""
+    return booking_service.get_bookings(db=db, skip=skip, limit=limit, status=status_filter)
+
+
+@router.get("/{booking_id}", response_model=Booking)
+async def get_booking(
+    booking_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a single booking. Requires authentication."""
+    booking = booking_service.get_booking(db=db, booking_id=booking_id)
+    if not booking:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
+    return booking
+
+
+@router.post("/", response_model=Booking, status_code=status.HTTP_201_CREATED)
+async def create_booking(
+    booking_data: BookingCreate,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Book a property and mark it unavailable.
+
+    409 if the stay overlaps an active booking or concurrent bookings for
+    the same property kept winning the race (retry after a moment).
+    Retries with the same Idempotency-Key replay the original booking.
+    """
+    try:
+        booking = booking_service.create_booking(db=db, booking_data=booking_data)
+    except (BookingConflictError, PropertyVersionConflict) as e:
+        raise conflict(e)
+    if booking is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Property not found")
+    return booking
+
+
+@router.put("/{booking_id}", response_model=Booking)
+async def update_booking(
+    booking_id: int,
+    booking_update: BookingUpdate,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Update a booking (dates are re-checked for overlaps). Requires authentication."""
+    try:
+        booking = booking_service.update_booking(db=db, booking_id=booking_id, booking_update=booking_update)
+    except (BookingConflictError, PropertyVersionConflict) as e:
+        raise conflict(e)
+    if not booking:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
+    return booking
+
+
+@router.post("/{booking_id}/cancel", response_model=Booking)
+async def cancel_booking(
+    booking_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Cancel a booking and make the property available again. Requires authentication."""
+    booking = booking_service.cancel_booking(db=db, booking_id=booking_id)
+    if not booking:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
+    return booking
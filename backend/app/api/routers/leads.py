@@ -5,14 +5,33 @@ Handles all lead/inquiry endpoints with rate limiting and spam protection.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
+import uuid
 
+from app.core.config import settings
+from app.database import models
 from app.database.connection import get_db
-from app.schemas.schemas import Lead, LeadCreate, LeadUpdate
-from app.services.crud import lead_service
+from app.schemas.schemas import (
+    Lead,
+    LeadAccepted,
+    LeadCreate,
+    LeadUpdate,
+    LeadBulkUpdateRequest,
+    LeadBulkUpdateResponse,
+)
+from app.services.crud import lead_service, lead_filter_clauses
+from app.services.export_service import export_media, lead_export_statement, stream_export
+from app.services.lead_ingestion import lead_ingestion, LeadQueueFull
+from app.services.lead_dedupe import lead_deduplicator
+from app.services.lead_scoring import lead_scorer
+from app.services.lead_velocity import lead_velocity, ALLOW, REJECT, VelocityVerdict
+from app.services.notifications import notification_dispatcher
+from app.services.unique_counts import unique_counter
 from app.core.rate_limit import rate_limit_lead_submission, rate_limit_moderate
-from app.core.security import require_recaptcha, validate_phone_number, normalize_phone_number, sanitize_html, get_current_user
+from app.core.security import require_recaptcha, validate_phone_number, normalize_phone_number, sanitize_html, get_current_user, get_current_admin
 
 router = APIRouter()
 
@@ -27,6 +46,8 @@ async def get_leads(
     limit: int = Query(50, ge=1, le=100),
     status: Optional[str] = Query(None, description="Filter by status (new, contacted, site_visit, etc.)"),
     source: Optional[str] = Query(None, description="Filter by source (website, whatsapp, referral)"),
+    include_archived: bool = Query(False, description="Include archived leads"),
+    sort: Literal["created_at", "score"] = Query("created_at", description="created_at (newest first) or score (best first)"),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -41,9 +62,54 @@ async def get_leads(
         limit=limit,
         status=status,
         source=source,
+        include_archived=include_archived,
+        sort=sort,
     )
 
 
+@router.get("/export")
+async def export_leads(
+    format: Literal["csv", "ndjson"] = Query("csv", description="csv or ndjson"),
+    gzip: bool = Query(False, description="gzip-compress the download"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    source: Optional[str] = Query(None, description="Filter by source"),
+    include_archived: bool = Query(False, description="Include archived leads"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream every matching lead as CSV or NDJSON.
+    
+    Requires authentication. Rows are read through a server-side cursor on one
+    connection, so exports of any size use constant memory.
+    """
+    filters = {"status": status, "source": source}
+    if not include_archived:
+        filters["archived"] = False
+    stmt = lead_export_statement(lead_filter_clauses(filters))
+    
+    media_type, headers = export_media("leads", format, gzip)
+    return StreamingResponse(
+        stream_export(db.get_bind(), stmt, format, gzip=gzip),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@router.get("/quarantine")
+async def get_quarantined_submissions(
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Recent submissions held back by spam scoring (newest first).
+    
+    Requires authentication. Each entry has the submitted lead, its score and
+    the window counts per dimension that produced it.
+    """
+    return await lead_velocity.quarantined(limit)
+
+
 @router.get("/property/{property_id}", response_model=List[Lead])
 async def get_leads_by_property(
     property_id: int,
@@ -62,6 +128,26 @@ async def get_leads_by_property(
 # SINGLE LEAD
 # =============================================================================
 
+@router.get("/reference/{reference}", response_model=Lead)
+async def get_lead_by_reference(
+    reference: str,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get a lead by the reference returned at submission.
+    
+    Requires authentication. Buffered submissions appear once their batch is written.
+    """
+    lead = lead_service.get_lead_by_reference(db=db, reference=reference)
+    if not lead:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Lead not found"
+        )
+    return lead
+
+
 @router.get("/{lead_id}", response_model=Lead)
 async def get_lead(
     lead_id: int,
@@ -86,7 +172,94 @@ async def get_lead(
 # CREATE & UPDATE
 # =============================================================================
 
-@router.post("/", response_model=Lead, status_code=status.HTTP_201_CREATED)
+def buffered_ingestion_enabled() -> bool:
+    """True when leads should go through the ingestion queue instead of a direct commit"""
+    return settings.LEAD_INGESTION_MODE == "buffered" and lead_ingestion.running
+
+
+async def screen_lead(lead_data: LeadCreate, verdict: VelocityVerdict, reference: str) -> Optional[LeadAccepted]:
+    """
+    Hold a submission about to become a new lead to its velocity verdict.
+    
+    Raises 429 when rejected; returns a receipt when quarantined (no lead is
+    stored), None when allowed.
+    """
+    if verdict.action == ALLOW:
+        return None
+    await lead_deduplicator.release(lead_data.phone, lead_data.property_id, reference)
+    if verdict.action == REJECT:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many inquiries. Please try again later.",
+            headers={"Retry-After": str(lead_velocity.window_seconds)},
+        )
+    # Looks like any queued submission to the sender; no lead, no alerts
+    await lead_velocity.quarantine(lead_data, verdict, reference)
+    return LeadAccepted(reference=reference)
+
+
+async def store_lead(lead_data: LeadCreate, db: Session) -> Union[models.Lead, LeadAccepted]:
+    """
+    Store a validated lead, merging repeats from the same prospect.
+    
+    Returns the Lead row (sync mode) or a LeadAccepted receipt (buffered mode,
+    or a quarantined submission). A full ingestion queue maps to 503 so clients
+    back off; submissions scoring as spam get 429.
+    """
+    reference = uuid.uuid4().hex
+    existing = await lead_deduplicator.claim(lead_data.phone, lead_data.property_id, reference)
+    
+    # Every submission is counted before any DB write; a repeat merges into its
+    # lead whatever the verdict, only new leads are held to it
+    verdict = await lead_velocity.check(lead_data, repeat=bool(existing))
+    if not existing:
+        screened = await screen_lead(lead_data, verdict, reference)
+        if screened is not None:
+            return screened
+    
+    if buffered_ingestion_enabled():
+        try:
+            if existing:
+                await lead_ingestion.submit_merge(existing, lead_data, insert_if_missing=verdict.action == ALLOW)
+            else:
+                await lead_ingestion.submit(lead_data, reference=reference)
+        except LeadQueueFull:
+            if not existing:
+                # Nothing was queued under our claim; let the retry start a new lead
+                await lead_deduplicator.release(lead_data.phone, lead_data.property_id, reference)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="We're receiving a lot of inquiries right now. Please try again shortly.",
+                headers={"Retry-After": "5"},
+            )
+        # Unique inquirers per property / city, once accepted (repeats count once)
+        unique_counter.record_inquiry(lead_data.property_id, lead_data.phone)
+        if existing:
+            return LeadAccepted(reference=existing, status="merged")
+        return LeadAccepted(reference=reference)
+    
+    if existing:
+        if lead_service.merge_duplicate_lead(db=db, reference=existing, message=lead_data.message):
+            unique_counter.record_inquiry(lead_data.property_id, lead_data.phone)
+            return lead_service.get_lead_by_reference(db=db, reference=existing)
+        # The earlier lead is gone; start a new one for this prospect, scored like any new lead
+        await lead_deduplicator.register(lead_data.phone, lead_data.property_id, reference)
+        screened = await screen_lead(lead_data, verdict, reference)
+        if screened is not None:
+            return screened
+    
+    lead = lead_service.create_lead(db=db, lead_data=lead_data, reference=reference)
+    unique_counter.record_inquiry(lead_data.property_id, lead_data.phone)
+    notification_dispatcher.wake()  # alerts are already in the outbox; send them now
+    return lead
+
+
+@router.post(
+    "/",
+    response_model=Lead,
+    status_code=status.HTTP_201_CREATED,
+    responses={202: {"model": LeadAccepted, "description": "Queued (buffered ingestion mode)"}},
+)
 async def create_lead(
     lead_data: LeadCreate,
     request: Request,
@@ -97,6 +270,9 @@ async def create_lead(
     Create a new lead/inquiry with rate limiting and spam protection.
     
     Rate limit: 5 submissions per hour per IP address.
+    Repeat submissions (same phone + property within LEAD_DEDUPE_WINDOW_SECONDS)
+    are merged into the existing lead. Retries carrying the same Idempotency-Key
+    replay the first response instead of re-running the request.
     """
     # Validate phone number
     if lead_data.phone and not validate_phone_number(lead_data.phone):
@@ -115,7 +291,10 @@ async def create_lead(
     if lead_data.message:
         lead_data.message = sanitize_html(lead_data.message)
     
-    return lead_service.create_lead(db=db, lead_data=lead_data)
+    lead = await store_lead(lead_data, db)
+    if isinstance(lead, LeadAccepted):
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=lead.model_dump())
+    return lead
 
 
 @router.post("/inquiry")
@@ -164,12 +343,23 @@ async def submit_inquiry(
         source=source
     )
     
-    lead = lead_service.create_lead(db=db, lead_data=lead_data)
+    lead = await store_lead(lead_data, db)
+    if isinstance(lead, LeadAccepted):
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={
+                "success": True,
+                "message": "Thank you! We'll contact you shortly.",
+                "lead_id": None,
+                "reference": lead.reference,
+            },
+        )
     
     return {
         "success": True,
         "message": "Thank you! We'll contact you shortly.",
-        "lead_id": lead.id
+        "lead_id": lead.id,
+        "reference": lead.reference,
     }
 
 
@@ -228,6 +418,81 @@ async def update_lead_status(
     return {"message": f"Lead status updated to {new_status}", "lead_id": lead_id}
 
 
+@router.post("/bulk", response_model=LeadBulkUpdateResponse)
+async def bulk_update_leads(
+    bulk: LeadBulkUpdateRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Apply status/source/assignment/archive changes to many leads at once.
+    
+    Requires authentication.
+    Target either `ids` (per-id outcome: updated or not_found) or a `filter`
+    (every matching lead). Runs as a single UPDATE statement.
+    """
+    if (bulk.ids is None) == (bulk.filter is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of 'ids' or 'filter'"
+        )
+    
+    changes = bulk.changes.model_dump(exclude_unset=True)
+    changes = {k: v for k, v in changes.items() if v is not None or k == "assigned_to"}
+    if not changes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No changes given"
+        )
+    
+    filters = bulk.filter.model_dump(exclude_none=True) if bulk.filter else None
+    if filters == {}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Filter must have at least one condition"
+        )
+    
+    if changes.get("assigned_to") is not None and not db.get(models.User, changes["assigned_to"]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"User {changes['assigned_to']} not found"
+        )
+    
+    updated_ids = lead_service.bulk_update_leads(db=db, changes=changes, ids=bulk.ids, filters=filters)
+    
+    updated = set(updated_ids)
+    if bulk.ids is not None:
+        # Keep request order, drop repeated ids
+        targets = list(dict.fromkeys(bulk.ids))
+        results = [
+            {"id": lead_id, "outcome": "updated" if lead_id in updated else "not_found"}
+            for lead_id in targets
+        ]
+    else:
+        results = [{"id": lead_id, "outcome": "updated"} for lead_id in sorted(updated)]
+    
+    return {
+        "updated": len(updated),
+        "not_found": len(results) - len(updated),
+        "results": results,
+    }
+
+
+@router.post("/rescore")
+async def rescore_leads(
+    full: bool = Query(False, description="Rescore every lead, not just new/changed ones"),
+    db: Session = Depends(get_db),
+    admin_user: dict = Depends(get_current_admin)
+):
+    """
+    Recompute conversion scores used by GET /leads/?sort=score.
+    
+    Requires admin role. Incremental by default; run with full=true
+    periodically so time-based signals (response time, visit date) stay fresh.
+    """
+    return await run_in_threadpool(lead_scorer.rescore, db, full)
+
+
 # =============================================================================
 # STATISTICS
 # =============================================================================
@@ -4,32 +4,60 @@ IndoHomz Properties Router
 Handles all property listing endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional, Union, Iterator, Tuple, IO
 from math import ceil
+from datetime import date
+import csv
+import io
+import json
+import tempfile
 
 from app.database.connection import get_db
 from app.schemas.schemas import (
     Property, 
     PropertyCreate, 
     PropertyUpdate, 
+    PropertyCard,
+    PropertyView,
     PropertyListResponse,
+    PropertyCardListResponse,
+    PropertyListResult,
     PropertySearchRequest,
     PropertySearchResponse,
+    PropertyCardSearchResponse,
+    PropertySearchResult,
+    PropertyBulkImportResponse,
 )
-from app.services.crud import property_service
+from app.services.crud import property_service, build_property_filter_params, PROPERTY_LIST_FILTERS
+from app.services.export_service import export_media, property_export_statement, stream_export
+from app.services.booking_calendar import parse_date_range, PropertyVersionConflict
+from app.services.property_views import view_counter
+from app.services.unique_counts import unique_counter, visitor_id
 from app.core.config import settings
 from app.core.security import get_current_user, get_current_admin
 
 router = APIRouter()
 
 
+def parse_available_between(value: Optional[str]) -> Optional[Tuple[date, date]]:
+    """Parse the available_between filter, mapping bad input to 400"""
+    if not value:
+        return None
+    try:
+        return parse_date_range(value)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 # =============================================================================
 # LIST & SEARCH
 # =============================================================================
 
-@router.get("/", response_model=PropertyListResponse)
+@router.get("/", response_model=PropertyListResult)
 async def get_properties(
     skip: int = Query(0, ge=0, description="Number of properties to skip"),
     limit: int = Query(
@@ -43,13 +71,19 @@ async def get_properties(
     location: Optional[str] = Query(None, description="Search in location"),
     property_type: Optional[str] = Query(None, description="Filter by property type"),
     bedrooms: Optional[int] = Query(None, ge=0, description="Minimum bedrooms"),
+    available_between: Optional[str] = Query(
+        None, description="Free on every day of start,end (YYYY-MM-DD,YYYY-MM-DD)"
+    ),
+    view: PropertyView = Query(PropertyView.CARD, description="card (grid projection) or full"),
     db: Session = Depends(get_db)
 ):
     """
     Get all properties with optional filters.
     
     Returns a paginated list with total count for proper pagination UI.
+    Defaults to the lightweight card projection; pass view=full for every column.
     """
+    date_range = parse_available_between(available_between)
     properties, total = property_service.get_properties(
         db=db,
         skip=skip,
@@ -59,9 +93,12 @@ async def get_properties(
         location=location,
         property_type=property_type,
         min_bedrooms=bedrooms,
+        available_between=date_range,
+        view=view.value,
     )
     
-    return PropertyListResponse(
+    response_cls = PropertyCardListResponse if view == PropertyView.CARD else PropertyListResponse
+    return response_cls(
         items=properties,
         total=total,
         skip=skip,
@@ -70,9 +107,14 @@ async def get_properties(
     )
 
 
-@router.get("/featured", response_model=List[Property])
+@router.get(
+    "/featured",
+    response_model=None,
+    responses={200: {"model": Union[List[PropertyCard], List[Property]]}},
+)
 async def get_featured_properties(
     limit: int = Query(6, ge=1, le=12, description="Number of featured properties"),
+    view: PropertyView = Query(PropertyView.CARD, description="card (grid projection) or full"),
     db: Session = Depends(get_db)
 ):
     """
@@ -80,7 +122,9 @@ async def get_featured_properties(
     
     Returns the newest available properties.
     """
-    return property_service.get_featured_properties(db=db, limit=limit)
+    properties = property_service.get_featured_properties(db=db, limit=limit, view=view.value)
+    schema = PropertyCard if view == PropertyView.CARD else Property
+    return [schema.model_validate(p) for p in properties]
 
 
 @router.get("/available", response_model=List[Property])
@@ -95,7 +139,34 @@ async def get_available_properties(
     return property_service.get_available_properties(db=db, skip=skip, limit=limit)
 
 
-@router.post("/search", response_model=PropertySearchResponse)
+@router.get("/export")
+async def export_properties(
+    format: Literal["csv", "ndjson"] = Query("csv", description="csv or ndjson"),
+    gzip: bool = Query(False, description="gzip-compress the download"),
+    is_available: Optional[bool] = Query(None, description="Filter by availability"),
+    city: Optional[str] = Query(None, description="Filter by city"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream every matching property (all columns) as CSV or NDJSON.
+    
+    Requires authentication. Rows are read through a server-side cursor on one
+    connection, so exports of any size use constant memory.
+    """
+    params = build_property_filter_params(is_available=is_available, city=city)
+    conditions = [PROPERTY_LIST_FILTERS[name]() for name in sorted(params)]
+    stmt = property_export_statement(conditions).params(**params)
+    
+    media_type, headers = export_media("properties", format, gzip)
+    return StreamingResponse(
+        stream_export(db.get_bind(), stmt, format, gzip=gzip),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@router.post("/search", response_model=PropertySearchResult)
 async def search_properties(
     search: PropertySearchRequest,
     db: Session = Depends(get_db)
@@ -114,6 +185,9 @@ async def search_properties(
         filters["bedrooms"] = search.bedrooms
     if search.is_available is not None:
         filters["is_available"] = search.is_available
+    date_range = parse_available_between(search.available_between)
+    if date_range:
+        filters["available_between"] = search.available_between
     
     properties = property_service.search_properties(
         db=db,
@@ -121,6 +195,8 @@ async def search_properties(
         filters=filters,
         skip=(search.page - 1) * search.page_size,
         limit=search.page_size,
+        view=search.view.value,
+        available_between=date_range,
     )
     
     # Get total count for pagination
@@ -128,9 +204,11 @@ async def search_properties(
         db=db,
         is_available=search.is_available,
         city=search.city,
+        available_between=date_range,
     )
     
-    return PropertySearchResponse(
+    response_cls = PropertyCardSearchResponse if search.view == PropertyView.CARD else PropertySearchResponse
+    return response_cls(
         items=properties,
         total=total,
         page=search.page,
@@ -147,10 +225,11 @@ async def search_properties(
 @router.get("/{property_id}", response_model=Property)
 async def get_property(
     property_id: int,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
-    Get a single property by ID.
+    Get a single property by ID (counted as a visit).
     """
     property_obj = property_service.get_property(db=db, property_id=property_id)
     if not property_obj:
@@ -158,16 +237,19 @@ async def get_property(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Property not found"
         )
+    view_counter.record(property_obj.id)
+    unique_counter.record_visit(property_obj, visitor_id(request))
     return property_obj
 
 
 @router.get("/slug/{slug}", response_model=Property)
 async def get_property_by_slug(
     slug: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
-    Get a property by its URL-friendly slug.
+    Get a property by its URL-friendly slug (counted as a visit).
     """
     property_obj = property_service.get_property_by_slug(db=db, slug=slug)
     if not property_obj:
@@ -175,6 +257,8 @@ async def get_property_by_slug(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Property not found"
         )
+    view_counter.record(property_obj.id)
+    unique_counter.record_visit(property_obj, visitor_id(request))
     return property_obj
 
 
@@ -191,11 +275,89 @@ async def create_property(
     """
     Create a new property listing.
     
-    Requires authentication.
+    Requires authentication. Send an Idempotency-Key header to make retries safe.
     """
     return property_service.create_property(db=db, property_data=property_data)
 
 
+# Uploads larger than this spill from memory to a temp file while streaming in
+BULK_IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+def _iter_csv_rows(stream: IO[str]) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (row_number, row, parse_error) for each CSV record"""
+    reader = csv.DictReader(stream)
+    row_number = 0
+    while True:
+        row_number += 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield row_number, None, f"Invalid CSV: {e}"
+            continue
+        yield row_number, row, None
+
+
+def _iter_ndjson_rows(stream: IO[str]) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (row_number, row, parse_error) for each non-blank NDJSON line"""
+    row_number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, "Invalid JSON: expected an object per line"
+            continue
+        yield row_number, row, None
+
+
+@router.post("/bulk", response_model=PropertyBulkImportResponse)
+async def bulk_import_properties(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="csv or ndjson (defaults from Content-Type)"),
+    db: Session = Depends(get_db),
+    admin_user: dict = Depends(get_current_admin)
+):
+    """
+    Bulk import properties from a CSV or NDJSON request body.
+    
+    Requires admin authentication.
+    The body is streamed to a spooled temp file, then imported in batches of
+    BULK_IMPORT_BATCH_SIZE rows (one slug query, one executemany and one
+    commit per batch). Invalid rows are reported and skipped.
+    
+    Example:
+        curl -X POST /api/v1/properties/bulk -H "Content-Type: text/csv" --data-binary @feed.csv
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ndjson" if ("ndjson" in content_type or "jsonl" in content_type) else "csv"
+    
+    with tempfile.SpooledTemporaryFile(max_size=BULK_IMPORT_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        
+        text_stream = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        rows = _iter_csv_rows(text_stream) if format == "csv" else _iter_ndjson_rows(text_stream)
+        try:
+            return await run_in_threadpool(property_service.bulk_import_properties, db, rows)
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Import file must be UTF-8 encoded"
+            )
+        finally:
+            text_stream.detach()
+
+
 @router.put("/{property_id}", response_model=Property)
 async def update_property(
     property_id: int,
@@ -205,12 +367,18 @@ async def update_property(
 ):
     """
     Update an existing property.
+    
+    Send the `version` you read to reject the update (409) if someone else
+    changed the property in the meantime.
     """
-    property_obj = property_service.update_property(
-        db=db,
-        property_id=property_id,
-        property_update=property_update
-    )
+    try:
+        property_obj = property_service.update_property(
+            db=db,
+            property_id=property_id,
+            property_update=property_update
+        )
+    except PropertyVersionConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     if not property_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -223,25 +391,34 @@ async def update_property(
 async def toggle_property_availability(
     property_id: int,
     is_available: bool,
+    version: Optional[int] = Query(None, description="Expected property version; 409 if it changed"),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Quick toggle for property availability status.
     
+    Applied as one conditional UPDATE on the property version, so a
+    concurrent booking or flip returns 409 instead of being overwritten.
     Requires authentication.
     """
-    property_obj = property_service.get_property(db=db, property_id=property_id)
-    if not property_obj:
+    try:
+        new_version = property_service.set_availability(
+            db=db, property_id=property_id, is_available=is_available, expected_version=version
+        )
+    except PropertyVersionConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if new_version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Property not found"
         )
     
-    property_obj.is_available = is_available
-    db.commit()
-    
-    return {"message": f"Property {'available' if is_available else 'unavailable'}", "property_id": property_id}
+    return {
+        "message": f"Property {'available' if is_available else 'unavailable'}",
+        "property_id": property_id,
+        "version": new_version,
+    }
 
 
 @router.delete("/{property_id}")
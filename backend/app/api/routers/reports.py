@@ -14,6 +14,8 @@ from app.database import models
 from app.schemas.schemas import ReportRequest, ReportResponse, ReportType
 from app.services.genai_service import GenAIService
 from app.services.crud import property_service, lead_service
+from app.services.analytics_snapshot import analytics_engine
+from app.services.listing_stats import top_listings, top_listings_between
 from app.core.security import get_current_user
 
 router = APIRouter()
@@ -115,6 +117,11 @@ async def get_report_data(db: Session, request: ReportRequest):
     end_date = request.end_date or datetime.now()
     start_date = request.start_date or (end_date - timedelta(days=30))
     
+    # Columnar snapshot when configured (keeps report aggregations off the primary)
+    engine = analytics_engine()
+    if engine is not None:
+        return engine.report_data(request.report_type.value, start_date, end_date)
+    
     if request.report_type == ReportType.PROPERTY_OVERVIEW:
         return await get_property_overview_data(db)
     
@@ -240,28 +247,12 @@ async def get_lead_insights_data(db: Session, start_date: datetime, end_date: da
 
 
 async def get_listing_performance_data(db: Session, start_date: datetime, end_date: datetime):
-    """Get listing performance data for report"""
-    
-    # Properties with most leads
-    popular_properties = db.query(
-        models.Property.title,
-        models.Property.location,
-        func.count(models.Lead.id).label("lead_count")
-    ).outerjoin(models.Lead).group_by(
-        models.Property.id,
-        models.Property.title,
-        models.Property.location
-    ).order_by(func.count(models.Lead.id).desc()).limit(10).all()
-    
+    """Get listing performance data for report (from the per-property lead counters)"""
     return {
         "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
-        "top_listings": [
-            {
-                "title": p.title,
-                "location": p.location,
-                "leads": p.lead_count
-            } for p in popular_properties
-        ],
+        # Most leads created in the period, then all time
+        "top_listings": top_listings_between(db, start_date.date(), end_date.date()),
+        "top_listings_all_time": top_listings(db),
     }
 
 
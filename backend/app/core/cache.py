@@ -225,7 +225,7 @@ def cached(ttl: int = 300, key_prefix: str = "default"):
     return decorator
 
 
-def invalidate_cache(pattern: str):
+def invalidate_cache(*patterns: str):
     """
     Decorator to invalidate cache after function execution.
     
@@ -238,13 +238,15 @@ def invalidate_cache(pattern: str):
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
             result = await func(*args, **kwargs)
-            cache.delete_pattern(pattern)
+            for pattern in patterns:
+                cache.delete_pattern(pattern)
             return result
         
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
             result = func(*args, **kwargs)
-            cache.delete_pattern(pattern)
+            for pattern in patterns:
+                cache.delete_pattern(pattern)
             return result
         
         import asyncio
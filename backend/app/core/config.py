@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 import json
 
@@ -83,6 +83,27 @@ class Settings(BaseSettings):
     WHATSAPP_API_TOKEN: Optional[str] = os.getenv("WHATSAPP_API_TOKEN", None)
     WHATSAPP_PHONE_NUMBER_ID: Optional[str] = os.getenv("WHATSAPP_PHONE_NUMBER_ID", None)
     
+    # ==========================================================================
+    # NEW-LEAD NOTIFICATIONS (outbox + dispatcher)
+    # ==========================================================================
+    # Comma-separated channels: whatsapp, sms, email, webhook (empty = disabled)
+    NOTIFY_CHANNELS: str = os.getenv("NOTIFY_CHANNELS", "")
+    # Recipients used when the lead has no assigned agent
+    NOTIFY_DEFAULT_PHONE: Optional[str] = os.getenv("NOTIFY_DEFAULT_PHONE", None)
+    NOTIFY_DEFAULT_EMAIL: Optional[str] = os.getenv("NOTIFY_DEFAULT_EMAIL", None)
+    NOTIFY_WEBHOOK_URL: Optional[str] = os.getenv("NOTIFY_WEBHOOK_URL", None)
+    SENDGRID_API_KEY: Optional[str] = os.getenv("SENDGRID_API_KEY", None)
+    NOTIFY_EMAIL_FROM: str = os.getenv("NOTIFY_EMAIL_FROM", "leads@indohomz.com")
+    NOTIFY_CONCURRENCY: int = int(os.getenv("NOTIFY_CONCURRENCY", "8"))  # sends in flight
+    NOTIFY_BATCH_SIZE: int = 50  # outbox rows claimed per poll
+    NOTIFY_POLL_INTERVAL: float = float(os.getenv("NOTIFY_POLL_INTERVAL", "2.0"))  # seconds
+    NOTIFY_LEASE_SECONDS: int = 60  # claimed rows become due again if a worker dies mid-send
+    NOTIFY_MAX_ATTEMPTS: int = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "6"))
+    NOTIFY_BACKOFF_BASE: float = 2.0  # seconds; doubles per attempt
+    NOTIFY_BACKOFF_MAX: float = 600.0
+    # Sends per second per provider
+    NOTIFY_RATE_LIMITS: Dict[str, float] = {"whatsapp": 20.0, "sms": 5.0, "email": 10.0, "webhook": 50.0}
+    
     # ==========================================================================
     # ENVIRONMENT
     # ==========================================================================
@@ -147,6 +168,90 @@ class Settings(BaseSettings):
     DEFAULT_PAGE_SIZE: int = 12
     MAX_PAGE_SIZE: int = 50
     
+    # ==========================================================================
+    # BULK IMPORT
+    # ==========================================================================
+    BULK_IMPORT_BATCH_SIZE: int = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "500"))
+    BULK_IMPORT_MAX_ERRORS: int = 1000  # Per-row errors returned in the response
+    
+    # ==========================================================================
+    # EXPORT
+    # ==========================================================================
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))  # rows per cursor fetch / output chunk
+    
+    # ==========================================================================
+    # ANALYTICS SNAPSHOTS (Parquet, requires pyarrow)
+    # ==========================================================================
+    # "snapshot" serves the dashboard and report data from the latest snapshot
+    ANALYTICS_ENGINE: str = os.getenv("ANALYTICS_ENGINE", "database")
+    ANALYTICS_SNAPSHOT_EXPORT: bool = os.getenv("ANALYTICS_SNAPSHOT_EXPORT", "False").lower() == "true"  # one process only
+    ANALYTICS_SNAPSHOT_DIR: str = os.getenv("ANALYTICS_SNAPSHOT_DIR", "data/analytics_snapshots")
+    ANALYTICS_SNAPSHOT_INTERVAL_SECONDS: int = int(os.getenv("ANALYTICS_SNAPSHOT_INTERVAL_SECONDS", "900"))
+    ANALYTICS_SNAPSHOT_KEEP: int = 2  # exports kept on disk (current + previous)
+    
+    # ==========================================================================
+    # LIVE DASHBOARD EVENTS (SSE)
+    # ==========================================================================
+    LIVE_EVENTS_MAX_SUBSCRIBERS: int = int(os.getenv("LIVE_EVENTS_MAX_SUBSCRIBERS", "5000"))  # open streams per worker
+    LIVE_EVENTS_QUEUE_SIZE: int = 100  # events buffered per stream before it is told to resync
+    LIVE_EVENTS_HEARTBEAT_SECONDS: float = 15.0  # keepalive comment on idle streams
+    LIVE_EVENTS_RETRY_SECONDS: float = 3.0  # client reconnect delay (SSE retry)
+    LIVE_EVENTS_CHANNEL: str = os.getenv("LIVE_EVENTS_CHANNEL", "indohomz:live-events")  # Redis pub/sub channel
+    
+    # ==========================================================================
+    # UNIQUE COUNTS (HyperLogLog; Redis PFADD/PFCOUNT when Redis is enabled)
+    # ==========================================================================
+    UNIQUE_COUNTS_PRECISION: int = 14  # 2^14 registers, 0.81% standard error; changing it orphans stored sketches
+    UNIQUE_COUNTS_FLUSH_SECONDS: float = float(os.getenv("UNIQUE_COUNTS_FLUSH_SECONDS", "10"))  # in-process buffer
+    UNIQUE_COUNTS_RETENTION_DAYS: int = int(os.getenv("UNIQUE_COUNTS_RETENTION_DAYS", "400"))
+    UNIQUE_COUNTS_MAX_WINDOW_DAYS: int = 366
+    
+    # ==========================================================================
+    # PROPERTY VIEWS (buffered counters; Redis HINCRBY shares the buffer across workers)
+    # ==========================================================================
+    PROPERTY_VIEW_FLUSH_SECONDS: float = float(os.getenv("PROPERTY_VIEW_FLUSH_SECONDS", "10"))
+    PROPERTY_VIEW_SHARDS: int = 16  # counter shards (one lock each), picked by thread
+    PROPERTY_VIEW_MAX_WINDOW_DAYS: int = 366
+    
+    # ==========================================================================
+    # LEAD INGESTION
+    # ==========================================================================
+    # "sync" commits each lead in the request; "buffered" queues it and returns 202
+    LEAD_INGESTION_MODE: str = os.getenv("LEAD_INGESTION_MODE", "sync")
+    LEAD_QUEUE_MAX_SIZE: int = int(os.getenv("LEAD_QUEUE_MAX_SIZE", "5000"))
+    LEAD_BATCH_SIZE: int = int(os.getenv("LEAD_BATCH_SIZE", "200"))
+    LEAD_FLUSH_INTERVAL: float = float(os.getenv("LEAD_FLUSH_INTERVAL", "0.5"))  # seconds
+    LEAD_ENQUEUE_TIMEOUT: float = 2.0  # seconds to wait for queue space before 503
+    LEAD_WRITE_RETRIES: int = 3  # batch retries on connection errors
+    LEAD_SHUTDOWN_TIMEOUT: float = 30.0  # seconds to drain the queue on shutdown
+    # Repeat submissions (same phone + property) within the window merge into one lead
+    LEAD_DEDUPE_ENABLED: bool = os.getenv("LEAD_DEDUPE_ENABLED", "True").lower() == "true"
+    LEAD_DEDUPE_WINDOW_SECONDS: int = int(os.getenv("LEAD_DEDUPE_WINDOW_SECONDS", "86400"))
+    LEAD_MERGED_MESSAGE_MAX_CHARS: int = int(os.getenv("LEAD_MERGED_MESSAGE_MAX_CHARS", "4000"))  # repeats stop appending past this
+    LEAD_SCORE_BATCH_SIZE: int = int(os.getenv("LEAD_SCORE_BATCH_SIZE", "50000"))  # leads per scoring batch
+    # Spam scoring from phone / email domain / message template / property velocity
+    LEAD_VELOCITY_ENABLED: bool = os.getenv("LEAD_VELOCITY_ENABLED", "True").lower() == "true"
+    LEAD_VELOCITY_WINDOW_SECONDS: int = int(os.getenv("LEAD_VELOCITY_WINDOW_SECONDS", "3600"))
+    LEAD_SPAM_QUARANTINE_SCORE: float = float(os.getenv("LEAD_SPAM_QUARANTINE_SCORE", "50"))  # kept for review, no lead
+    LEAD_SPAM_REJECT_SCORE: float = float(os.getenv("LEAD_SPAM_REJECT_SCORE", "90"))  # 429
+    LEAD_QUARANTINE_SIZE: int = 1000  # quarantined submissions kept (oldest dropped)
+    
+    # ==========================================================================
+    # BOOKINGS
+    # ==========================================================================
+    BOOKING_CALENDAR_TTL: int = int(os.getenv("BOOKING_CALENDAR_TTL", "60"))  # seconds between index rebuilds
+    BOOKING_VERSION_RETRIES: int = 3  # re-checks when another writer bumps the property version first
+    # Availability history: events kept this long (days), compacted nightly into daily snapshots
+    AVAILABILITY_EVENT_RETENTION_DAYS: int = int(os.getenv("AVAILABILITY_EVENT_RETENTION_DAYS", "90"))
+    
+    # ==========================================================================
+    # IDEMPOTENCY KEYS
+    # ==========================================================================
+    IDEMPOTENCY_ENABLED: bool = os.getenv("IDEMPOTENCY_ENABLED", "True").lower() == "true"
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))  # how long responses replay
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0  # duplicates wait this long for the in-flight request, then 409
+    IDEMPOTENCY_LOCK_SECONDS: int = 60  # in-flight marker expiry (covers a worker dying mid-request)
+    
     # ==========================================================================
     # REDIS CACHING
     # ==========================================================================
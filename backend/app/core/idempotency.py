@@ -0,0 +1,341 @@
+"""
+IndoHomz Idempotency Keys
+
+Clients send an `Idempotency-Key` header on POSTs that create records (leads,
+inquiries, properties, bookings) so retries over flaky networks don't create
+duplicates.
+
+- The first request with a key runs normally; its response (status, headers,
+  body) is stored for IDEMPOTENCY_TTL_SECONDS
+- A retry with the same key and payload gets the stored response replayed,
+  skipping validation, rate limiting and the database entirely
+- A retry arriving while the first request is still running waits for it
+  (up to IDEMPOTENCY_WAIT_SECONDS, then 409)
+- Reusing a key with a different payload is rejected with 422
+
+Storage is Redis when connected (shared across workers), else in-process.
+Transient outcomes (5xx, 429, anything sent with Retry-After) are not stored,
+so the client's next retry runs the request again.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.rate_limit import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+REDIS_POLL_INTERVAL = 0.05  # seconds between checks while another worker holds the key
+
+# begin() outcomes
+NEW = "new"
+REPLAY = "replay"
+PENDING = "pending"
+MISMATCH = "mismatch"
+
+
+class StoredResponse:
+    """A captured response, replayable byte for byte"""
+
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def storable(self) -> bool:
+        """False for outcomes a retry should re-run rather than replay"""
+        if self.status >= 500 or self.status == 429:
+            return False
+        return not any(name.lower() == b"retry-after" for name, _ in self.headers)
+
+    def to_dict(self) -> dict:
+        # latin-1 round-trips arbitrary bytes through JSON strings
+        return {
+            "status": self.status,
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in self.headers],
+            "body": self.body.decode("latin-1"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StoredResponse":
+        return cls(
+            status=data["status"],
+            headers=[(name.encode("latin-1"), value.encode("latin-1")) for name, value in data["headers"]],
+            body=data["body"].encode("latin-1"),
+        )
+
+
+class _Entry:
+    """In-memory record for one key: in flight until `response` is set"""
+
+    __slots__ = ("fingerprint", "expires_at", "response", "done")
+
+    def __init__(self, fingerprint: str, expires_at: float):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.response: Optional[StoredResponse] = None
+        self.done = asyncio.Event()
+
+
+class IdempotencyStore:
+    """Stored responses and in-flight markers per (scoped) idempotency key"""
+
+    def __init__(
+        self,
+        ttl_seconds: int = settings.IDEMPOTENCY_TTL_SECONDS,
+        lock_seconds: int = settings.IDEMPOTENCY_LOCK_SECONDS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds  # in-flight markers expire if a worker dies mid-request
+        # key -> entry, roughly oldest first (completed entries move to the end)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    async def begin(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        """
+        Claim `key` for a request with the given payload fingerprint.
+
+        Returns (NEW, None) if the caller should run the request, (REPLAY,
+        response) for a completed earlier request, (PENDING, None) while
+        another request holds the key, or (MISMATCH, None) if the key was
+        used with a different payload.
+        """
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                marker = json.dumps({"fingerprint": fingerprint})
+                if await redis.set(key, marker, nx=True, ex=self.lock_seconds):
+                    return NEW, None
+                raw = await redis.get(key)
+                if raw is None:  # expired in between; look again on the next poll
+                    return PENDING, None
+                record = json.loads(raw)
+                response = record.get("response")
+                return self._classify(
+                    record["fingerprint"], fingerprint, StoredResponse.from_dict(response) if response else None
+                )
+            except Exception as e:
+                logger.warning(f"Redis idempotency failed: {e} - using in-memory store")
+
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= now:
+            self._entries[key] = _Entry(fingerprint, now + self.lock_seconds)
+            return NEW, None
+        return self._classify(entry.fingerprint, fingerprint, entry.response)
+
+    @staticmethod
+    def _classify(
+        stored_fingerprint: str, fingerprint: str, response: Optional[StoredResponse]
+    ) -> Tuple[str, Optional[StoredResponse]]:
+        if stored_fingerprint != fingerprint:
+            return MISMATCH, None
+        if response is None:
+            return PENDING, None
+        return REPLAY, response
+
+    async def wait(self, key: str, timeout: float):
+        """Wait (at most `timeout` seconds) for the request holding `key` to finish"""
+        redis = get_redis_client()
+        if redis is not None:
+            await asyncio.sleep(min(timeout, REDIS_POLL_INTERVAL))
+            return
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        try:
+            await asyncio.wait_for(entry.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def complete(self, key: str, fingerprint: str, response: StoredResponse):
+        """Store the response for replay and release waiting duplicates"""
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                record = json.dumps({"fingerprint": fingerprint, "response": response.to_dict()})
+                await redis.set(key, record, ex=self.ttl_seconds)
+                return
+            except Exception as e:
+                logger.warning(f"Redis idempotency failed: {e} - using in-memory store")
+
+        entry = self._entries.pop(key, None) or _Entry(fingerprint, 0)
+        entry.response = response
+        entry.expires_at = time.monotonic() + self.ttl_seconds
+        self._entries[key] = entry
+        entry.done.set()
+
+    async def abandon(self, key: str):
+        """Drop the in-flight marker so the next retry runs the request again"""
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                await redis.delete(key)
+                return
+            except Exception as e:
+                logger.warning(f"Redis idempotency failed: {e} - using in-memory store")
+
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.done.set()
+
+    def _expire(self, now: float):
+        while self._entries and next(iter(self._entries.values())).expires_at <= now:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+idempotency_store = IdempotencyStore()
+
+
+# =============================================================================
+# MIDDLEWARE
+# =============================================================================
+
+def scoped_key(method: str, path: str, authorization: Optional[str], key: str) -> str:
+    """Storage key: one client's key for one route (tokens keep users' keys apart)"""
+    raw = "\n".join([method, path.rstrip("/"), authorization or "", key])
+    return f"idempotency:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+def request_fingerprint(query_string: bytes, body: bytes) -> str:
+    return hashlib.sha256(query_string + b"\n" + body).hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware applying Idempotency-Key handling to the given
+    (method, path) routes. Requests without the header pass straight through.
+    """
+
+    def __init__(
+        self,
+        app,
+        routes: Iterable[Tuple[str, str]],
+        store: Optional[IdempotencyStore] = None,
+        wait_seconds: float = settings.IDEMPOTENCY_WAIT_SECONDS,
+        enabled: bool = settings.IDEMPOTENCY_ENABLED,
+    ):
+        self.app = app
+        self.routes = {(method.upper(), path.rstrip("/")) for method, path in routes}
+        self.store = store or idempotency_store
+        self.wait_seconds = wait_seconds
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.enabled
+            or (scope["method"], scope["path"].rstrip("/")) not in self.routes
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        key = headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key.strip() or len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                status_code=400,
+                content={"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"},
+            )
+            await response(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        storage_key = scoped_key(scope["method"], scope["path"], headers.get("authorization"), key)
+        fingerprint = request_fingerprint(scope.get("query_string", b""), body)
+
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            state, stored = await self.store.begin(storage_key, fingerprint)
+            if state == NEW:
+                break
+            if state == REPLAY:
+                await send_stored(stored, send)
+                return
+            if state == MISMATCH:
+                response = JSONResponse(
+                    status_code=422,
+                    content={"detail": "Idempotency-Key was already used with a different request"},
+                )
+                await response(scope, receive, send)
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                response = JSONResponse(
+                    status_code=409,
+                    content={"detail": "A request with this Idempotency-Key is still being processed"},
+                    headers={"Retry-After": "1"},
+                )
+                await response(scope, receive, send)
+                return
+            await self.store.wait(storage_key, remaining)
+
+        captured = StoredResponse(500, [], b"")
+        chunks = []
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                captured.status = message["status"]
+                captured.headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await self.store.abandon(storage_key)
+            raise
+
+        captured.body = b"".join(chunks)
+        if captured.storable:
+            await self.store.complete(storage_key, fingerprint, captured)
+        else:
+            await self.store.abandon(storage_key)
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def send_stored(stored: StoredResponse, send):
+    await send({
+        "type": "http.response.start",
+        "status": stored.status,
+        "headers": stored.headers + [(REPLAYED_HEADER, b"true")],
+    })
+    await send({"type": "http.response.body", "body": stored.body})
@@ -57,6 +57,11 @@ async def init_redis():
         return False
 
 
+def get_redis_client():
+    """Shared async Redis client, or None when running with in-memory storage"""
+    return _redis_client if _using_redis else None
+
+
 # =============================================================================
 # RATE LIMIT STORAGE
 # =============================================================================
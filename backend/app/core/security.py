@@ -104,8 +104,23 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         async def protected_route(user: dict = Depends(get_current_user)):
             return {"user_id": user["user_id"]}
     """
-    token = credentials.credentials
-    payload = verify_token(token)
+    return access_token_payload(credentials.credentials)
+
+
+async def get_current_user_for_stream(request: Request, token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Like get_current_user, but also accepts the token as ?token= since
+    browser EventSource connections cannot send an Authorization header.
+    """
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        token = auth_header.replace("Bearer ", "")
+    return access_token_payload(token)
+
+
+def access_token_payload(token: Optional[str]) -> Dict[str, Any]:
+    """Decode an access token or raise 401"""
+    payload = verify_token(token) if token else None
     
     if payload is None:
         raise HTTPException(
@@ -68,7 +68,9 @@ def init_db():
     Call this on application startup to ensure all tables exist.
     """
     from app.database import models  # Import models to register them
+    from app.database.search_indexes import ensure_search_indexes
     Base.metadata.create_all(bind=engine)
+    ensure_search_indexes(engine)
 
 
 def get_db_info() -> dict:
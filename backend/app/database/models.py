@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index
+import uuid
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Boolean, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
@@ -84,15 +85,23 @@ class Property(Base):
     is_available = Column(Boolean, default=True)
     available_from = Column(DateTime(timezone=True), nullable=True)
     
+    # Optimistic concurrency: ORM flushes check and bump it (version_id_col);
+    # bookings and availability flips use UPDATE ... WHERE version = :v
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __mapper_args__ = {"version_id_col": version}
+    
     # Composite indexes for common queries
     __table_args__ = (
         Index('idx_property_city_available', 'city', 'is_available'),
         Index('idx_property_type_available', 'property_type', 'is_available'),
         Index('idx_property_price_available', 'price_numeric', 'is_available'),
+        # Covers the dashboard summary's GROUP BY (index-only scan)
+        Index('idx_property_type_city_stats', 'property_type', 'city', 'is_available', 'created_at'),
     )
 
 
@@ -110,6 +119,9 @@ class Lead(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     
+    # Public reference, allocated before insert (buffered ingestion returns it with 202)
+    reference = Column(String(32), unique=True, index=True, nullable=True, default=lambda: uuid.uuid4().hex)
+    
     # Contact Info
     name = Column(String(100), nullable=False)
     email = Column(String(255), nullable=True, index=True)
@@ -122,7 +134,15 @@ class Lead(Base):
     
     # Lead Status
     status = Column(String(50), default="new")  # new, contacted, site_visit, negotiation, converted, lost
+    status_changed_at = Column(DateTime(timezone=True), nullable=True)  # entered the current status (null: at creation)
     source = Column(String(50), default="website")  # website, whatsapp, referral, instagram
+    submission_count = Column(Integer, nullable=False, default=1, server_default="1")  # repeats merged into this lead
+    assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # sales staff owning the lead
+    archived_at = Column(DateTime(timezone=True), nullable=True)  # archived leads are hidden from lists
+    
+    # Conversion score (0-100), maintained by lead_scoring.LeadScorer
+    score = Column(Float, nullable=True, index=True)
+    scored_at = Column(DateTime(timezone=True), nullable=True)
     
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -135,6 +155,8 @@ class Lead(Base):
     __table_args__ = (
         Index('idx_lead_status_created', 'status', 'created_at'),
         Index('idx_lead_property_status', 'property_id', 'status'),
+        # Covers the dashboard summary's GROUP BY (index-only scan)
+        Index('idx_lead_status_source_created', 'status', 'source', 'created_at'),
     )
 
 
@@ -176,3 +198,191 @@ class Booking(Base):
     # Relationships
     property = relationship("Property", backref="bookings")
     lead = relationship("Lead", backref="bookings")
+
+
+# =============================================================================
+# NOTIFICATION OUTBOX
+# =============================================================================
+
+class NotificationOutbox(Base):
+    """
+    Pending outbound notification (transactional outbox)
+    Written in the same transaction as the lead; sent by notifications.NotificationDispatcher
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # What to send
+    event = Column(String(50), nullable=False, default="lead.created")
+    channel = Column(String(20), nullable=False)  # whatsapp, sms, email, webhook
+    lead_reference = Column(String(32), nullable=True, index=True)  # leads.reference (known before insert)
+    payload = Column(Text, nullable=False)  # JSON snapshot of the lead
+
+    # Delivery state
+    status = Column(String(20), nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)  # due time (lease expiry while sending)
+    last_error = Column(Text, nullable=True)
+
+    # Metadata
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('idx_outbox_status_due', 'status', 'next_attempt_at'),
+    )
+
+
+# =============================================================================
+# AVAILABILITY HISTORY
+# =============================================================================
+
+class PropertyAvailabilityEvent(Base):
+    """
+    Append-only log of availability changes (see availability_history)
+    Pruned after AVAILABILITY_EVENT_RETENTION_DAYS once compacted into snapshots
+    """
+    __tablename__ = "property_availability_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, nullable=False, index=True)  # no FK: outlives hard-deleted properties
+    previous = Column(Boolean, nullable=True)  # null: the property did not exist yet
+    is_available = Column(Boolean, nullable=True)  # null: the property was deleted
+    reason = Column(String(30), nullable=False)  # created, toggled, updated, soft_deleted, deleted, booked, booking_cancelled
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class DailyAvailabilitySnapshot(Base):
+    """
+    End-of-day availability totals (UTC days), one row per day
+    """
+    __tablename__ = "daily_availability_snapshot"
+
+    day = Column(Date, primary_key=True)
+    total_properties = Column(Integer, nullable=False)
+    available_properties = Column(Integer, nullable=False)
+    changes = Column(Integer, nullable=False, default=0)  # availability events during the day
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# =============================================================================
+# LEAD FUNNEL
+# =============================================================================
+
+class LeadStatusTransition(Base):
+    """
+    Append-only log of lead status changes (see lead_funnel)
+    from_status is null for the status a lead was created in
+    """
+    __tablename__ = "lead_status_transitions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    lead_id = Column(Integer, ForeignKey("leads.id"), nullable=False, index=True)
+    from_status = Column(String(50), nullable=True)
+    to_status = Column(String(50), nullable=False)
+    cohort_week = Column(Date, nullable=False)  # Monday (UTC) of the week the lead was created
+    seconds_in_previous = Column(Float, nullable=True)  # time spent in from_status
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class LeadCohortStage(Base):
+    """
+    Weekly-cohort x stage funnel matrix, updated on every status transition
+    """
+    __tablename__ = "lead_cohort_stages"
+
+    cohort_week = Column(Date, primary_key=True)
+    stage = Column(String(50), primary_key=True)
+    entered = Column(Integer, nullable=False, default=0)  # cohort leads that ever reached the stage
+    current = Column(Integer, nullable=False, default=0)  # cohort leads in the stage now
+    exited = Column(Integer, nullable=False, default=0)  # transitions out of the stage
+    seconds_in_stage = Column(Float, nullable=False, default=0)  # summed over those exits
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# =============================================================================
+# LISTING STATS
+# =============================================================================
+
+class PropertyLeadStats(Base):
+    """
+    Per-property lead counters, updated on every lead write (see listing_stats)
+    """
+    __tablename__ = "property_lead_stats"
+
+    property_id = Column(Integer, ForeignKey("properties.id", ondelete="CASCADE"), primary_key=True)
+    total_leads = Column(Integer, nullable=False, default=0)
+    conversions = Column(Integer, nullable=False, default=0)  # leads currently converted
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Top listings: backward range read, no sort
+        Index('idx_property_lead_stats_total', 'total_leads', 'property_id'),
+    )
+
+
+class PropertyLeadDaily(Base):
+    """
+    Per-property lead counters bucketed by the UTC day the leads were created
+    """
+    __tablename__ = "property_lead_daily"
+
+    property_id = Column(Integer, ForeignKey("properties.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    leads = Column(Integer, nullable=False, default=0)
+    conversions = Column(Integer, nullable=False, default=0)  # of those leads, currently converted
+
+    __table_args__ = (
+        # Report windows: range on day, covering the summed counters
+        Index('idx_property_lead_daily_day', 'day', 'property_id', 'leads', 'conversions'),
+    )
+
+
+class PropertyViewStats(Base):
+    """
+    Per-property detail-page views, flushed in batches (see property_views)
+    """
+    __tablename__ = "property_view_stats"
+
+    property_id = Column(Integer, ForeignKey("properties.id", ondelete="CASCADE"), primary_key=True)
+    views = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Most viewed: backward range read, no sort
+        Index('idx_property_view_stats_views', 'views', 'property_id'),
+    )
+
+
+class PropertyViewDaily(Base):
+    """
+    Per-property detail-page views bucketed by UTC day
+    """
+    __tablename__ = "property_view_daily"
+
+    property_id = Column(Integer, ForeignKey("properties.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    views = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Windows and trending: range on day, covering the summed views
+        Index('idx_property_view_daily_day', 'day', 'property_id', 'views'),
+    )
+
+
+# =============================================================================
+# UNIQUE COUNTS
+# =============================================================================
+
+class HllSketch(Base):
+    """
+    HyperLogLog registers per key per UTC day (see unique_counts); used
+    when Redis is not, which keeps the same sketches as PFADD keys
+    """
+    __tablename__ = "hll_sketches"
+
+    key = Column(String(160), primary_key=True)  # hll:<metric>:<property|city>:<id>
+    day = Column(Date, primary_key=True, index=True)  # index: retention pruning
+    registers = Column(LargeBinary, nullable=False)  # sparse pairs or 2^precision bytes
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,110 @@
+"""
+IndoHomz Search Indexes
+
+Database-native text search structures for properties:
+- SQLite:     FTS5 external-content table (trigram tokenizer) kept in sync by triggers
+- PostgreSQL: generated tsvector column with a GIN index, plus pg_trgm GIN
+              indexes so city/location ILIKE '%x%' filters are index-backed
+
+The same DDL ships in alembic migration 003_full_text_search. At startup
+this module only builds the SQLite structures (databases created through
+Base.metadata.create_all()); PostgreSQL is left to migrations, since its
+DDL locks the properties table and CREATE EXTENSION needs a superuser.
+"""
+
+import sqlite3
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+# Columns indexed for full-text search, in FTS column order
+PROPERTY_SEARCH_COLUMNS = ("title", "location", "area", "city", "amenities", "description")
+
+PROPERTY_FTS_TABLE = "properties_fts"
+
+# The trigram tokenizer (substring matching) needs SQLite 3.34+
+SQLITE_TRIGRAM_MIN_VERSION = (3, 34, 0)
+
+_cols = ", ".join(PROPERTY_SEARCH_COLUMNS)
+_new = ", ".join(f"new.{c}" for c in PROPERTY_SEARCH_COLUMNS)
+_old = ", ".join(f"old.{c}" for c in PROPERTY_SEARCH_COLUMNS)
+
+SQLITE_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {PROPERTY_FTS_TABLE} USING fts5(
+        {_cols}, content='properties', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS properties_fts_ai AFTER INSERT ON properties BEGIN
+        INSERT INTO {PROPERTY_FTS_TABLE}(rowid, {_cols}) VALUES (new.id, {_new});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS properties_fts_ad AFTER DELETE ON properties BEGIN
+        INSERT INTO {PROPERTY_FTS_TABLE}({PROPERTY_FTS_TABLE}, rowid, {_cols}) VALUES ('delete', old.id, {_old});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS properties_fts_au AFTER UPDATE OF {_cols} ON properties BEGIN
+        INSERT INTO {PROPERTY_FTS_TABLE}({PROPERTY_FTS_TABLE}, rowid, {_cols}) VALUES ('delete', old.id, {_old});
+        INSERT INTO {PROPERTY_FTS_TABLE}(rowid, {_cols}) VALUES (new.id, {_new});
+    END
+    """,
+]
+
+SQLITE_FTS_REBUILD = f"INSERT INTO {PROPERTY_FTS_TABLE}({PROPERTY_FTS_TABLE}) VALUES ('rebuild')"
+
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE properties ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(location, '') || ' ' || coalesce(area, '') || ' ' || coalesce(city, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(amenities, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_properties_search_vector ON properties USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS idx_properties_city_trgm ON properties USING GIN (city gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_properties_location_trgm ON properties USING GIN (location gin_trgm_ops)",
+]
+
+
+def sqlite_supports_trigram() -> bool:
+    """Check the linked SQLite library for the FTS5 trigram tokenizer"""
+    return sqlite3.sqlite_version_info >= SQLITE_TRIGRAM_MIN_VERSION
+
+
+def create_postgres_search_indexes(engine: Engine):
+    """Apply migration 003's PostgreSQL DDL to a scratch database (tools only)"""
+    with engine.begin() as conn:
+        for statement in POSTGRES_SEARCH_DDL:
+            conn.execute(text(statement))
+
+
+def ensure_search_indexes(engine: Engine) -> bool:
+    """
+    Create the SQLite text search structures (idempotent); on PostgreSQL only
+    check that migrations installed them.
+
+    Returns True if native text search is available afterwards.
+    """
+    dialect = engine.dialect.name
+
+    if dialect == "sqlite":
+        if not sqlite_supports_trigram():
+            return False
+        is_new = not inspect(engine).has_table(PROPERTY_FTS_TABLE)
+        with engine.begin() as conn:
+            for statement in SQLITE_FTS_DDL:
+                conn.execute(text(statement))
+            if is_new:
+                # Index rows that existed before the FTS table
+                conn.execute(text(SQLITE_FTS_REBUILD))
+        return True
+
+    if dialect == "postgresql":
+        return any(c["name"] == "search_vector" for c in inspect(engine).get_columns("properties"))
+
+    return False
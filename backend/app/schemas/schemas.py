@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Literal, Union, Annotated
 from enum import Enum
 
 
@@ -141,11 +141,13 @@ class PropertyUpdate(BaseModel):
     description: Optional[str] = None
     is_available: Optional[bool] = None
     available_from: Optional[datetime] = None
+    version: Optional[int] = Field(None, description="Version read by the client; 409 if the property changed since")
 
 
 class Property(PropertyBase):
     id: int
     slug: Optional[str] = None
+    version: int = 1
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -153,8 +155,42 @@ class Property(PropertyBase):
         from_attributes = True
 
 
+class PropertyView(str, Enum):
+    CARD = "card"
+    FULL = "full"
+
+
+class PropertyCard(BaseModel):
+    """
+    Lightweight property projection for grid/list pages.
+    Omits heavy text columns (description, images, highlights).
+    """
+    id: int
+    slug: Optional[str] = None
+    title: str
+    price: str
+    price_numeric: Optional[float] = None
+    location: str
+    area: Optional[str] = None
+    city: str
+    property_type: Optional[str] = None
+    bedrooms: Optional[int] = None
+    bathrooms: Optional[int] = None
+    area_sqft: Optional[int] = None
+    furnishing: Optional[str] = None
+    image_url: Optional[str] = None
+    amenities: Optional[str] = None
+    is_available: bool = True
+    available_from: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class PropertyListResponse(BaseModel):
     """Paginated property list response"""
+    view: Literal["full"] = "full"
     items: List[Property]
     total: int
     skip: int
@@ -162,6 +198,39 @@ class PropertyListResponse(BaseModel):
     has_more: bool
 
 
+class PropertyCardListResponse(BaseModel):
+    """Paginated property list response (card projection)"""
+    view: Literal["card"] = "card"
+    items: List[PropertyCard]
+    total: int
+    skip: int
+    limit: int
+    has_more: bool
+
+
+class PropertyImportError(BaseModel):
+    """A row rejected by the bulk importer"""
+    row: int
+    title: Optional[str] = None
+    error: str
+
+
+class PropertyBulkImportResponse(BaseModel):
+    """Summary of a bulk property import"""
+    total_rows: int
+    inserted: int
+    failed: int
+    batches: int
+    errors: List[PropertyImportError]
+    errors_truncated: bool = False
+
+
+PropertyListResult = Annotated[
+    Union[PropertyCardListResponse, PropertyListResponse],
+    Field(discriminator="view"),
+]
+
+
 # =============================================================================
 # LEAD SCHEMAS (Customer Inquiries)
 # =============================================================================
@@ -211,7 +280,12 @@ class LeadUpdate(BaseModel):
 
 class Lead(LeadBase):
     id: int
+    reference: Optional[str] = None
     status: str
+    submission_count: int = 1
+    assigned_to: Optional[int] = None
+    archived_at: Optional[datetime] = None
+    score: Optional[float] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -219,6 +293,56 @@ class Lead(LeadBase):
         from_attributes = True
 
 
+class LeadBulkFilter(BaseModel):
+    """Selects leads for a bulk update (all given conditions must match)"""
+    status: Optional[LeadStatus] = None
+    source: Optional[str] = Field(None, max_length=50)
+    property_id: Optional[int] = None
+    assigned_to: Optional[int] = None
+    archived: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+    class Config:
+        use_enum_values = True
+
+
+class LeadBulkChanges(BaseModel):
+    """Fields to set; pass assigned_to: null to unassign"""
+    status: Optional[LeadStatus] = None
+    source: Optional[str] = Field(None, max_length=50)
+    assigned_to: Optional[int] = None
+    archived: Optional[bool] = None
+
+    class Config:
+        use_enum_values = True
+
+
+class LeadBulkUpdateRequest(BaseModel):
+    """Apply the same changes to a list of ids or to every lead matching a filter"""
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=5000)
+    filter: Optional[LeadBulkFilter] = None
+    changes: LeadBulkChanges
+
+
+class LeadBulkOutcome(BaseModel):
+    id: int
+    outcome: Literal["updated", "not_found"]
+
+
+class LeadBulkUpdateResponse(BaseModel):
+    """Summary of a bulk lead update"""
+    updated: int
+    not_found: int
+    results: List[LeadBulkOutcome]
+
+
+class LeadAccepted(BaseModel):
+    """Lead queued for buffered ingestion (202 Accepted)"""
+    reference: str
+    status: str = "queued"  # queued, or merged into an existing lead
+
+
 # =============================================================================
 # BOOKING SCHEMAS
 # =============================================================================
@@ -309,12 +433,17 @@ class PropertySearchRequest(BaseModel):
     bedrooms: Optional[int] = None
     amenities: Optional[List[str]] = None
     is_available: Optional[bool] = True
+    available_between: Optional[str] = Field(
+        None, description="Free on every day of start,end (YYYY-MM-DD,YYYY-MM-DD)"
+    )
     page: int = Field(default=1, ge=1)
     page_size: int = Field(default=12, ge=1, le=50)
+    view: PropertyView = PropertyView.CARD
 
 
 class PropertySearchResponse(BaseModel):
     """Search results with metadata"""
+    view: Literal["full"] = "full"
     items: List[Property]
     total: int
     page: int
@@ -323,6 +452,23 @@ class PropertySearchResponse(BaseModel):
     filters_applied: dict
 
 
+class PropertyCardSearchResponse(BaseModel):
+    """Search results with metadata (card projection)"""
+    view: Literal["card"] = "card"
+    items: List[PropertyCard]
+    total: int
+    page: int
+    page_size: int
+    query: Optional[str] = None
+    filters_applied: dict
+
+
+PropertySearchResult = Annotated[
+    Union[PropertyCardSearchResponse, PropertySearchResponse],
+    Field(discriminator="view"),
+]
+
+
 # =============================================================================
 # AI REPORT SCHEMAS (IndoHomz Insights)
 # =============================================================================
@@ -0,0 +1,443 @@
+"""
+IndoHomz Analytics Snapshots
+
+Columnar copies of the tables analytics reads, so heavy dashboards and
+report data gathering run off the primary database:
+- SnapshotExporter: every ANALYTICS_SNAPSHOT_INTERVAL_SECONDS streams
+  properties, leads and bookings (analytics columns only, no contact
+  details or message text) into Parquet files, strings dictionary-encoded.
+  Each export goes to a new directory; the CURRENT pointer file is swapped
+  atomically once every file is written, and older exports are pruned.
+- SnapshotEngine: loads the current snapshot into Arrow tables and answers
+  the dashboard and report-data aggregations with pyarrow compute
+  (vectorized group-bys and filters), in the same shapes as the SQL paths.
+
+Used when ANALYTICS_ENGINE=snapshot and pyarrow is installed; callers fall
+back to the database while no snapshot is younger than two intervals.
+Results are at most one interval (plus export time) stale. Run the
+exporter in one process only (ANALYTICS_SNAPSHOT_EXPORT).
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import models
+from app.database.connection import SessionLocal
+from app.services.listing_stats import CONVERTED, TOP_LISTINGS, creation_day
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # columnar analytics are optional in deployment
+    pa = pc = pq = None
+
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+# Column kinds: "int", "float", "bool", "str" (dictionary-encoded), "time"
+SNAPSHOT_TABLES: Dict[str, Tuple[object, List[Tuple[str, str]]]] = {
+    "properties": (models.Property, [
+        ("id", "int"), ("title", "str"), ("location", "str"), ("city", "str"),
+        ("property_type", "str"), ("bedrooms", "int"), ("price_numeric", "float"),
+        ("is_available", "bool"), ("created_at", "time"),
+    ]),
+    "leads": (models.Lead, [
+        ("id", "int"), ("property_id", "int"), ("status", "str"), ("source", "str"),
+        ("created_at", "time"), ("status_changed_at", "time"),
+    ]),
+    "bookings": (models.Booking, [
+        ("id", "int"), ("property_id", "int"), ("status", "str"), ("check_in", "time"),
+        ("check_out", "time"), ("monthly_rent", "float"), ("created_at", "time"),
+    ]),
+}
+
+
+def snapshots_available() -> bool:
+    return pa is not None
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Naive timestamps (SQLite) are UTC
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _arrow_type(kind: str):
+    return {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "str": pa.dictionary(pa.int32(), pa.string()),
+        "time": pa.timestamp("us", tz="UTC"),
+    }[kind]
+
+
+def _arrow_array(values: list, kind: str):
+    if kind == "str":
+        return pa.array(values, pa.string()).dictionary_encode()
+    if kind == "time":
+        values = [_utc(v) for v in values]
+    return pa.array(values, _arrow_type(kind))
+
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+
+def export_table(db: Session, name: str, path: Path, batch_size: int) -> int:
+    """Stream one table into a Parquet file, batch_size rows per row group. Returns rows written."""
+    model, columns = SNAPSHOT_TABLES[name]
+    schema = pa.schema([(column, _arrow_type(kind)) for column, kind in columns])
+    stmt = select(*(getattr(model, column) for column, _ in columns)).order_by(model.id)
+    rows_written = 0
+    with pq.ParquetWriter(str(path), schema) as writer:
+        result = db.execute(stmt.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            arrays = [_arrow_array([row[i] for row in rows], kind) for i, (_, kind) in enumerate(columns)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows_written += len(rows)
+        if rows_written == 0:
+            writer.write_table(schema.empty_table())
+    return rows_written
+
+
+def export_snapshot(
+    db: Session,
+    directory: Optional[str] = None,
+    keep: int = settings.ANALYTICS_SNAPSHOT_KEEP,
+    batch_size: int = settings.EXPORT_BATCH_SIZE,
+) -> Path:
+    """Write a complete snapshot, point CURRENT at it, prune old ones. Returns its directory."""
+    if not snapshots_available():
+        raise RuntimeError("pyarrow is not installed")
+    root = Path(directory or settings.ANALYTICS_SNAPSHOT_DIR)
+    generated_at = datetime.now(timezone.utc)
+    target = root / f"snapshot-{generated_at:%Y%m%dT%H%M%S%f}-{os.getpid()}"
+    target.mkdir(parents=True)
+
+    counts = {name: export_table(db, name, target / f"{name}.parquet", batch_size) for name in SNAPSHOT_TABLES}
+    (target / MANIFEST_FILE).write_text(json.dumps({"generated_at": generated_at.isoformat(), "rows": counts}))
+
+    pointer = root / f".{CURRENT_FILE}.{os.getpid()}"
+    pointer.write_text(target.name)
+    os.replace(pointer, root / CURRENT_FILE)
+
+    # Readers load whole tables into memory, so keeping the previous export is enough
+    for old in sorted(p for p in root.glob("snapshot-*") if p.is_dir())[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+class SnapshotExporter:
+    """Exports a snapshot every `interval` seconds"""
+
+    def __init__(
+        self,
+        interval: int = settings.ANALYTICS_SNAPSHOT_INTERVAL_SECONDS,
+        directory: Optional[str] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.interval = interval
+        self.directory = directory
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"exports": 0, "failed": 0, "last_seconds": None}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the export loop (must be called from the running event loop)"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.export_once)
+            except Exception:
+                self.stats["failed"] += 1
+                logger.exception("Analytics snapshot export failed")
+            await asyncio.sleep(self.interval)
+
+    def export_once(self) -> Path:
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            target = export_snapshot(db, self.directory)
+        finally:
+            db.close()
+        self.stats["exports"] += 1
+        self.stats["last_seconds"] = round(time.perf_counter() - started, 3)
+        return target
+
+
+# =============================================================================
+# QUERY ENGINE
+# =============================================================================
+
+def _rows(table, keys: List[str]) -> List[dict]:
+    """Row counts per distinct key combination (nulls form their own group)"""
+    return table.group_by(keys).aggregate([("id", "count")]).to_pylist()
+
+
+def _since(table, column: str, start: datetime, end: Optional[datetime] = None):
+    column_type = table.schema.field(column).type
+    mask = pc.greater_equal(table[column], pa.scalar(_utc(start), column_type))
+    if end is not None:
+        mask = pc.and_(mask, pc.less_equal(table[column], pa.scalar(_utc(end), column_type)))
+    return table.filter(mask)
+
+
+def _count_where(table, column: str, value) -> int:
+    return table.filter(pc.equal(table[column], value)).num_rows
+
+
+def _lead_counts(leads) -> Dict[int, Tuple[int, int]]:
+    """(leads, conversions) per property_id"""
+    converted = {
+        r["property_id"]: r["id_count"]
+        for r in _rows(leads.filter(pc.equal(leads["status"], CONVERTED)), ["property_id"])
+    }
+    return {r["property_id"]: (r["id_count"], converted.get(r["property_id"], 0)) for r in _rows(leads, ["property_id"])}
+
+
+class SnapshotEngine:
+    """Dashboard and report aggregations over the current Parquet snapshot"""
+
+    def __init__(self, directory: Optional[str] = None, max_age: Optional[int] = None):
+        self.directory = Path(directory or settings.ANALYTICS_SNAPSHOT_DIR)
+        # Older snapshots mean the exporter stopped: fall back to the database
+        self.max_age = max_age if max_age is not None else 2 * settings.ANALYTICS_SNAPSHOT_INTERVAL_SECONDS
+        self._lock = threading.Lock()
+        self._loaded: Optional[str] = None
+        self._tables: Dict[str, object] = {}
+        self.generated_at: Optional[datetime] = None
+
+    def _current(self) -> Optional[str]:
+        try:
+            return (self.directory / CURRENT_FILE).read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self) -> bool:
+        """Load the current snapshot if it changed; False if there is none"""
+        name = self._current()
+        if name is None:
+            return False
+        with self._lock:
+            if name != self._loaded:
+                target = self.directory / name
+                manifest = json.loads((target / MANIFEST_FILE).read_text())
+                tables = {}
+                for table, (_, columns) in SNAPSHOT_TABLES.items():
+                    strings = [column for column, kind in columns if kind == "str"]
+                    tables[table] = pq.read_table(
+                        str(target / f"{table}.parquet"), read_dictionary=strings
+                    ).unify_dictionaries().combine_chunks()
+                self._tables = tables
+                self.generated_at = datetime.fromisoformat(manifest["generated_at"])
+                self._loaded = name
+        return True
+
+    def ready(self) -> bool:
+        """True if a snapshot younger than max_age is loaded (or loadable)"""
+        if not snapshots_available():
+            return False
+        try:
+            if not self.load():
+                return False
+        except Exception as e:
+            logger.warning(f"Analytics snapshot load failed: {e} - using the database")
+            return False
+        return datetime.now(timezone.utc) - self.generated_at <= timedelta(seconds=self.max_age)
+
+    def table(self, name: str):
+        return self._tables[name]
+
+    # Dashboard (same shape as dashboard.dashboard_summary)
+
+    def dashboard(self, recent_days: int = 7, top_locations: int = 5) -> dict:
+        properties, leads = self.table("properties"), self.table("leads")
+        since = datetime.now(timezone.utc) - timedelta(days=recent_days)
+        total_properties = properties.num_rows
+        available = _count_where(properties, "is_available", True)
+        total_leads = leads.num_rows
+        converted = _count_where(leads, "status", "converted")
+        locations = heapq.nlargest(top_locations, _rows(properties, ["city"]), key=lambda r: r["id_count"])
+        return {
+            "overview": {
+                "total_properties": total_properties,
+                "available_properties": available,
+                "rented_properties": total_properties - available,
+                "total_leads": total_leads,
+                "conversion_rate": round((converted / total_leads * 100) if total_leads > 0 else 0, 2),
+            },
+            "recent_activity": {
+                "new_properties_this_week": _since(properties, "created_at", since).num_rows,
+                "new_leads_this_week": _since(leads, "created_at", since).num_rows,
+            },
+            "property_breakdown": {
+                "by_type": [{"type": r["property_type"], "count": r["id_count"]} for r in _rows(properties, ["property_type"])],
+                "by_location": [{"city": r["city"], "count": r["id_count"]} for r in locations],
+            },
+            "lead_breakdown": {
+                "by_status": [{"status": r["status"], "count": r["id_count"]} for r in _rows(leads, ["status"])],
+                "by_source": [{"source": r["source"], "count": r["id_count"]} for r in _rows(leads, ["source"])],
+            },
+        }
+
+    # Report data (same shapes as the reports router's get_*_data)
+
+    def report_data(self, report_type: str, start_date: datetime, end_date: datetime) -> dict:
+        if report_type == "property_overview":
+            return self.property_overview()
+        if report_type == "availability_status":
+            return self.availability()
+        if report_type == "lead_insights":
+            return self.lead_insights(start_date, end_date)
+        if report_type == "listing_performance":
+            return self.listing_performance(start_date, end_date)
+        if report_type == "market_analysis":
+            return self.market_analysis()
+        raise ValueError(f"Unknown report type: {report_type}")
+
+    def property_overview(self) -> dict:
+        properties = self.table("properties")
+        total = properties.num_rows
+        available = _count_where(properties, "is_available", True)
+        return {
+            "total_properties": total,
+            "available_properties": available,
+            "rented_properties": total - available,
+            "occupancy_rate": round((total - available) / total * 100, 2) if total > 0 else 0,
+            "property_types": [
+                {"type": r["property_type"] or "Unknown", "count": r["id_count"]}
+                for r in _rows(properties, ["property_type"])
+            ],
+            "locations": [{"city": r["city"] or "Unknown", "count": r["id_count"]} for r in _rows(properties, ["city"])],
+        }
+
+    def availability(self) -> dict:
+        properties = self.table("properties")
+        total = properties.num_rows
+        available = _count_where(properties, "is_available", True)
+        return {
+            "total_properties": total,
+            "available_now": available,
+            "currently_rented": total - available,
+            "availability_rate": round(available / total * 100, 2) if total > 0 else 0,
+            "by_type": [
+                {"type": r["property_type"] or "Unknown", "available": r["is_available"], "count": r["id_count"]}
+                for r in _rows(properties, ["property_type", "is_available"])
+            ],
+        }
+
+    def lead_insights(self, start_date: datetime, end_date: datetime) -> dict:
+        leads = self.table("leads")
+        total_leads = leads.num_rows
+        converted = _count_where(leads, "status", "converted")
+        return {
+            "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
+            "total_leads": total_leads,
+            "leads_in_period": _since(leads, "created_at", start_date, end_date).num_rows,
+            "converted_leads": converted,
+            "conversion_rate": round(converted / total_leads * 100, 2) if total_leads > 0 else 0,
+            "by_status": [{"status": r["status"] or "Unknown", "count": r["id_count"]} for r in _rows(leads, ["status"])],
+            "by_source": [{"source": r["source"] or "Unknown", "count": r["id_count"]} for r in _rows(leads, ["source"])],
+        }
+
+    def listing_performance(self, start_date: datetime, end_date: datetime, limit: int = TOP_LISTINGS) -> dict:
+        properties, leads = self.table("properties"), self.table("leads")
+        leads = leads.filter(pc.is_valid(leads["property_id"]))
+        # Whole UTC days, like the per-property daily buckets
+        first = datetime.combine(start_date.date(), datetime.min.time())
+        last = datetime.combine(end_date.date() + timedelta(days=1), datetime.min.time()) - timedelta(microseconds=1)
+        today = datetime.combine(creation_day(), datetime.min.time())
+        window = _lead_counts(_since(leads, "created_at", first, last))
+        totals = _lead_counts(leads)
+        week = _lead_counts(_since(leads, "created_at", today - timedelta(days=6)))
+        month = _lead_counts(_since(leads, "created_at", today - timedelta(days=29)))
+
+        existing = set(properties["id"].to_pylist())
+
+        def ranked(counts):
+            return sorted((pid for pid in counts if pid in existing), key=lambda pid: (-counts[pid][0], -pid))[:limit]
+
+        top, top_all_time = ranked(window), ranked(totals)
+        details = {
+            r["id"]: r
+            for r in properties.filter(pc.is_in(properties["id"], value_set=pa.array(top + top_all_time, pa.int64())))
+            .select(["id", "title", "location"]).to_pylist()
+        }
+        return {
+            "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
+            "top_listings": [
+                {
+                    "property_id": pid,
+                    "title": details[pid]["title"],
+                    "location": details[pid]["location"],
+                    "leads": window[pid][0],
+                    "conversions": window[pid][1],
+                    "total_leads": totals[pid][0],
+                    "leads_last_7_days": week.get(pid, (0, 0))[0],
+                    "leads_last_30_days": month.get(pid, (0, 0))[0],
+                }
+                for pid in top
+            ],
+            "top_listings_all_time": [
+                {"property_id": pid, "title": details[pid]["title"], "location": details[pid]["location"],
+                 "total_leads": totals[pid][0], "conversions": totals[pid][1]}
+                for pid in top_all_time
+            ],
+        }
+
+    def market_analysis(self) -> dict:
+        properties = self.table("properties")
+        return {
+            "total_properties": properties.num_rows,
+            "property_type_distribution": [
+                {"type": r["property_type"] or "Unknown", "count": r["id_count"]}
+                for r in _rows(properties, ["property_type"])
+            ],
+            "market_summary": "Market analysis based on current property listings.",
+        }
+
+
+def analytics_engine() -> Optional[SnapshotEngine]:
+    """The snapshot engine if ANALYTICS_ENGINE=snapshot and a fresh snapshot exists, else None"""
+    if settings.ANALYTICS_ENGINE != "snapshot" or not snapshot_engine.ready():
+        return None
+    return snapshot_engine
+
+
+snapshot_engine = SnapshotEngine()
+snapshot_exporter = SnapshotExporter()
@@ -0,0 +1,271 @@
+"""
+IndoHomz Availability History
+
+Keeps a time series of property availability:
+- property_availability_events: append-only log, one row per change
+  (previous and new state), written in the same transaction as the change
+  by the availability toggle, soft/hard delete, property create/import and
+  booking create/cancel paths, and pushed to live dashboards on commit
+- daily_availability_snapshot: one row per UTC day with the end-of-day
+  totals, compacted nightly by AvailabilityCompactor
+
+Compaction rolls the live counts back through each later day's net change,
+so it needs no per-property state and catches up on missed nights. Events
+older than AVAILABILITY_EVENT_RETENTION_DAYS are pruned once compacted; the
+trend endpoint reads O(days) snapshot rows.
+"""
+
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import models
+from app.database.connection import SessionLocal
+from app.services.live_events import AVAILABILITY_CHANGED, emit
+
+logger = logging.getLogger(__name__)
+
+# Event reasons
+CREATED = "created"
+TOGGLED = "toggled"
+UPDATED = "updated"
+SOFT_DELETED = "soft_deleted"
+DELETED = "deleted"
+BOOKED = "booked"
+BOOKING_CANCELLED = "booking_cancelled"
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def day_start(day: date) -> datetime:
+    """Midnight UTC at the start of `day` (naive, like the stored timestamps)"""
+    return datetime.combine(day, dt_time.min)
+
+
+# =============================================================================
+# EVENT LOG
+# =============================================================================
+
+def record_availability_change(
+    db: Session,
+    property_id: int,
+    previous: Optional[bool],
+    is_available: Optional[bool],
+    reason: str,
+):
+    """
+    Log a change in the caller's transaction (no-op if nothing changed).
+    previous=None means the property did not exist; is_available=None that it was removed.
+    """
+    if previous == is_available:
+        return
+    db.add(models.PropertyAvailabilityEvent(
+        property_id=property_id, previous=previous, is_available=is_available, reason=reason,
+    ))
+    if previous is not None:  # creations are announced as property.created
+        emit(db, AVAILABILITY_CHANGED, property_id=property_id, previous=previous, is_available=is_available, reason=reason)
+
+
+def record_properties_created(db: Session, slugs: Iterable[str]):
+    """Log creation of bulk-inserted properties with one INSERT ... SELECT"""
+    event = models.PropertyAvailabilityEvent
+    db.execute(
+        insert(event).from_select(
+            ["property_id", "previous", "is_available", "reason"],
+            select(
+                models.Property.id, literal(None), models.Property.is_available, literal(CREATED)
+            ).where(models.Property.slug.in_(list(slugs))),
+        )
+    )
+
+
+# =============================================================================
+# COMPACTION
+# =============================================================================
+
+def _as_date(value) -> date:
+    # SQLite's date() returns text, Postgres a date
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def daily_deltas(db: Session, since: date) -> Dict[date, Tuple[int, int, int]]:
+    """(total change, available change, events) per day from `since` on"""
+    event = models.PropertyAvailabilityEvent
+    day = func.date(event.created_at)
+    rows = db.execute(
+        select(
+            day,
+            func.sum(case((event.is_available.isnot(None), 1), else_=0) - case((event.previous.isnot(None), 1), else_=0)),
+            func.sum(case((event.is_available.is_(True), 1), else_=0) - case((event.previous.is_(True), 1), else_=0)),
+            func.count(),
+        )
+        .where(event.created_at >= day_start(since))
+        .group_by(day)
+    ).all()
+    return {_as_date(d): (int(total), int(available), count) for d, total, available, count in rows}
+
+
+def compact_availability(
+    db: Session,
+    today: Optional[date] = None,
+    max_days: int = settings.AVAILABILITY_EVENT_RETENTION_DAYS,
+) -> List[date]:
+    """
+    Write snapshots for every finished day not yet snapshotted (at most
+    max_days back). Returns the days covered. Every worker runs this at
+    startup and nightly; days another worker already wrote are skipped.
+    """
+    today = today or utc_today()
+    snapshot = models.DailyAvailabilitySnapshot
+    last = db.query(func.max(snapshot.day)).scalar()
+    if last is not None:
+        first = _as_date(last) + timedelta(days=1)
+    else:
+        # First run: history starts with the oldest logged event
+        oldest = db.query(func.min(models.PropertyAvailabilityEvent.created_at)).scalar()
+        first = _as_date(str(oldest)[:10]) if oldest else today - timedelta(days=1)
+    first = max(first, today - timedelta(days=max_days))
+    if first >= today:
+        return []
+
+    total = db.query(func.count(models.Property.id)).scalar() or 0
+    available = db.query(func.count(models.Property.id)).filter(models.Property.is_available == True).scalar() or 0
+    deltas = daily_deltas(db, first)
+
+    # Walk back from now: the end of day D is the live state minus every later day's change
+    rows = []
+    day = today
+    while day > first:
+        total_delta, available_delta, _ = deltas.get(day, (0, 0, 0))
+        total -= total_delta
+        available -= available_delta
+        day -= timedelta(days=1)
+        rows.append({
+            "day": day,
+            "total_properties": total,
+            "available_properties": available,
+            "changes": deltas.get(day, (0, 0, 0))[2],
+        })
+    if rows:
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        db.execute(dialect.insert(snapshot).on_conflict_do_nothing(index_elements=[snapshot.day]), rows)
+    db.commit()
+    return sorted(row["day"] for row in rows)
+
+
+def prune_events(
+    db: Session,
+    today: Optional[date] = None,
+    retention_days: int = settings.AVAILABILITY_EVENT_RETENTION_DAYS,
+) -> int:
+    """Delete events older than the retention window whose days are compacted"""
+    today = today or utc_today()
+    compacted = db.query(func.max(models.DailyAvailabilitySnapshot.day)).scalar()
+    if compacted is None:
+        return 0
+    cutoff = min(today - timedelta(days=retention_days), _as_date(compacted) + timedelta(days=1))
+    event = models.PropertyAvailabilityEvent
+    result = db.execute(delete(event).where(event.created_at < day_start(cutoff)))
+    db.commit()
+    return result.rowcount
+
+
+def availability_trend(db: Session, days: int, today: Optional[date] = None) -> List[dict]:
+    """Daily points for the last `days` days (snapshots, then today from the live table)"""
+    today = today or utc_today()
+    snapshot = models.DailyAvailabilitySnapshot
+    rows = db.query(snapshot).filter(snapshot.day >= today - timedelta(days=days - 1)).order_by(snapshot.day).all()
+    series = [
+        availability_point(_as_date(row.day), row.total_properties, row.available_properties, row.changes)
+        for row in rows
+    ]
+
+    event = models.PropertyAvailabilityEvent
+    total = db.query(func.count(models.Property.id)).scalar() or 0
+    available = db.query(func.count(models.Property.id)).filter(models.Property.is_available == True).scalar() or 0
+    changes = db.query(func.count(event.id)).filter(event.created_at >= day_start(today)).scalar() or 0
+    series.append(availability_point(today, total, available, changes))
+    return series
+
+
+def availability_point(day: date, total: int, available: int, changes: int) -> dict:
+    return {
+        "date": day.isoformat(),
+        "total_properties": total,
+        "available_properties": available,
+        "availability_rate": round(available / total * 100, 2) if total > 0 else 0,
+        "changes": changes,
+    }
+
+
+# =============================================================================
+# NIGHTLY COMPACTOR
+# =============================================================================
+
+class AvailabilityCompactor:
+    """Compacts finished days into snapshots and prunes old events, once per UTC night"""
+
+    def __init__(
+        self,
+        run_after: timedelta = timedelta(minutes=5),
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.run_after = run_after  # past midnight, so late writes for the day have landed
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"runs": 0, "snapshots": 0, "pruned": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the nightly task (must be called from the running event loop)"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception:
+                logger.exception("Availability compaction failed")
+            await asyncio.sleep(self.seconds_until_next_run())
+
+    def seconds_until_next_run(self, now: Optional[datetime] = None) -> float:
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        next_run = day_start(now.date() + timedelta(days=1)) + self.run_after
+        return (next_run - now).total_seconds()
+
+    def run_once(self, today: Optional[date] = None):
+        """Catch up on snapshots, then prune"""
+        db = self.session_factory()
+        try:
+            written = compact_availability(db, today)
+            pruned = prune_events(db, today)
+        finally:
+            db.close()
+        self.stats["runs"] += 1
+        self.stats["snapshots"] += len(written)
+        self.stats["pruned"] += pruned
+
+
+availability_compactor = AvailabilityCompactor()
@@ -0,0 +1,264 @@
+"""
+IndoHomz Booking Calendar
+
+In-memory interval index over active bookings, rebuilt from the bookings
+table. Used for:
+- overlap checks when a booking is created or its dates change
+- the available_between listing/search filter (booked property IDs for a range)
+
+Per property, intervals are half-open [check_in, check_out) kept sorted by
+start with a running maximum of ends, so "does anything overlap [s, e)?" is
+one bisect plus one lookup: O(log n). Open-ended bookings (no check_out)
+run to the end of time.
+
+Each worker holds its own copy; it is updated on writes made through
+BookingService and rebuilt after BOOKING_CALENDAR_TTL seconds so bookings
+written by other workers are picked up. Every booking write bumps
+properties.version, so overlap checks given the property's current version
+reload that property first when the copy is behind; the check is then exact
+for that version, and BookingService's conditional UPDATE ... WHERE
+version = :v makes it stick.
+"""
+
+import bisect
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import models
+
+# Statuses that no longer hold the property
+INACTIVE_BOOKING_STATUSES = ("cancelled",)
+
+OPEN_ENDED = datetime.max
+
+
+class BookingConflictError(Exception):
+    """Raised when a booking overlaps an existing booking for the same property"""
+
+    def __init__(self, property_id: int, conflicting_booking_id: int):
+        self.property_id = property_id
+        self.conflicting_booking_id = conflicting_booking_id
+        super().__init__(
+            f"Property {property_id} is already booked for these dates (booking {conflicting_booking_id})"
+        )
+
+
+class PropertyVersionConflict(Exception):
+    """Raised when a property changed since the version the caller read"""
+
+    def __init__(self, property_id: int, expected_version: Optional[int] = None):
+        self.property_id = property_id
+        self.expected_version = expected_version
+        super().__init__(
+            f"Property {property_id} was modified concurrently"
+            + (f" (expected version {expected_version})" if expected_version is not None else "")
+        )
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Compare timestamps in naive UTC (SQLite drops tzinfo on the way back)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_date_range(value: str) -> Tuple[date, date]:
+    """
+    Parse "YYYY-MM-DD,YYYY-MM-DD" (both days inclusive).
+
+    Raises ValueError on bad input.
+    """
+    parts = [part.strip() for part in value.split(",")]
+    if len(parts) != 2:
+        raise ValueError("available_between must be 'start,end' (YYYY-MM-DD,YYYY-MM-DD)")
+    start, end = (date.fromisoformat(part) for part in parts)
+    if end < start:
+        raise ValueError("available_between end date is before start date")
+    return start, end
+
+
+def date_range_interval(start: date, end: date) -> Tuple[datetime, datetime]:
+    """Inclusive date range -> half-open datetime interval"""
+    return datetime.combine(start, dt_time.min), datetime.combine(end + timedelta(days=1), dt_time.min)
+
+
+class PropertyIntervals:
+    """Sorted intervals for one property with a prefix maximum of end times"""
+
+    __slots__ = ("starts", "ends", "ids", "max_ends")
+
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        self.ids: List[int] = []
+        self.max_ends: List[datetime] = []
+
+    def add(self, start: datetime, end: datetime, booking_id: int):
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, booking_id)
+        self._rebuild_max_ends(i)
+
+    def remove(self, booking_id: int) -> bool:
+        try:
+            i = self.ids.index(booking_id)
+        except ValueError:
+            return False
+        del self.starts[i], self.ends[i], self.ids[i]
+        self._rebuild_max_ends(i)
+        return True
+
+    def _rebuild_max_ends(self, from_index: int):
+        del self.max_ends[from_index:]
+        running = self.max_ends[-1] if self.max_ends else None
+        for end in self.ends[from_index:]:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+
+    def overlapping(self, start: datetime, end: datetime, exclude_id: Optional[int] = None) -> Optional[int]:
+        """ID of a booking overlapping [start, end), or None"""
+        # Only intervals starting before `end` can overlap
+        i = bisect.bisect_left(self.starts, end)
+        if i == 0 or self.max_ends[i - 1] <= start:
+            return None
+        # Walk back from the latest candidate; stops at the first real overlap
+        for j in range(i - 1, -1, -1):
+            if self.ends[j] > start and self.ids[j] != exclude_id:
+                return self.ids[j]
+            if self.max_ends[j] <= start:
+                break
+        return None
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class BookingCalendar:
+    """Per-property interval index over active bookings"""
+
+    def __init__(self, ttl: int = settings.BOOKING_CALENDAR_TTL):
+        self.ttl = ttl
+        self._properties: Dict[int, PropertyIntervals] = {}
+        self._versions: Dict[int, int] = {}  # property version each entry is exact for
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def interval(check_in: datetime, check_out: Optional[datetime]) -> Tuple[datetime, datetime]:
+        start = to_naive_utc(check_in)
+        end = to_naive_utc(check_out) if check_out else OPEN_ENDED
+        return start, end
+
+    @staticmethod
+    def _active_bookings(db: Session, property_id: Optional[int] = None):
+        query = db.query(
+            models.Booking.id,
+            models.Booking.property_id,
+            models.Booking.check_in,
+            models.Booking.check_out,
+        ).filter(
+            models.Booking.status.notin_(INACTIVE_BOOKING_STATUSES)
+        )
+        if property_id is not None:
+            query = query.filter(models.Booking.property_id == property_id)
+        return query.order_by(models.Booking.check_in).all()
+
+    def rebuild(self, db: Session):
+        """Reload every active booking from the database"""
+        properties: Dict[int, PropertyIntervals] = {}
+        for booking_id, property_id, check_in, check_out in self._active_bookings(db):
+            start, end = self.interval(check_in, check_out)
+            properties.setdefault(property_id, PropertyIntervals()).add(start, end, booking_id)
+
+        with self._lock:
+            self._properties = properties
+            # Versions are not read here; the first versioned check per property reloads it
+            self._versions = {}
+            self._loaded_at = time.monotonic()
+
+    def reload_property(self, db: Session, property_id: int, version: int):
+        """Reload one property's bookings, read at (or after) the given version"""
+        intervals = PropertyIntervals()
+        for booking_id, _, check_in, check_out in self._active_bookings(db, property_id):
+            start, end = self.interval(check_in, check_out)
+            intervals.add(start, end, booking_id)
+        with self._lock:
+            self._properties[property_id] = intervals
+            self._versions[property_id] = version
+
+    def ensure_loaded(self, db: Session):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.rebuild(db)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+            self._versions = {}
+
+    def find_conflict(
+        self,
+        db: Session,
+        property_id: int,
+        check_in: datetime,
+        check_out: Optional[datetime],
+        exclude_booking_id: Optional[int] = None,
+        version: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        ID of an active booking overlapping the given stay, or None.
+
+        With the property's current version the answer is exact (the
+        property is reloaded if this copy is behind); without it, it is as
+        fresh as the last rebuild.
+        """
+        self.ensure_loaded(db)
+        if version is not None and self._versions.get(property_id) != version:
+            self.reload_property(db, property_id, version)
+        start, end = self.interval(check_in, check_out)
+        with self._lock:
+            intervals = self._properties.get(property_id)
+            if intervals is None:
+                return None
+            return intervals.overlapping(start, end, exclude_booking_id)
+
+    def booked_property_ids(self, db: Session, start: date, end: date) -> Set[int]:
+        """Properties with an active booking overlapping the inclusive date range"""
+        self.ensure_loaded(db)
+        range_start, range_end = date_range_interval(start, end)
+        with self._lock:
+            return {
+                property_id
+                for property_id, intervals in self._properties.items()
+                if intervals.overlapping(range_start, range_end) is not None
+            }
+
+    def add(self, booking: models.Booking, version: Optional[int] = None):
+        """Record a committed booking; version is the property version it committed at"""
+        with self._lock:
+            if booking.status not in INACTIVE_BOOKING_STATUSES:
+                start, end = self.interval(booking.check_in, booking.check_out)
+                self._properties.setdefault(booking.property_id, PropertyIntervals()).add(start, end, booking.id)
+            self._set_version(booking.property_id, version)
+
+    def remove(self, booking: models.Booking, version: Optional[int] = None):
+        with self._lock:
+            intervals = self._properties.get(booking.property_id)
+            if intervals is not None:
+                intervals.remove(booking.id)
+            self._set_version(booking.property_id, version)
+
+    def _set_version(self, property_id: int, version: Optional[int]):
+        # Unknown version: the next versioned check reloads this property
+        if version is None:
+            self._versions.pop(property_id, None)
+        else:
+            self._versions[property_id] = version
+
+
+booking_calendar = BookingCalendar()
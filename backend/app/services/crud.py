@@ -3,16 +3,37 @@ IndoHomz CRUD Services
 Handles all database operations for properties, leads, and bookings.
 """
 
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import and_, or_, func, desc, select
-from typing import List, Optional, Dict, Tuple
-from datetime import datetime
+from sqlalchemy.orm import Session, selectinload, load_only
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy import and_, or_, func, desc, select, bindparam, insert, update, case
+from sqlalchemy.exc import SQLAlchemyError
+from pydantic import ValidationError
+from typing import List, Optional, Dict, Tuple, Iterable, Set
+from datetime import date, datetime, timezone
+from itertools import islice
+from collections import Counter
+import json
 import re
+import uuid
 
 from app.database import models
 from app.schemas import schemas
 from app.core.cache import cache, cached, invalidate_cache
 from app.core.config import settings
+from app.services.search_service import FTS5, fts_column_query, fts_match_clause, fts_usable, search_service
+from app.services.booking_calendar import BookingCalendar, booking_calendar, BookingConflictError, PropertyVersionConflict
+from app.services.notifications import lead_outbox_rows
+from app.services.dashboard import DASHBOARD_CACHE_KEY
+from app.services.lead_funnel import creation, record_transitions, status_change, status_value
+from app.services.listing_stats import forget_property, record_lead_changes
+from app.services.property_views import forget_property_views
+from app.services.live_events import (
+    emit, LEAD_CREATED, LEAD_STATUS_CHANGED, LEADS_STATUS_CHANGED, PROPERTIES_IMPORTED, PROPERTY_CREATED,
+)
+from app.services.availability_history import (
+    record_availability_change, record_properties_created,
+    BOOKED, BOOKING_CANCELLED, CREATED, DELETED, SOFT_DELETED, TOGGLED, UPDATED,
+)
 
 
 def generate_slug(title: str) -> str:
@@ -24,6 +45,79 @@ def generate_slug(title: str) -> str:
     return slug
 
 
+def parse_display_price(price: Optional[str]) -> Optional[float]:
+    """Monthly rent in ₹ from a display price ("₹15,000/month", "₹1.5L", "45K"), else None"""
+    if not price:
+        return None
+    match = re.search(r"(\d+(?:\.\d+)?)\s*(l|lakh|lac|k)?\b", price.replace(",", "").lower())
+    if not match:
+        return None
+    multiplier = {"k": 1000, "l": 100000, "lakh": 100000, "lac": 100000}.get(match.group(2), 1)
+    return float(match.group(1)) * multiplier
+
+
+def allocate_unique_slugs(db: Session, titles: List[str]) -> List[str]:
+    """
+    Allocate unique slugs for a batch of titles with a single query.
+    
+    Follows the same base, base-1, base-2 ... scheme as create_property,
+    and also keeps slugs unique within the batch itself.
+    """
+    bases = [generate_slug(title or "property") or "property" for title in titles]
+    unique_bases = set(bases)
+    
+    conditions = [models.Property.slug.in_(unique_bases)]
+    conditions += [
+        models.Property.slug.like(f"{escape_like_pattern(base)}-%", escape='\\')
+        for base in unique_bases
+    ]
+    taken: Set[str] = set(db.execute(select(models.Property.slug).where(or_(*conditions))).scalars())
+    
+    slugs = []
+    for base in bases:
+        slug = base
+        counter = 1
+        while slug in taken:
+            slug = f"{base}-{counter}"
+            counter += 1
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def normalize_import_row(row: dict) -> dict:
+    """
+    Normalize a raw CSV/NDJSON import row into PropertyCreate input.
+    
+    Blank cells fall back to schema defaults. A comma-separated `images`
+    cell becomes a JSON array, and its first entry the main image_url.
+    """
+    data = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == "":
+                continue
+        if value is None:
+            continue
+        data[key.strip()] = value
+    
+    images = data.get("images")
+    if isinstance(images, str) and not images.startswith("["):
+        images = [img.strip() for img in images.split(",") if img.strip()]
+    if isinstance(images, list):
+        data["images"] = json.dumps(images)
+        if images and not data.get("image_url"):
+            data["image_url"] = images[0]
+    
+    if "price_numeric" not in data:
+        data["price_numeric"] = parse_display_price(data.get("price"))
+    
+    return data
+
+
 def escape_like_pattern(pattern: str) -> str:
     r"""
     Escape special characters in SQL LIKE patterns to prevent injection.
@@ -38,6 +132,138 @@ def escape_like_pattern(pattern: str) -> str:
     return pattern
 
 
+# Columns needed to render a property card in grid/list views.
+# Heavy text columns (description, images, highlights) stay deferred.
+PROPERTY_CARD_COLUMNS = (
+    models.Property.id,
+    models.Property.slug,
+    models.Property.title,
+    models.Property.price,
+    models.Property.price_numeric,
+    models.Property.location,
+    models.Property.area,
+    models.Property.city,
+    models.Property.property_type,
+    models.Property.bedrooms,
+    models.Property.bathrooms,
+    models.Property.area_sqft,
+    models.Property.furnishing,
+    models.Property.image_url,
+    models.Property.amenities,
+    models.Property.is_available,
+    models.Property.available_from,
+    models.Property.created_at,
+)
+
+
+def apply_property_view(query, view: str = "full"):
+    """Restrict a Property query to the card projection when view == 'card'"""
+    if view == "card":
+        return query.options(load_only(*PROPERTY_CARD_COLUMNS))
+    return query
+
+
+# =============================================================================
+# STATEMENT CACHE (hot property query shapes)
+# =============================================================================
+
+# Filter name -> WHERE clause factory. Values are always bound parameters,
+# so one statement serves every request with the same set of filters.
+PROPERTY_LIST_FILTERS = {
+    "is_available": lambda: models.Property.is_available == bindparam("is_available"),
+    "city": lambda: models.Property.city.ilike(bindparam("city"), escape='\\'),
+    "location": lambda: models.Property.location.ilike(bindparam("location"), escape='\\'),
+    # SQLite FTS5 trigram equivalents of the city/location substring filters
+    "city_fts": lambda: fts_match_clause("city_fts"),
+    "location_fts": lambda: fts_match_clause("location_fts"),
+    "property_type": lambda: models.Property.property_type == bindparam("property_type"),
+    "min_bedrooms": lambda: models.Property.bedrooms >= bindparam("min_bedrooms"),
+    "max_price": lambda: models.Property.price_numeric <= bindparam("max_price"),
+    # Properties booked during the requested range (from the booking calendar)
+    "booked_ids": lambda: models.Property.id.not_in(bindparam("booked_ids", expanding=True)),
+}
+
+
+class PropertyStatementCache:
+    """
+    Caches parameterized SELECT / COUNT statements per query shape.
+    
+    A shape is the view plus the set of filters present, so there are at most
+    2 * 2^len(PROPERTY_LIST_FILTERS) entries. Reusing the same statement object
+    skips Query construction and lets SQLAlchemy's compiled cache hit directly.
+    """
+    
+    def __init__(self):
+        self._list_statements = {}
+        self._count_statements = {}
+    
+    def list_statement(self, view: str, filters: frozenset):
+        key = (view, filters)
+        stmt = self._list_statements.get(key)
+        if stmt is None:
+            stmt = select(models.Property).where(
+                *(PROPERTY_LIST_FILTERS[name]() for name in sorted(filters))
+            ).order_by(
+                desc(models.Property.created_at)
+            ).offset(bindparam("skip")).limit(bindparam("limit"))
+            if view == "card":
+                stmt = stmt.options(load_only(*PROPERTY_CARD_COLUMNS))
+            self._list_statements[key] = stmt
+        return stmt
+    
+    def count_statement(self, filters: frozenset):
+        stmt = self._count_statements.get(filters)
+        if stmt is None:
+            stmt = select(func.count(models.Property.id)).where(
+                *(PROPERTY_LIST_FILTERS[name]() for name in sorted(filters))
+            )
+            self._count_statements[filters] = stmt
+        return stmt
+
+
+property_statements = PropertyStatementCache()
+
+
+def build_property_filter_params(
+    is_available: Optional[bool] = None,
+    city: Optional[str] = None,
+    location: Optional[str] = None,
+    property_type: Optional[str] = None,
+    min_bedrooms: Optional[int] = None,
+    max_price: Optional[int] = None,
+    booked_ids: Optional[Iterable[int]] = None,
+    fts: bool = False,
+) -> Dict[str, object]:
+    """
+    Map get_properties() arguments to bound parameter values (present filters only).
+    
+    With fts=True, city/location substring filters go through the FTS5 index
+    when the value is long enough for trigram matching.
+    """
+    params = {}
+    if is_available is not None:
+        params["is_available"] = is_available
+    if city:
+        if fts and fts_usable(city, phrase=True):
+            params["city_fts"] = fts_column_query("city", city)
+        else:
+            params["city"] = f"%{escape_like_pattern(city)}%"
+    if location:
+        if fts and fts_usable(location, phrase=True):
+            params["location_fts"] = fts_column_query("location", location)
+        else:
+            params["location"] = f"%{escape_like_pattern(location)}%"
+    if property_type:
+        params["property_type"] = property_type
+    if min_bedrooms is not None:
+        params["min_bedrooms"] = min_bedrooms
+    if max_price is not None:
+        params["max_price"] = max_price
+    if booked_ids:
+        params["booked_ids"] = sorted(booked_ids)
+    return params
+
+
 # =============================================================================
 # PROPERTY SERVICE
 # =============================================================================
@@ -64,12 +290,20 @@ class PropertyService:
         property_type: Optional[str] = None,
         min_bedrooms: Optional[int] = None,
         max_price: Optional[int] = None,
+        available_between: Optional[Tuple[date, date]] = None,
+        view: str = "full",
     ) -> Tuple[List[models.Property], int]:
-        """Get properties with optional filters and total count (with caching)"""
+        """
+        Get properties with optional filters and total count (with caching).
+        
+        view="card" loads only PROPERTY_CARD_COLUMNS; heavy columns stay deferred.
+        available_between=(start, end) drops properties booked on any day in the range.
+        """
         
         # Generate cache key
         cache_key = cache._make_key(
             "properties:list",
+            view=view,
             skip=skip,
             limit=limit,
             available=is_available,
@@ -77,7 +311,8 @@ class PropertyService:
             location=location,
             type=property_type,
             bedrooms=min_bedrooms,
-            price=max_price
+            price=max_price,
+            between=available_between,
         )
         
         # Try cache first
@@ -85,34 +320,27 @@ class PropertyService:
         if cached_result:
             return cached_result["items"], cached_result["total"]
         
-        # Build query with eager loading to prevent N+1
-        query = db.query(models.Property)
-        count_query = db.query(func.count(models.Property.id))
-        
-        if is_available is not None:
-            query = query.filter(models.Property.is_available == is_available)
-            count_query = count_query.filter(models.Property.is_available == is_available)
-        if city:
-            escaped_city = escape_like_pattern(city)
-            query = query.filter(models.Property.city.ilike(f"%{escaped_city}%", escape='\\'))
-            count_query = count_query.filter(models.Property.city.ilike(f"%{escaped_city}%", escape='\\'))
-        if location:
-            escaped_location = escape_like_pattern(location)
-            query = query.filter(models.Property.location.ilike(f"%{escaped_location}%", escape='\\'))
-            count_query = count_query.filter(models.Property.location.ilike(f"%{escaped_location}%", escape='\\'))
-        if property_type:
-            query = query.filter(models.Property.property_type == property_type)
-            count_query = count_query.filter(models.Property.property_type == property_type)
-        if min_bedrooms is not None:
-            query = query.filter(models.Property.bedrooms >= min_bedrooms)
-            count_query = count_query.filter(models.Property.bedrooms >= min_bedrooms)
+        # Reuse the cached statement for this filter shape; only params vary
+        params = build_property_filter_params(
+            is_available=is_available,
+            city=city,
+            location=location,
+            property_type=property_type,
+            min_bedrooms=min_bedrooms,
+            max_price=max_price,
+            booked_ids=self._booked_ids(db, available_between),
+            fts=search_service.mode(db) == FTS5,
+        )
+        shape = frozenset(params)
         
         # Get total count
-        total = count_query.scalar() or 0
+        total = db.execute(property_statements.count_statement(shape), params).scalar() or 0
         
         # Order by newest first
-        query = query.order_by(desc(models.Property.created_at))
-        items = query.offset(skip).limit(limit).all()
+        items = db.execute(
+            property_statements.list_statement(view, shape),
+            {**params, "skip": skip, "limit": limit},
+        ).scalars().all()
         
         # Cache result
         result = {"items": items, "total": total}
@@ -125,26 +353,34 @@ class PropertyService:
         db: Session,
         is_available: Optional[bool] = None,
         city: Optional[str] = None,
+        available_between: Optional[Tuple[date, date]] = None,
     ) -> int:
         """Get total count of properties with filters"""
-        query = db.query(func.count(models.Property.id))
-        
-        if is_available is not None:
-            query = query.filter(models.Property.is_available == is_available)
-        if city:
-            escaped_city = escape_like_pattern(city)
-            query = query.filter(models.Property.city.ilike(f"%{escaped_city}%", escape='\\'))
-        
-        return query.scalar() or 0
+        params = build_property_filter_params(
+            is_available=is_available,
+            city=city,
+            booked_ids=self._booked_ids(db, available_between),
+            fts=search_service.mode(db) == FTS5,
+        )
+        stmt = property_statements.count_statement(frozenset(params))
+        return db.execute(stmt, params).scalar() or 0
+    
+    @staticmethod
+    def _booked_ids(db: Session, available_between: Optional[Tuple[date, date]]) -> Optional[Set[int]]:
+        """Property IDs booked during the range, from the in-memory booking calendar"""
+        if available_between is None:
+            return None
+        return booking_calendar.booked_property_ids(db, *available_between)
     
     def get_available_properties(self, db: Session, skip: int = 0, limit: int = 12):
         """Get only available properties (with caching)"""
         return self.get_properties(db, skip=skip, limit=limit, is_available=True)
     
     @cached(ttl=300, key_prefix="properties:featured")
-    def get_featured_properties(self, db: Session, limit: int = 6) -> List[models.Property]:
+    def get_featured_properties(self, db: Session, limit: int = 6, view: str = "full") -> List[models.Property]:
         """Get featured/highlighted properties for homepage (cached)"""
-        return db.query(models.Property).filter(
+        query = apply_property_view(db.query(models.Property), view)
+        return query.filter(
             models.Property.is_available == True
         ).order_by(desc(models.Property.created_at)).limit(limit).all()
     
@@ -155,29 +391,20 @@ class PropertyService:
         filters: Optional[dict] = None,
         skip: int = 0,
         limit: int = 12,
+        view: str = "full",
+        available_between: Optional[Tuple[date, date]] = None,
     ) -> List[models.Property]:
         """Search properties by text and filters"""
-        query = db.query(models.Property)
+        query = apply_property_view(db.query(models.Property), view)
         
-        # Text search across multiple fields
+        # Text search across multiple fields (FTS / tsvector index when installed)
         if query_text:
-            escaped_text = escape_like_pattern(query_text)
-            search_term = f"%{escaped_text}%"
-            query = query.filter(
-                or_(
-                    models.Property.title.ilike(search_term, escape='\\'),
-                    models.Property.location.ilike(search_term, escape='\\'),
-                    models.Property.area.ilike(search_term, escape='\\'),
-                    models.Property.amenities.ilike(search_term, escape='\\'),
-                    models.Property.description.ilike(search_term, escape='\\'),
-                )
-            )
+            query = query.filter(search_service.text_match(db, query_text))
         
         # Apply additional filters
         if filters:
             if filters.get("city"):
-                escaped_city = escape_like_pattern(filters['city'])
-                query = query.filter(models.Property.city.ilike(f"%{escaped_city}%", escape='\\'))
+                query = query.filter(search_service.column_contains(db, "city", filters["city"]))
             if filters.get("property_type"):
                 query = query.filter(models.Property.property_type == filters["property_type"])
             if filters.get("bedrooms"):
@@ -185,6 +412,10 @@ class PropertyService:
             if filters.get("is_available") is not None:
                 query = query.filter(models.Property.is_available == filters["is_available"])
         
+        booked_ids = self._booked_ids(db, available_between)
+        if booked_ids:
+            query = query.filter(models.Property.id.not_in(booked_ids))
+        
         return query.offset(skip).limit(limit).all()
     
     @invalidate_cache("properties:*")
@@ -202,12 +433,96 @@ class PropertyService:
             slug = f"{base_slug}-{counter}"
             counter += 1
         
+        if data.get("price_numeric") is None:
+            data["price_numeric"] = parse_display_price(data.get("price"))
+        
         db_property = models.Property(**data, slug=slug)
         db.add(db_property)
+        db.flush()
+        record_availability_change(db, db_property.id, None, db_property.is_available, CREATED)
+        emit(
+            db, PROPERTY_CREATED, property_id=db_property.id, city=db_property.city,
+            property_type=db_property.property_type, is_available=db_property.is_available,
+        )
         db.commit()
         db.refresh(db_property)
         return db_property
     
+    @invalidate_cache("properties:*")
+    def bulk_import_properties(
+        self,
+        db: Session,
+        rows: Iterable[Tuple[int, Optional[dict], Optional[str]]],
+        batch_size: int = settings.BULK_IMPORT_BATCH_SIZE,
+    ) -> dict:
+        """
+        Import properties in batches (invalidates cache once at the end).
+        
+        `rows` yields (row_number, raw_row, parse_error) tuples and is consumed
+        lazily, so memory stays bounded by batch_size. Each batch allocates its
+        slugs with one query, inserts with a single executemany and commits.
+        """
+        result = {
+            "total_rows": 0,
+            "inserted": 0,
+            "failed": 0,
+            "batches": 0,
+            "errors": [],
+            "errors_truncated": False,
+        }
+        
+        def record_error(row_number: int, title: Optional[str], error: str):
+            result["failed"] += 1
+            if len(result["errors"]) < settings.BULK_IMPORT_MAX_ERRORS:
+                result["errors"].append({"row": row_number, "title": title, "error": error})
+            else:
+                result["errors_truncated"] = True
+        
+        row_iter = iter(rows)
+        while True:
+            chunk = list(islice(row_iter, batch_size))
+            if not chunk:
+                break
+            result["total_rows"] += len(chunk)
+            
+            # Validate the whole chunk before touching the database
+            valid: List[Tuple[int, dict]] = []
+            for row_number, raw, parse_error in chunk:
+                if parse_error:
+                    record_error(row_number, None, parse_error)
+                    continue
+                data = normalize_import_row(raw)
+                try:
+                    valid.append((row_number, schemas.PropertyCreate(**data).model_dump()))
+                except ValidationError as e:
+                    message = "; ".join(
+                        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+                        for err in e.errors()
+                    )
+                    record_error(row_number, data.get("title"), message)
+            
+            if not valid:
+                continue
+            
+            try:
+                slugs = allocate_unique_slugs(db, [data["title"] for _, data in valid])
+                db.execute(
+                    insert(models.Property),
+                    [{**data, "slug": slug} for (_, data), slug in zip(valid, slugs)],
+                )
+                record_properties_created(db, slugs)
+                emit(db, PROPERTIES_IMPORTED, count=len(valid))
+                db.commit()
+                result["inserted"] += len(valid)
+                result["batches"] += 1
+            except SQLAlchemyError as e:
+                db.rollback()
+                error = f"Batch insert failed: {e.__class__.__name__}"
+                for row_number, data in valid:
+                    record_error(row_number, data.get("title"), error)
+        
+        return result
+    
     @invalidate_cache("properties:*")
     def update_property(
         self,
@@ -215,32 +530,88 @@ class PropertyService:
         property_id: int,
         property_update: schemas.PropertyUpdate
     ) -> Optional[models.Property]:
-        """Update an existing property (invalidates cache)"""
+        """
+        Update an existing property (invalidates cache).
+        
+        Raises PropertyVersionConflict if property_update.version is stale or
+        another write lands between this read and the flush.
+        """
         db_property = self.get_property(db, property_id)
         if not db_property:
             return None
         
         update_data = property_update.model_dump(exclude_unset=True)
+        expected_version = update_data.pop("version", None)
+        if expected_version is not None and expected_version != db_property.version:
+            raise PropertyVersionConflict(property_id, expected_version)
         
         # Update slug if title changed
         if "title" in update_data:
             update_data["slug"] = generate_slug(update_data["title"])
         
+        # Keep the numeric price (analytics, filters, sorting) in step with the display price
+        if "price" in update_data and update_data.get("price_numeric") is None:
+            update_data["price_numeric"] = parse_display_price(update_data["price"])
+        
+        was_available = db_property.is_available
         for field, value in update_data.items():
             setattr(db_property, field, value)
+        record_availability_change(db, property_id, was_available, db_property.is_available, UPDATED)
         
-        db.commit()
+        try:
+            db.commit()
+        except StaleDataError:
+            db.rollback()
+            raise PropertyVersionConflict(property_id, expected_version)
         db.refresh(db_property)
+        return db_property
+    
     @invalidate_cache("properties:*")
-    def delete_property(self, db: Session, property_id: int) -> bool:
-        """Soft delete a property (mark as unavailable, invalidates cache)"""
-        db_property = self.get_property(db, property_id)
-        if not db_property:
-            return False
+    def set_availability(
+        self,
+        db: Session,
+        property_id: int,
+        is_available: bool,
+        expected_version: Optional[int] = None,
+        reason: str = TOGGLED,
+    ) -> Optional[int]:
+        """
+        Flip availability with one conditional UPDATE ... WHERE version = :v.
         
-        db_property.is_available = False
+        Without expected_version the current version is used, so only a write
+        racing this call conflicts. The change is logged to the availability
+        history under `reason`. Returns the new version, or None if the
+        property does not exist. Raises PropertyVersionConflict.
+        """
+        current = db.query(models.Property.version, models.Property.is_available).filter(
+            models.Property.id == property_id
+        ).first()
+        if current is None:
+            return None
+        version = current.version
+        if expected_version is not None and expected_version != version:
+            raise PropertyVersionConflict(property_id, expected_version)
+        
+        result = db.execute(
+            update(models.Property)
+            .where(models.Property.id == property_id, models.Property.version == version)
+            .values(is_available=is_available, version=models.Property.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.rollback()
+            if self.get_property(db, property_id) is None:
+                return None
+            raise PropertyVersionConflict(property_id, expected_version)
+        # The version matched, so the state read with it is the previous one
+        record_availability_change(db, property_id, current.is_available, is_available, reason)
         db.commit()
-        return True
+        return version + 1
+    
+    @invalidate_cache("properties:*")
+    def delete_property(self, db: Session, property_id: int) -> bool:
+        """Soft delete a property (mark as unavailable, invalidates cache)"""
+        return self.set_availability(db, property_id, False, reason=SOFT_DELETED) is not None
     
     @invalidate_cache("properties:*")
     def hard_delete_property(self, db: Session, property_id: int) -> bool:
@@ -249,6 +620,9 @@ class PropertyService:
         if not db_property:
             return False
         
+        record_availability_change(db, property_id, db_property.is_available, None, DELETED)
+        forget_property(db, property_id)
+        forget_property_views(db, property_id)
         db.delete(db_property)
         db.commit()
         return True
@@ -286,6 +660,22 @@ class PropertyService:
 # LEAD SERVICE
 # =============================================================================
 
+def lead_filter_clauses(filters: dict) -> list:
+    """WHERE clauses for a LeadBulkFilter-shaped dict (unset keys are ignored)"""
+    clauses = []
+    for field in ("status", "source", "property_id", "assigned_to"):
+        if filters.get(field) is not None:
+            clauses.append(getattr(models.Lead, field) == filters[field])
+    if filters.get("archived") is not None:
+        archived_at = models.Lead.archived_at
+        clauses.append(archived_at.isnot(None) if filters["archived"] else archived_at.is_(None))
+    if filters.get("created_after") is not None:
+        clauses.append(models.Lead.created_at >= filters["created_after"])
+    if filters.get("created_before") is not None:
+        clauses.append(models.Lead.created_at < filters["created_before"])
+    return clauses
+
+
 class LeadService:
     """Service for Lead/Inquiry CRUD operations"""
     
@@ -293,6 +683,10 @@ class LeadService:
         """Get a single lead by ID"""
         return db.query(models.Lead).filter(models.Lead.id == lead_id).first()
     
+    def get_lead_by_reference(self, db: Session, reference: str) -> Optional[models.Lead]:
+        """Get a lead by its public reference"""
+        return db.query(models.Lead).filter(models.Lead.reference == reference).first()
+    
     def get_leads(
         self,
         db: Session,
@@ -300,16 +694,28 @@ class LeadService:
         limit: int = 50,
         status: Optional[str] = None,
         source: Optional[str] = None,
+        include_archived: bool = False,
+        sort: str = "created_at",
     ) -> List[models.Lead]:
-        """Get leads with optional filters"""
+        """
+        Get leads with optional filters (archived leads hidden by default).
+        
+        sort="score" orders by conversion score (unscored last), newest first within a score.
+        """
         query = db.query(models.Lead)
         
+        if not include_archived:
+            query = query.filter(models.Lead.archived_at.is_(None))
         if status:
             query = query.filter(models.Lead.status == status)
         if source:
             query = query.filter(models.Lead.source == source)
         
-        return query.order_by(desc(models.Lead.created_at)).offset(skip).limit(limit).all()
+        if sort == "score":
+            query = query.order_by(models.Lead.score.desc().nulls_last(), desc(models.Lead.created_at))
+        else:
+            query = query.order_by(desc(models.Lead.created_at))
+        return query.offset(skip).limit(limit).all()
     
     def get_leads_by_property(self, db: Session, property_id: int) -> List[models.Lead]:
         """Get all leads for a specific property"""
@@ -317,14 +723,62 @@ class LeadService:
             models.Lead.property_id == property_id
         ).order_by(desc(models.Lead.created_at)).all()
     
-    def create_lead(self, db: Session, lead_data: schemas.LeadCreate) -> models.Lead:
-        """Create a new lead/inquiry"""
-        db_lead = models.Lead(**lead_data.model_dump(), status="new")
+    @invalidate_cache("leads:*", DASHBOARD_CACHE_KEY)
+    def create_lead(
+        self,
+        db: Session,
+        lead_data: schemas.LeadCreate,
+        reference: Optional[str] = None,
+    ) -> models.Lead:
+        """
+        Create a new lead/inquiry (optionally with a pre-allocated reference).
+        
+        New-lead notifications are queued in the outbox in the same commit.
+        """
+        fields = {**lead_data.model_dump(), "reference": reference or uuid.uuid4().hex}
+        db_lead = models.Lead(**fields, status="new")
         db.add(db_lead)
+        db.add_all(models.NotificationOutbox(**row) for row in lead_outbox_rows(fields))
+        db.flush()
+        record_transitions(db, [creation(db_lead.id, "new")])
+        record_lead_changes(db, [(None, None, (db_lead.property_id, "new"))])
+        emit(
+            db, LEAD_CREATED, lead_id=db_lead.id, reference=db_lead.reference,
+            property_id=db_lead.property_id, status="new", source=db_lead.source,
+        )
         db.commit()
         db.refresh(db_lead)
         return db_lead
     
+    @invalidate_cache("leads:*", DASHBOARD_CACHE_KEY)
+    def merge_duplicate_lead(self, db: Session, reference: str, message: Optional[str] = None) -> bool:
+        """
+        Fold a repeat submission into an existing lead with one UPDATE.
+        
+        Appends the new message while the merged message stays within
+        LEAD_MERGED_MESSAGE_MAX_CHARS (later repeats only count) and bumps
+        submission_count. Returns False if no lead has this reference.
+        """
+        limit = settings.LEAD_MERGED_MESSAGE_MAX_CHARS
+        values = {
+            "submission_count": models.Lead.submission_count + 1,
+            "updated_at": func.now(),
+        }
+        if message:
+            message = message[:limit]
+            appended = "\n\n" + message
+            values["message"] = case(
+                (models.Lead.message.is_(None), message),
+                (func.length(models.Lead.message) + len(appended) <= limit, models.Lead.message + appended),
+                else_=models.Lead.message,
+            )
+        result = db.execute(
+            update(models.Lead).where(models.Lead.reference == reference).values(**values)
+        )
+        db.commit()
+        return result.rowcount > 0
+    
+    @invalidate_cache("leads:*", DASHBOARD_CACHE_KEY)
     def update_lead(
         self,
         db: Session,
@@ -337,26 +791,116 @@ class LeadService:
             return None
         
         update_data = lead_update.model_dump(exclude_unset=True)
+        before = (db_lead.property_id, db_lead.status)
+        if update_data.get("status") is not None:
+            self._record_status_change(db, db_lead, update_data["status"])
         for field, value in update_data.items():
             setattr(db_lead, field, value)
+        self._record_listing_change(db, db_lead, before)
         
         db.commit()
         db.refresh(db_lead)
         return db_lead
     
+    @invalidate_cache("leads:*", DASHBOARD_CACHE_KEY)
     def update_lead_status(self, db: Session, lead_id: int, status: str) -> Optional[models.Lead]:
         """Quick update just the lead status"""
         db_lead = self.get_lead(db, lead_id)
         if not db_lead:
             return None
         
+        before = (db_lead.property_id, db_lead.status)
+        self._record_status_change(db, db_lead, status)
         db_lead.status = status
+        self._record_listing_change(db, db_lead, before)
         db.commit()
         db.refresh(db_lead)
         return db_lead
     
+    def _record_status_change(self, db: Session, db_lead: models.Lead, status: str):
+        """Log a status change (before it is applied) for the funnel analytics"""
+        status = status_value(status)
+        if status == db_lead.status:
+            return
+        now = datetime.now(timezone.utc)
+        record_transitions(db, [status_change(db_lead, status, now)])
+        emit(
+            db, LEAD_STATUS_CHANGED, lead_id=db_lead.id, property_id=db_lead.property_id,
+            from_status=db_lead.status, to_status=status,
+        )
+        db_lead.status_changed_at = now
+    
+    def _record_listing_change(self, db: Session, db_lead: models.Lead, before: tuple):
+        """Move the lead between per-property counters (after its property or status changed)"""
+        after = (db_lead.property_id, status_value(db_lead.status))
+        if after != before:
+            record_lead_changes(db, [(db_lead.created_at, before, after)])
+    
+    @invalidate_cache("leads:*", DASHBOARD_CACHE_KEY)
+    def bulk_update_leads(
+        self,
+        db: Session,
+        changes: dict,
+        ids: Optional[List[int]] = None,
+        filters: Optional[dict] = None,
+    ) -> List[int]:
+        """
+        Apply the same changes to many leads with one set-based UPDATE.
+        
+        Targets `ids` or every lead matching `filters` (see lead_filter_clauses).
+        `changes` may hold status, source, assigned_to and archived. Returns
+        the ids actually updated; lead caches are invalidated once per call.
+        """
+        values = {k: v for k, v in changes.items() if k != "archived"}
+        if "archived" in changes:
+            values["archived_at"] = func.now() if changes["archived"] else None
+        values["updated_at"] = func.now()
+        
+        if ids is not None:
+            conditions = [models.Lead.id.in_(ids)]
+        else:
+            conditions = lead_filter_clauses(filters or {})
+        
+        # Leads whose status actually changes are logged for the funnel analytics
+        moving = []
+        if changes.get("status") is not None:
+            status = status_value(changes["status"])
+            now = datetime.now(timezone.utc)
+            lead = models.Lead
+            moving = db.execute(
+                select(lead.id, lead.property_id, lead.status, lead.created_at, lead.status_changed_at)
+                .where(*conditions, lead.status != status)
+            ).all()
+            values["status_changed_at"] = case((lead.status != status, now), else_=lead.status_changed_at)
+        
+        stmt = update(models.Lead).where(*conditions).values(**values).execution_options(
+            synchronize_session=False
+        )
+        if db.get_bind().dialect.update_returning:
+            updated_ids = db.execute(stmt.returning(models.Lead.id)).scalars().all()
+        else:
+            # No UPDATE ... RETURNING: resolve targets first, update by primary key
+            updated_ids = db.execute(select(models.Lead.id).where(*conditions)).scalars().all()
+            if updated_ids:
+                db.execute(
+                    update(models.Lead).where(models.Lead.id.in_(updated_ids)).values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+        if moving:
+            record_transitions(db, [status_change(row, status, now) for row in moving])
+            record_lead_changes(db, [
+                (row.created_at, (row.property_id, row.status), (row.property_id, status)) for row in moving
+            ])
+            emit(
+                db, LEADS_STATUS_CHANGED, count=len(moving),
+                from_status=dict(Counter(row.status for row in moving)), to_status=status,
+            )
+        db.commit()
+        return list(updated_ids)
+    
+    @cached(ttl=600, key_prefix="leads:stats")
     def get_lead_stats(self, db: Session) -> dict:
-        """Get lead statistics for dashboard"""
+        """Get lead statistics for dashboard (cached)"""
         total = db.query(func.count(models.Lead.id)).scalar() or 0
         
         # Status distribution
@@ -393,6 +937,10 @@ class LeadService:
 class BookingService:
     """Service for Booking CRUD operations"""
     
+    def __init__(self, calendar: BookingCalendar = booking_calendar, version_retries: int = settings.BOOKING_VERSION_RETRIES):
+        self.calendar = calendar
+        self.version_retries = version_retries
+    
     def get_booking(self, db: Session, booking_id: int) -> Optional[models.Booking]:
         """Get a single booking by ID"""
         return db.query(models.Booking).filter(models.Booking.id == booking_id).first()
@@ -418,57 +966,156 @@ class BookingService:
             models.Booking.property_id == property_id
         ).order_by(desc(models.Booking.created_at)).all()
     
-    def create_booking(self, db: Session, booking_data: schemas.BookingCreate) -> models.Booking:
-        """Create a new booking"""
-        # Mark property as unavailable
-        property_obj = db.query(models.Property).filter(
-            models.Property.id == booking_data.property_id
-        ).first()
-        if property_obj:
-            property_obj.is_available = False
+    def _claim_property(
+        self,
+        db: Session,
+        property_id: int,
+        check_in: datetime,
+        check_out: Optional[datetime],
+        exclude_booking_id: Optional[int] = None,
+        **values,
+    ) -> Optional[int]:
+        """
+        Check a stay for overlaps and take the property for it.
+        
+        The overlap check is exact for the version read, and the conditional
+        UPDATE ... WHERE version = :v (plus `values`) only succeeds if no other
+        booking write landed since. On a lost race the check is redone with the
+        new version, up to BOOKING_VERSION_RETRIES times. The caller commits
+        (an availability change is logged in the same transaction).
+        Returns the new version (None if the property does not exist).
+        Raises BookingConflictError or PropertyVersionConflict.
+        """
+        for _ in range(self.version_retries + 1):
+            current = db.query(models.Property.version, models.Property.is_available).filter(
+                models.Property.id == property_id
+            ).first()
+            if current is None:
+                return None
+            version = current.version
+            
+            conflict = self.calendar.find_conflict(
+                db, property_id, check_in, check_out,
+                exclude_booking_id=exclude_booking_id, version=version,
+            )
+            if conflict is not None:
+                raise BookingConflictError(property_id, conflict)
+            
+            result = db.execute(
+                update(models.Property)
+                .where(models.Property.id == property_id, models.Property.version == version)
+                .values(version=models.Property.version + 1, **values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                if "is_available" in values:
+                    record_availability_change(db, property_id, current.is_available, values["is_available"], BOOKED)
+                return version + 1
+            db.rollback()
+        raise PropertyVersionConflict(property_id)
+    
+    def _release_property(self, db: Session, property_id: int):
+        """
+        Make the property available again after a cancellation (caller commits).
+        
+        Freeing dates never conflicts, but the version still moves so other
+        workers' calendars reload this property.
+        """
+        was_available = db.query(models.Property.is_available).filter(
+            models.Property.id == property_id
+        ).scalar()
+        if was_available is not None:
+            record_availability_change(db, property_id, was_available, True, BOOKING_CANCELLED)
+        db.execute(
+            update(models.Property)
+            .where(models.Property.id == property_id)
+            .values(is_available=True, version=models.Property.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    
+    @invalidate_cache("properties:*")
+    def create_booking(self, db: Session, booking_data: schemas.BookingCreate) -> Optional[models.Booking]:
+        """
+        Create a new booking and mark the property unavailable.
+        
+        Returns None if the property does not exist. Raises
+        BookingConflictError if the stay overlaps an active booking, or
+        PropertyVersionConflict if concurrent writers kept winning the race.
+        """
+        version = self._claim_property(
+            db, booking_data.property_id, booking_data.check_in, booking_data.check_out,
+            is_available=False,
+        )
+        if version is None:
+            return None
         
         db_booking = models.Booking(**booking_data.model_dump(), status="confirmed")
         db.add(db_booking)
         db.commit()
         db.refresh(db_booking)
+        self.calendar.add(db_booking, version=version)
         return db_booking
     
+    @invalidate_cache("properties:*")
     def update_booking(
         self,
         db: Session,
         booking_id: int,
         booking_update: schemas.BookingUpdate
     ) -> Optional[models.Booking]:
-        """Update a booking"""
+        """
+        Update a booking.
+        
+        Raises BookingConflictError if new dates overlap another active
+        booking, or PropertyVersionConflict (see create_booking).
+        """
         db_booking = self.get_booking(db, booking_id)
         if not db_booking:
             return None
         
         update_data = booking_update.model_dump(exclude_unset=True)
+        
+        status_after = update_data.get("status", db_booking.status)
+        version = None
+        if status_after == "cancelled":
+            if db_booking.status != "cancelled":
+                # Same as cancel_booking: frees the property and moves its version
+                self._release_property(db, db_booking.property_id)
+        elif {"check_in", "check_out", "status"} & update_data.keys():
+            # A cancelled booking coming back takes the property again
+            reactivated = {"is_available": False} if db_booking.status == "cancelled" else {}
+            version = self._claim_property(
+                db,
+                db_booking.property_id,
+                update_data.get("check_in", db_booking.check_in),
+                update_data.get("check_out", db_booking.check_out),
+                exclude_booking_id=db_booking.id,
+                **reactivated,
+            )
+        
         for field, value in update_data.items():
             setattr(db_booking, field, value)
         
         db.commit()
         db.refresh(db_booking)
+        self.calendar.remove(db_booking)
+        self.calendar.add(db_booking, version=version)
         return db_booking
     
+    @invalidate_cache("properties:*")
     def cancel_booking(self, db: Session, booking_id: int) -> Optional[models.Booking]:
         """Cancel a booking and make property available again"""
         db_booking = self.get_booking(db, booking_id)
         if not db_booking:
             return None
         
+        if db_booking.status != "cancelled":
+            self._release_property(db, db_booking.property_id)
         db_booking.status = "cancelled"
         
-        # Make property available again
-        property_obj = db.query(models.Property).filter(
-            models.Property.id == db_booking.property_id
-        ).first()
-        if property_obj:
-            property_obj.is_available = True
-        
         db.commit()
         db.refresh(db_booking)
+        self.calendar.remove(db_booking)
         return db_booking
 
 
@@ -0,0 +1,114 @@
+"""
+IndoHomz Dashboard Summary
+
+The analytics dashboard payload from a single statement (one round trip):
+- properties grouped by (type, city), leads grouped by (status, source),
+  UNION ALL'd together
+- availability and last-7-days counts folded in as conditional sums
+
+Totals and breakdowns are rolled up from those rows in Python (types x
+cities plus statuses x sources, a few hundred rows at most).
+
+With ANALYTICS_ENGINE=snapshot the same payload comes from the Parquet
+snapshot instead (see analytics_snapshot).
+
+The payload is cached as a unit under DASHBOARD_CACHE_KEY. The key lives in
+the properties: namespace so every property write drops it; lead writes
+delete it explicitly.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import case, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.database import models
+from app.services.analytics_snapshot import analytics_engine
+
+DASHBOARD_CACHE_KEY = "properties:dashboard"
+RECENT_DAYS = 7
+TOP_LOCATIONS = 5
+
+
+def summary_statement(since: datetime):
+    """(kind, key1, key2, count, available, recent) rows for properties and leads"""
+    prop = models.Property
+    lead = models.Lead
+    properties = select(
+        literal("property").label("kind"),
+        prop.property_type.label("key1"),
+        prop.city.label("key2"),
+        func.count().label("total"),
+        func.sum(case((prop.is_available == True, 1), else_=0)).label("available"),
+        func.sum(case((prop.created_at >= since, 1), else_=0)).label("recent"),
+    ).group_by(prop.property_type, prop.city)
+    leads = select(
+        literal("lead"),
+        lead.status,
+        lead.source,
+        func.count(),
+        literal(0),
+        func.sum(case((lead.created_at >= since, 1), else_=0)),
+    ).group_by(lead.status, lead.source)
+    return union_all(properties, leads)
+
+
+def dashboard_summary(db: Session, now: Optional[datetime] = None) -> dict:
+    """Build the dashboard payload (uncached)"""
+    since = (now or datetime.now()) - timedelta(days=RECENT_DAYS)
+    totals = {"property": [0, 0, 0], "lead": [0, 0, 0]}
+    types, cities, statuses, sources = Counter(), Counter(), Counter(), Counter()
+
+    for kind, key1, key2, count, available, recent in db.execute(summary_statement(since)):
+        total = totals[kind]
+        total[0] += count
+        total[1] += available or 0
+        total[2] += recent or 0
+        if kind == "property":
+            types[key1] += count
+            cities[key2] += count
+        else:
+            statuses[key1] += count
+            sources[key2] += count
+
+    total_properties, available_properties, new_properties = totals["property"]
+    total_leads, _, new_leads = totals["lead"]
+    converted = statuses.get("converted", 0)
+    return {
+        "overview": {
+            "total_properties": total_properties,
+            "available_properties": available_properties,
+            "rented_properties": total_properties - available_properties,
+            "total_leads": total_leads,
+            "conversion_rate": round((converted / total_leads * 100) if total_leads > 0 else 0, 2),
+        },
+        "recent_activity": {
+            "new_properties_this_week": new_properties,
+            "new_leads_this_week": new_leads,
+        },
+        "property_breakdown": {
+            "by_type": [{"type": t, "count": c} for t, c in types.items()],
+            "by_location": [{"city": c, "count": n} for c, n in cities.most_common(TOP_LOCATIONS)],
+        },
+        "lead_breakdown": {
+            "by_status": [{"status": s, "count": c} for s, c in statuses.items()],
+            "by_source": [{"source": s, "count": c} for s, c in sources.items()],
+        },
+    }
+
+
+def get_dashboard(db: Session) -> dict:
+    """Dashboard payload, cached until the next property or lead write"""
+    payload = cache.get(DASHBOARD_CACHE_KEY)
+    if payload is None:
+        engine = analytics_engine()
+        if engine is not None:
+            payload = engine.dashboard(RECENT_DAYS, TOP_LOCATIONS)
+        else:
+            payload = dashboard_summary(db)
+        cache.set(DASHBOARD_CACHE_KEY, payload, ttl=settings.CACHE_TTL_ANALYTICS)
+    return payload
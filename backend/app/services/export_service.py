@@ -0,0 +1,120 @@
+"""
+IndoHomz Export Service
+
+Streams leads and properties as CSV or NDJSON.
+
+Rows come from a single connection opened for the duration of the export
+with stream_results (a server-side cursor on PostgreSQL) and are fetched
+EXPORT_BATCH_SIZE at a time as plain Core rows, so memory stays flat
+regardless of export size. Output is optionally gzip-compressed on the fly.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, Sequence, Tuple
+
+from sqlalchemy import Select, select
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.database import models
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+# Cells starting with these are evaluated as formulas by spreadsheet apps
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+LEAD_EXPORT_COLUMNS = tuple(models.Lead.__table__.columns)
+PROPERTY_EXPORT_COLUMNS = tuple(models.Property.__table__.columns)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_export_rows(engine: Engine, stmt: Select, batch_size: int = settings.EXPORT_BATCH_SIZE) -> Iterator[Sequence]:
+    """Yield rows from one dedicated connection using a streaming cursor"""
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        for partition in result.partitions():
+            yield from partition
+
+
+def csv_cell(value):
+    """Neutralise spreadsheet formulas in user-supplied text (CSV injection)"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def encode_csv(columns: Sequence[str], rows: Iterable[Sequence], batch_size: int = settings.EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """CSV with a header row, yielded in chunks of batch_size rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow([csv_cell(value) for value in row])
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+def encode_ndjson(columns: Sequence[str], rows: Iterable[Sequence], batch_size: int = settings.EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """One JSON object per line, yielded in chunks of batch_size rows"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a byte stream into a single gzip member, chunk by chunk"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(engine: Engine, stmt: Select, fmt: str, gzip: bool = False) -> Iterator[bytes]:
+    """Encoded (and optionally gzipped) export body for a SELECT of columns"""
+    columns = [column.name for column in stmt.selected_columns]
+    rows = iter_export_rows(engine, stmt)
+    encoder = encode_csv if fmt == "csv" else encode_ndjson
+    chunks = encoder(columns, rows)
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def export_media(name: str, fmt: str, gzip: bool = False) -> Tuple[str, Dict[str, str]]:
+    """Media type and download headers, e.g. leads-20260301.csv.gz"""
+    media_type, extension = EXPORT_FORMATS[fmt]
+    filename = f"{name}-{datetime.now().strftime('%Y%m%d')}.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+    return media_type, {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+def lead_export_statement(conditions: list) -> Select:
+    return select(*LEAD_EXPORT_COLUMNS).where(*conditions).order_by(models.Lead.id)
+
+
+def property_export_statement(conditions: list) -> Select:
+    return select(*PROPERTY_EXPORT_COLUMNS).where(*conditions).order_by(models.Property.id)
@@ -0,0 +1,109 @@
+"""
+IndoHomz Lead Source Analytics
+
+Per-source performance from two aggregates, whatever the number of sources:
+- one GROUP BY source, status over the filtered leads, pivoted in Python
+  into leads, conversions and conversion rate per source
+- the median time from creation to conversion per source, from each
+  converted lead's first move into "converted" (lead_status_transitions);
+  percentile_cont on Postgres, ROW_NUMBER() windows elsewhere
+
+Results are cached per filter set under leads:, so lead writes drop them.
+"""
+
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import cached
+from app.core.config import settings
+from app.database import models
+from app.services.crud import lead_filter_clauses
+
+CONVERTED = "converted"
+
+
+def seconds_between(db: Session, start, end):
+    """SQL expression for end - start in seconds"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", end - start)
+    return (func.julianday(end) - func.julianday(start)) * 86400
+
+
+def median_seconds_to_convert(db: Session, clauses) -> Dict[Optional[str], float]:
+    """Median seconds from creation to first conversion, per source (converted leads only)"""
+    lead = models.Lead
+    event = models.LeadStatusTransition
+    # Created already converted (or backfilled) leads have no measurable time
+    converted = (
+        select(event.lead_id, func.min(event.created_at).label("converted_at"))
+        .where(event.to_status == CONVERTED, event.from_status.isnot(None))
+        .group_by(event.lead_id)
+        .subquery()
+    )
+    seconds = seconds_between(db, lead.created_at, converted.c.converted_at)
+
+    def converted_leads(*columns):
+        return select(*columns).join(converted, converted.c.lead_id == lead.id).where(lead.status == CONVERTED, *clauses)
+
+    if db.get_bind().dialect.name == "postgresql":
+        rows = db.execute(
+            converted_leads(lead.source, func.percentile_cont(0.5).within_group(seconds)).group_by(lead.source)
+        )
+        return {source: float(value) for source, value in rows}
+
+    ranked = converted_leads(
+        lead.source.label("source"),
+        seconds.label("seconds"),
+        func.row_number().over(partition_by=lead.source, order_by=seconds).label("rn"),
+        func.count().over(partition_by=lead.source).label("n"),
+    ).subquery()
+    # The middle row, or the two middle rows for an even count
+    middle = or_(ranked.c.rn == (ranked.c.n + 1) // 2, ranked.c.rn == ranked.c.n // 2 + 1)
+    rows = db.execute(select(ranked.c.source, func.avg(ranked.c.seconds)).where(middle).group_by(ranked.c.source))
+    return {source: float(value) for source, value in rows}
+
+
+@cached(ttl=settings.CACHE_TTL_ANALYTICS, key_prefix="leads:source_performance")
+def source_performance(db: Session, filters: Optional[dict] = None) -> dict:
+    """
+    Leads, conversions, conversion rate and median days to convert per
+    source. `filters` is lead_filter_clauses-shaped (created_after,
+    created_before, property_id, ...).
+    """
+    filters = {k: v for k, v in (filters or {}).items() if v is not None}
+    lead = models.Lead
+    clauses = lead_filter_clauses(filters)
+    by_source: Dict[Optional[str], Dict[str, int]] = defaultdict(dict)
+    rows = db.execute(select(lead.source, lead.status, func.count()).where(*clauses).group_by(lead.source, lead.status))
+    for source, status, count in rows:
+        by_source[source][status] = count
+    medians = median_seconds_to_convert(db, clauses)
+
+    total = sum(sum(statuses.values()) for statuses in by_source.values())
+    total_converted = sum(statuses.get(CONVERTED, 0) for statuses in by_source.values())
+    sources = []
+    for source, statuses in by_source.items():
+        leads = sum(statuses.values())
+        conversions = statuses.get(CONVERTED, 0)
+        median = medians.get(source)
+        sources.append({
+            "source": (source or "unknown").replace("_", " ").title(),
+            "key": source,
+            "leads": leads,
+            "percentage": round(leads / total * 100, 1) if total > 0 else 0,
+            "conversions": conversions,
+            "conversion_rate": round(conversions / leads * 100, 2) if leads > 0 else 0,
+            "median_days_to_convert": round(median / 86400, 2) if median is not None else None,
+            "by_status": statuses,
+        })
+    sources.sort(key=lambda item: -item["leads"])
+
+    return {
+        "sources": sources,
+        "total_leads": total,
+        "conversions": total_converted,
+        "conversion_rate": round(total_converted / total * 100, 2) if total > 0 else 0,
+    }
@@ -0,0 +1,133 @@
+"""
+IndoHomz Lead Deduplication
+
+Detects repeat submissions from the same prospect (normalized phone plus
+property) within LEAD_DEDUPE_WINDOW_SECONDS, without a database query.
+
+- Redis (when connected): SET NX EX per prospect, shared across workers
+- In-memory fallback: time-bucketed hash maps; whole buckets expire at once
+
+Each key maps to the reference of the first lead in the window, so repeats
+can be merged into it (including leads still waiting in the ingestion queue).
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.rate_limit import get_redis_client
+from app.core.security import normalize_phone_number
+
+logger = logging.getLogger(__name__)
+
+# The window is split into this many buckets; entries expire at bucket granularity
+DEDUPE_BUCKETS = 24
+
+# Delete the key only if it still holds our reference (another submission may have claimed it since)
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeadDeduplicator:
+    """Maps recent (phone, property) pairs to the reference of their lead"""
+
+    def __init__(
+        self,
+        window_seconds: int = settings.LEAD_DEDUPE_WINDOW_SECONDS,
+        enabled: bool = settings.LEAD_DEDUPE_ENABLED,
+    ):
+        self.window_seconds = window_seconds
+        self.enabled = enabled
+        self.bucket_seconds = max(1, window_seconds // DEDUPE_BUCKETS)
+        # bucket number -> {prospect key: reference}, oldest first
+        self._buckets: "OrderedDict[int, Dict[str, str]]" = OrderedDict()
+
+    @staticmethod
+    def prospect_key(phone: str, property_id: Optional[int]) -> str:
+        return f"{normalize_phone_number(phone)}:{property_id or 0}"
+
+    async def claim(self, phone: str, property_id: Optional[int], reference: str) -> Optional[str]:
+        """
+        Register `reference` for this prospect.
+
+        Returns the existing lead's reference if the prospect already submitted
+        within the window (nothing is registered then), else None.
+        """
+        if not self.enabled:
+            return None
+        key = self.prospect_key(phone, property_id)
+
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                redis_key = f"dedupe:lead:{key}"
+                if await redis.set(redis_key, reference, nx=True, ex=self.window_seconds):
+                    return None
+                return await redis.get(redis_key)
+            except Exception as e:
+                logger.warning(f"Redis dedupe failed: {e} - using in-memory store")
+
+        return self._claim_memory(key, reference, time.time())
+
+    async def register(self, phone: str, property_id: Optional[int], reference: str):
+        """Point the prospect at a new lead (e.g. when the previous one no longer exists)"""
+        if not self.enabled:
+            return
+        key = self.prospect_key(phone, property_id)
+
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                await redis.set(f"dedupe:lead:{key}", reference, ex=self.window_seconds)
+                return
+            except Exception as e:
+                logger.warning(f"Redis dedupe failed: {e} - using in-memory store")
+
+        self._current_bucket(time.time())[key] = reference
+
+    async def release(self, phone: str, property_id: Optional[int], reference: str):
+        """Forget the prospect if it still points at `reference` (its lead was never queued)"""
+        if not self.enabled:
+            return
+        key = self.prospect_key(phone, property_id)
+
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                await redis.eval(RELEASE_SCRIPT, 1, f"dedupe:lead:{key}", reference)
+                return
+            except Exception as e:
+                logger.warning(f"Redis dedupe failed: {e} - using in-memory store")
+
+        for entries in self._buckets.values():
+            if entries.get(key) == reference:
+                del entries[key]
+
+    def _current_bucket(self, now: float) -> Dict[str, str]:
+        current = int(now // self.bucket_seconds)
+        # Expire whole buckets that fell out of the window
+        oldest = current - DEDUPE_BUCKETS
+        while self._buckets and next(iter(self._buckets)) < oldest:
+            self._buckets.popitem(last=False)
+        return self._buckets.setdefault(current, {})
+
+    def _claim_memory(self, key: str, reference: str, now: float) -> Optional[str]:
+        bucket = self._current_bucket(now)
+        for entries in self._buckets.values():
+            existing = entries.get(key)
+            if existing is not None:
+                return existing
+        bucket[key] = reference
+        return None
+
+    def clear(self):
+        self._buckets.clear()
+
+
+lead_deduplicator = LeadDeduplicator()
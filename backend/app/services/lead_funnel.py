@@ -0,0 +1,190 @@
+"""
+IndoHomz Lead Funnel
+
+Cohort and time-in-stage analytics, maintained incrementally:
+- lead_status_transitions: one row per status change (plus one for the
+  status a lead is created in) with the time spent in the previous status
+- lead_cohort_stages: (cohort week, stage) counters - leads that reached
+  the stage, leads in it now, exits and seconds spent before exiting -
+  upserted in the same transaction as each change
+
+Cohorts are the UTC week (Monday) a lead was created in. The cohorts
+endpoint reads O(weeks x stages) matrix rows, whatever the number of leads.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.database import models
+
+FUNNEL_STAGES = ["new", "contacted", "site_visit", "negotiation", "converted"]
+STAGES = FUNNEL_STAGES + ["lost"]
+
+
+def utc(value: datetime) -> datetime:
+    """Stored timestamps can come back naive (SQLite); they are UTC"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def cohort_week(created_at: Optional[datetime] = None) -> date:
+    """Monday (UTC) of the week `created_at` falls in (default: now)"""
+    day = utc(created_at or datetime.now(timezone.utc)).date()
+    return day - timedelta(days=day.weekday())
+
+
+def status_value(status) -> Optional[str]:
+    # Accepts LeadStatus members as well as plain strings
+    return getattr(status, "value", status)
+
+
+# =============================================================================
+# RECORDING
+# =============================================================================
+
+def creation(lead_id: int, status: str = "new", created_at: Optional[datetime] = None) -> dict:
+    """Transition row for a lead created in `status`"""
+    created_at = created_at or datetime.now(timezone.utc)
+    return {
+        "lead_id": lead_id,
+        "from_status": None,
+        "to_status": status_value(status),
+        "cohort_week": cohort_week(created_at),
+        "seconds_in_previous": None,
+        "created_at": created_at,
+    }
+
+
+def status_change(lead, to_status: str, now: datetime) -> dict:
+    """Transition row for `lead` (id, status, created_at, status_changed_at) moving to `to_status`"""
+    since = lead.status_changed_at or lead.created_at
+    return {
+        "lead_id": lead.id,
+        "from_status": lead.status,
+        "to_status": status_value(to_status),
+        "cohort_week": cohort_week(lead.created_at),
+        "seconds_in_previous": (now - utc(since)).total_seconds() if since else None,
+        "created_at": now,
+    }
+
+
+def record_transitions(db: Session, transitions: List[dict]):
+    """Log transitions (at most one per lead) and update the cohort matrix; the caller commits"""
+    if not transitions:
+        return
+    event = models.LeadStatusTransition
+    # Stages these leads had already reached count once
+    reached = set(db.execute(
+        select(event.lead_id, event.to_status).where(
+            event.lead_id.in_(list({t["lead_id"] for t in transitions})),
+            event.to_status.in_(list({t["to_status"] for t in transitions})),
+        )
+    ).all())
+    db.execute(insert(event), transitions)
+
+    deltas: Dict[tuple, list] = defaultdict(lambda: [0, 0, 0, 0.0])  # entered, current, exited, seconds
+    for t in transitions:
+        entering = deltas[(t["cohort_week"], t["to_status"])]
+        entering[0] += (t["lead_id"], t["to_status"]) not in reached
+        entering[1] += 1
+        if t["from_status"] is not None:
+            leaving = deltas[(t["cohort_week"], t["from_status"])]
+            leaving[1] -= 1
+            leaving[2] += 1
+            leaving[3] += t["seconds_in_previous"] or 0
+    apply_cohort_deltas(db, deltas)
+
+
+def apply_cohort_deltas(db: Session, deltas: Dict[tuple, list]):
+    """Add deltas to matrix cells with one INSERT ... ON CONFLICT DO UPDATE"""
+    stage = models.LeadCohortStage
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(stage)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[stage.cohort_week, stage.stage],
+        set_={
+            "entered": stage.entered + stmt.excluded.entered,
+            "current": stage.current + stmt.excluded.current,
+            "exited": stage.exited + stmt.excluded.exited,
+            "seconds_in_stage": stage.seconds_in_stage + stmt.excluded.seconds_in_stage,
+            "updated_at": func.now(),
+        },
+    )
+    rows = [
+        {"cohort_week": week, "stage": name, "entered": entered, "current": current,
+         "exited": exited, "seconds_in_stage": seconds}
+        for (week, name), (entered, current, exited, seconds) in sorted(deltas.items())  # fixed lock order
+    ]
+    db.execute(stmt, rows)
+
+
+def record_created_leads(db: Session, rows: Iterable[dict]):
+    """Log creation of leads bulk-inserted from `rows` (reference, status, created_at)"""
+    rows = list(rows)
+    ids = dict(db.execute(
+        select(models.Lead.reference, models.Lead.id).where(models.Lead.reference.in_([r["reference"] for r in rows]))
+    ).all())
+    record_transitions(db, [
+        creation(ids[r["reference"]], r.get("status") or "new", r.get("created_at"))
+        for r in rows if r["reference"] in ids
+    ])
+
+
+# =============================================================================
+# COHORT MATRIX
+# =============================================================================
+
+def cohort_matrix(db: Session, weeks: int, today: Optional[date] = None) -> dict:
+    """
+    Funnel per weekly cohort for the last `weeks` weeks: per stage the
+    leads that reached it (share of the cohort and of the previous funnel
+    stage), leads in it now, and average days spent before moving on.
+    """
+    stage = models.LeadCohortStage
+    first = cohort_week(datetime.combine(today, datetime.min.time()) if today else None) - timedelta(weeks=weeks - 1)
+    rows = db.query(stage).filter(stage.cohort_week >= first).order_by(stage.cohort_week).all()
+
+    cells: Dict[date, Dict[str, object]] = defaultdict(dict)
+    for row in rows:
+        cells[row.cohort_week][row.stage] = row
+    totals: Dict[str, list] = defaultdict(lambda: [0, 0.0])  # exits, seconds across cohorts
+
+    cohorts = []
+    for week, by_stage in cells.items():
+        size = sum(cell.current for cell in by_stage.values())
+        stages = {}
+        previous = None
+        for name in STAGES + sorted(set(by_stage) - set(STAGES)):
+            cell = by_stage.get(name)
+            entered = cell.entered if cell else 0
+            exited = cell.exited if cell else 0
+            seconds = cell.seconds_in_stage if cell else 0.0
+            totals[name][0] += exited
+            totals[name][1] += seconds
+            stages[name] = {
+                "reached": entered,
+                "current": cell.current if cell else 0,
+                "reached_pct": round(entered / size * 100, 1) if size else 0,
+                "from_previous_pct": (
+                    round(entered / previous * 100, 1) if previous else None
+                ) if name in FUNNEL_STAGES[1:] else None,
+                "avg_days_in_stage": round(seconds / exited / 86400, 2) if exited else None,
+            }
+            if name in FUNNEL_STAGES:
+                previous = entered
+        cohorts.append({"week": week.isoformat(), "leads": size, "stages": stages})
+
+    return {
+        "weeks": weeks,
+        "stages": STAGES,
+        "cohorts": cohorts,
+        "avg_days_in_stage": {
+            name: round(seconds / exits / 86400, 2) if exits else None
+            for name, (exits, seconds) in totals.items()
+        },
+    }
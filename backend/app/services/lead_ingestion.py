@@ -0,0 +1,246 @@
+"""
+IndoHomz Lead Ingestion
+
+Buffered write path for lead submissions (LEAD_INGESTION_MODE=buffered).
+
+Validated leads are put on a bounded in-process asyncio queue and the request
+returns 202 with a pre-allocated reference. A single writer task drains the
+queue in micro-batches (LEAD_BATCH_SIZE rows or LEAD_FLUSH_INTERVAL seconds,
+whichever comes first) and inserts each batch with one executemany, so a
+burst costs one connection and one commit per batch instead of per lead.
+Repeat submissions queued with submit_merge() are applied after the inserts.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.database import models
+from app.database.connection import SessionLocal
+from app.schemas import schemas
+from app.services.crud import lead_service
+from app.services.dashboard import DASHBOARD_CACHE_KEY
+from app.services.lead_funnel import record_created_leads
+from app.services.listing_stats import count_created_leads
+from app.services.live_events import LEAD_CREATED, emit
+from app.services.notifications import lead_outbox_rows
+
+logger = logging.getLogger(__name__)
+
+
+class LeadQueueFull(Exception):
+    """Raised when the queue stays full for longer than the enqueue timeout"""
+
+
+class LeadIngestionQueue:
+    """Bounded lead queue with a batching database writer"""
+
+    def __init__(
+        self,
+        max_size: int = settings.LEAD_QUEUE_MAX_SIZE,
+        batch_size: int = settings.LEAD_BATCH_SIZE,
+        flush_interval: float = settings.LEAD_FLUSH_INTERVAL,
+        enqueue_timeout: float = settings.LEAD_ENQUEUE_TIMEOUT,
+        write_retries: int = settings.LEAD_WRITE_RETRIES,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.write_retries = write_retries
+        self.session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.stats = {"accepted": 0, "rejected": 0, "written": 0, "merged": 0, "failed": 0, "batches": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and not self._writer.done()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self):
+        """Start the writer task (must be called from the running event loop)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = settings.LEAD_SHUTDOWN_TIMEOUT):
+        """Flush everything already queued, then stop the writer"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Lead queue flush timed out; {self.pending} leads not written")
+        self._writer.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._writer
+        self._writer = None
+
+    async def submit(self, lead_data: schemas.LeadCreate, reference: Optional[str] = None) -> str:
+        """
+        Queue a validated lead and return its reference.
+
+        Waits up to enqueue_timeout for space, then raises LeadQueueFull.
+        """
+        reference = reference or uuid.uuid4().hex
+        await self._put(self._row(lead_data, reference))
+        return reference
+
+    async def submit_merge(self, reference: str, lead_data: schemas.LeadCreate, insert_if_missing: bool = True):
+        """
+        Queue a repeat submission to be merged into the lead with this
+        reference. If that lead was never written (its batch failed) or is
+        gone, the submission is written as a new lead under the reference,
+        unless `insert_if_missing` is False (it scored as spam).
+        """
+        await self._put({
+            "merge_into": reference,
+            "message": lead_data.message,
+            "lead": self._row(lead_data, reference) if insert_if_missing else None,
+        })
+
+    @staticmethod
+    def _row(lead_data: schemas.LeadCreate, reference: str) -> dict:
+        return {
+            **lead_data.model_dump(),
+            "reference": reference,
+            "status": "new",
+            # Receipt time, not write time
+            "created_at": datetime.now(timezone.utc),
+        }
+
+    async def _put(self, item: dict):
+        if not self.running:
+            raise RuntimeError("Lead ingestion queue is not running")
+        try:
+            await asyncio.wait_for(self._queue.put(item), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise LeadQueueFull(f"Lead queue full ({self.max_size} pending)")
+        self.stats["accepted"] += 1
+
+    async def _next_batch(self) -> List[dict]:
+        """Wait for one lead, then collect more until the batch is full or the interval ends"""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                # Blocking DB work runs off the event loop, one batch at a time
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception:
+                logger.exception(f"Lead batch of {len(batch)} failed")
+                self.stats["failed"] += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, items: List[dict]):
+        """Write one batch: inserts first, then merges into (possibly just inserted) leads"""
+        rows = [item for item in items if "merge_into" not in item]
+        merges = [item for item in items if "merge_into" in item]
+        db = self.session_factory()
+        try:
+            if rows:
+                self._insert_rows(db, rows)
+                # Lead stats and the dashboard are cached until the next lead write
+                cache.delete_pattern("leads:*")
+                cache.delete(DASHBOARD_CACHE_KEY)
+            for merge in merges:
+                try:
+                    if lead_service.merge_duplicate_lead(db, merge["merge_into"], merge["message"]):
+                        self.stats["merged"] += 1
+                    elif merge["lead"] is None:
+                        logger.warning(f"Lead {merge['merge_into']} missing; dropping a repeat that scored as spam")
+                    else:
+                        # The prospect's dedupe key still points at this reference, so later repeats merge into it
+                        logger.warning(f"Lead {merge['merge_into']} missing; writing the repeat submission as that lead")
+                        self._insert_rows(db, [merge["lead"]])
+                        cache.delete_pattern("leads:*")
+                        cache.delete(DASHBOARD_CACHE_KEY)
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    self.stats["failed"] += 1
+                    logger.error(f"Failed to merge into lead {merge['merge_into']}: {e}")
+            self.stats["batches"] += 1
+        finally:
+            db.close()
+
+    @staticmethod
+    def _insert(db: Session, rows: List[dict]):
+        """Insert leads plus their outbox notifications, funnel transitions and listing counters (caller commits)"""
+        db.execute(insert(models.Lead), rows)
+        record_created_leads(db, rows)
+        count_created_leads(db, rows)
+        for row in rows:
+            emit(
+                db, LEAD_CREATED, lead_id=None, reference=row["reference"],
+                property_id=row.get("property_id"), status=row["status"], source=row.get("source"),
+            )
+        outbox = [notification for row in rows for notification in lead_outbox_rows(row)]
+        if outbox:
+            db.execute(insert(models.NotificationOutbox), outbox)
+
+    def _insert_rows(self, db: Session, rows: List[dict]):
+        """Insert new leads; retry connection errors, then isolate bad rows"""
+        for attempt in range(self.write_retries + 1):
+            try:
+                self._insert(db, rows)
+                db.commit()
+                self.stats["written"] += len(rows)
+                return
+            except OperationalError as e:
+                db.rollback()
+                if attempt == self.write_retries:
+                    break
+                logger.warning(f"Lead batch write failed ({e}); retrying")
+                time.sleep(0.5 * 2 ** attempt)
+            except SQLAlchemyError:
+                db.rollback()
+                break
+
+        # Fall back to row-by-row so one bad lead doesn't drop the batch
+        for row in rows:
+            try:
+                self._insert(db, [row])
+                db.commit()
+                self.stats["written"] += 1
+            except SQLAlchemyError as e:
+                db.rollback()
+                self.stats["failed"] += 1
+                logger.error(f"Dropped lead {row['reference']}: {e}")
+
+
+lead_ingestion = LeadIngestionQueue()
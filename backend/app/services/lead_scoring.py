@@ -0,0 +1,277 @@
+"""
+IndoHomz Lead Scoring
+
+Scores leads 0-100 by likelihood to convert and stores the result in
+leads.score. Signals (weights in SCORE_WEIGHTS):
+- source:   channel quality (referrals and walk-ins convert best)
+- response: time to first contact; uncontacted leads decay as they age
+- price:    distance of the property's rent from the mid-market band
+- repeat:   repeat inquiries merged into the lead (submission_count)
+- visit:    how soon the requested site visit is
+
+Leads are processed in keyset batches of LEAD_SCORE_BATCH_SIZE and scored
+as whole arrays with NumPy when it is installed (pure-Python fallback
+otherwise, same formula). Incremental runs only rescore leads never
+scored or updated since their last score; full runs also refresh the
+time-dependent signals and should be scheduled periodically.
+"""
+
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import Float, bindparam, cast, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import models
+
+try:
+    import numpy as np
+except ImportError:  # ML libraries are optional in deployment
+    np = None
+
+SOURCE_WEIGHTS: Dict[str, float] = {
+    "referral": 1.0,
+    "walk_in": 0.9,
+    "whatsapp": 0.7,
+    "google": 0.6,
+    "website": 0.5,
+    "instagram": 0.4,
+}
+DEFAULT_SOURCE_WEIGHT = 0.4
+
+SCORE_WEIGHTS = {
+    "source": 0.25,
+    "response": 0.20,
+    "price": 0.15,
+    "repeat": 0.20,
+    "visit": 0.20,
+}
+
+RESPONSE_DECAY_HOURS = 48.0
+MID_MARKET_RENT = 35000.0  # monthly rent with the best conversion
+PRICE_BAND_DECADES = 1.0  # log10 distance at which the price signal reaches 0
+VISIT_HORIZON_DAYS = 14.0
+PAST_VISIT_SIGNAL = 0.2
+NO_PRICE_SIGNAL = 0.5
+
+# Terminal statuses score at the ends of the range
+STATUS_OVERRIDES = {"converted": 100.0, "lost": 0.0}
+
+
+def epoch_seconds(column):
+    """Timestamp as float seconds since the epoch, computed in SQL (NULL stays NULL)"""
+    return cast(func.extract("epoch", column), Float)
+
+
+# Row layout consumed by score_rows(): timestamps arrive as epoch seconds so
+# no datetime objects are built per row
+_SCORE_COLUMNS = (
+    models.Lead.id,
+    models.Lead.source,
+    models.Lead.status,
+    epoch_seconds(models.Lead.created_at),
+    epoch_seconds(models.Lead.updated_at),
+    models.Lead.submission_count,
+    epoch_seconds(models.Lead.preferred_visit_date),
+    models.Property.price_numeric,
+    models.Lead.score,
+    epoch_seconds(models.Lead.scored_at),
+)
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    """Seconds since the epoch, treating naive datetimes as UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _clip(value: float) -> float:
+    return min(1.0, max(0.0, value))
+
+
+def score_rows_python(rows: Sequence, now: float) -> List[float]:
+    """Reference implementation, one lead at a time"""
+    scores = []
+    for row in rows:
+        _, source, status, created, updated, count, visit, price = row[:8]
+        if status in STATUS_OVERRIDES:
+            scores.append(STATUS_OVERRIDES[status])
+            continue
+
+        source_signal = SOURCE_WEIGHTS.get(source, DEFAULT_SOURCE_WEIGHT)
+
+        if created is None:
+            response_signal = 0.0
+        else:
+            waited = now - created if status == "new" or updated is None else updated - created
+            response_signal = math.exp(-max(waited, 0.0) / 3600.0 / RESPONSE_DECAY_HOURS)
+
+        if price and price > 0:
+            price_signal = _clip(1.0 - abs(math.log10(price / MID_MARKET_RENT)) / PRICE_BAND_DECADES)
+        else:
+            price_signal = NO_PRICE_SIGNAL
+
+        repeat_signal = 1.0 - 1.0 / max(count or 1, 1)
+
+        if visit is None:
+            visit_signal = 0.0
+        else:
+            days = (visit - now) / 86400.0
+            visit_signal = PAST_VISIT_SIGNAL if days < 0 else _clip(1.0 - days / VISIT_HORIZON_DAYS)
+
+        total = (
+            SCORE_WEIGHTS["source"] * source_signal
+            + SCORE_WEIGHTS["response"] * response_signal
+            + SCORE_WEIGHTS["price"] * price_signal
+            + SCORE_WEIGHTS["repeat"] * repeat_signal
+            + SCORE_WEIGHTS["visit"] * visit_signal
+        )
+        scores.append(round(total * 100.0, 2))
+    return scores
+
+
+def score_rows_numpy(rows: Sequence, now: float):
+    """Vectorized implementation over a whole batch (returns a float64 array)"""
+    columns = list(zip(*rows))
+    sources, statuses = columns[1], np.asarray(columns[2], dtype=object)
+    # None -> NaN for the numeric columns
+    created, updated, counts, visits, prices = (
+        np.asarray(columns[i], dtype=np.float64) for i in (3, 4, 5, 6, 7)
+    )
+
+    weights = {source: SOURCE_WEIGHTS.get(source, DEFAULT_SOURCE_WEIGHT) for source in set(sources)}
+    source_signal = np.fromiter(map(weights.__getitem__, sources), dtype=np.float64, count=len(sources))
+
+    waiting = (statuses == "new") | np.isnan(updated)
+    waited = np.where(waiting, now - created, updated - created)
+    response_signal = np.where(
+        np.isnan(waited), 0.0, np.exp(-np.maximum(waited, 0.0) / 3600.0 / RESPONSE_DECAY_HOURS)
+    )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        price_distance = np.abs(np.log10(prices / MID_MARKET_RENT)) / PRICE_BAND_DECADES
+        price_signal = np.where(prices > 0, np.clip(1.0 - price_distance, 0.0, 1.0), NO_PRICE_SIGNAL)
+
+    repeat_signal = 1.0 - 1.0 / np.maximum(np.nan_to_num(counts, nan=1.0), 1.0)
+
+    days = (visits - now) / 86400.0
+    visit_signal = np.where(
+        np.isnan(days), 0.0,
+        np.where(days < 0, PAST_VISIT_SIGNAL, np.clip(1.0 - days / VISIT_HORIZON_DAYS, 0.0, 1.0)),
+    )
+
+    total = (
+        SCORE_WEIGHTS["source"] * source_signal
+        + SCORE_WEIGHTS["response"] * response_signal
+        + SCORE_WEIGHTS["price"] * price_signal
+        + SCORE_WEIGHTS["repeat"] * repeat_signal
+        + SCORE_WEIGHTS["visit"] * visit_signal
+    )
+    scores = np.round(total * 100.0, 2)
+    for status, override in STATUS_OVERRIDES.items():
+        scores[statuses == status] = override
+    return scores
+
+
+def rows_to_write(rows: Sequence, scores, changed_only: bool = False) -> List[dict]:
+    """
+    Update parameters for a scored batch. With changed_only, rows whose
+    score is unchanged and that were scored after their last update are
+    skipped (epoch seconds may be truncated, so ties count as stale).
+    """
+    if not changed_only:
+        return [{"lead_id": row[0], "score": float(score)} for row, score in zip(rows, scores)]
+
+    if np is not None:
+        old, updated, scored_at = (
+            np.asarray([row[i] for row in rows], dtype=np.float64) for i in (8, 4, 9)
+        )
+        keep = (scores != old) | np.isnan(scored_at) | (updated >= scored_at)
+        return [{"lead_id": rows[i][0], "score": float(scores[i])} for i in np.flatnonzero(keep)]
+
+    return [
+        {"lead_id": row[0], "score": score}
+        for row, score in zip(rows, scores)
+        if score != row[8] or row[9] is None or (row[4] is not None and row[4] >= row[9])
+    ]
+
+
+def score_rows(rows: Sequence, now: float):
+    if np is not None:
+        return score_rows_numpy(rows, now)
+    return score_rows_python(rows, now)
+
+
+class LeadScorer:
+    """Batch (re)scoring of leads into leads.score"""
+
+    def __init__(self, batch_size: int = settings.LEAD_SCORE_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def rescore(self, db: Session, full: bool = False) -> dict:
+        """
+        Score leads in keyset batches and persist the results.
+
+        full=False only scores leads without a score or updated since their
+        last score; full=True rescores everything but only writes back
+        scores that changed.
+        Returns {"scored", "written", "batches", "seconds", "engine"}.
+        """
+        started = time.perf_counter()
+        run_at = datetime.now(timezone.utc)
+        now = _epoch(run_at)
+
+        conditions = []
+        if not full:
+            conditions.append(or_(
+                models.Lead.scored_at.is_(None),
+                models.Lead.updated_at > models.Lead.scored_at,
+            ))
+
+        # Setting updated_at to itself suppresses its onupdate, so scoring
+        # does not mark the lead as changed for the next incremental run
+        write = update(models.Lead.__table__).where(
+            models.Lead.__table__.c.id == bindparam("lead_id")
+        ).values(
+            score=bindparam("score"),
+            scored_at=run_at,
+            updated_at=models.Lead.__table__.c.updated_at,
+        )
+
+        scored = written = batches = 0
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(*_SCORE_COLUMNS)
+                .outerjoin(models.Property, models.Property.id == models.Lead.property_id)
+                .where(models.Lead.id > last_id, *conditions)
+                .order_by(models.Lead.id)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                break
+
+            updates = rows_to_write(rows, score_rows(rows, now), changed_only=full)
+            if updates:
+                db.execute(write, updates)
+                db.commit()
+
+            scored += len(rows)
+            written += len(updates)
+            batches += 1
+            last_id = rows[-1][0]
+
+        return {
+            "scored": scored,
+            "written": written,
+            "batches": batches,
+            "seconds": round(time.perf_counter() - started, 3),
+            "engine": "numpy" if np is not None else "python",
+        }
+
+
+lead_scorer = LeadScorer()
@@ -0,0 +1,279 @@
+"""
+IndoHomz Lead Velocity / Spam Scoring
+
+Scores each submission before any database write from how often its phone,
+email domain, message template and property were seen in the last
+LEAD_VELOCITY_WINDOW_SECONDS. Bots rotate IPs (so the per-IP rate limit misses
+them) but keep reusing phones and message templates. Repeats (merging into
+an existing lead) add to their phone's count only, since they show how busy
+a sender is, not how far a template or listing is spreading; only
+submissions that become new leads are held to the verdict.
+
+- Counts are approximate sliding-window counters: a ring of count-min sketches,
+  one per time bucket. Memory is fixed (dimensions x buckets x depth x width)
+  no matter how many distinct values an attack sends; estimates never
+  undercount.
+- Redis (when connected): the same sketch cells as hash fields per bucket,
+  shared across workers, updated and read in one pipeline round trip
+- Score (0-100) combines the dimensions as a noisy-OR; above
+  LEAD_SPAM_REJECT_SCORE the submission gets 429, above
+  LEAD_SPAM_QUARANTINE_SCORE it is kept in a capped review list instead of
+  becoming a lead
+"""
+
+import hashlib
+import json
+import logging
+import re
+import struct
+import time
+from array import array
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from app.core.config import settings
+from app.core.rate_limit import get_redis_client
+from app.core.security import normalize_phone_number
+from app.schemas.schemas import LeadCreate
+
+logger = logging.getLogger(__name__)
+
+# dimension -> (how suspicious it is on its own at saturation, submissions per window that saturate it)
+VELOCITY_DIMENSIONS = {
+    "phone": (0.8, 20),  # one prospect may ask about several listings; repeats per listing merge instead
+    "message": (0.6, 20),  # common phrasings repeat between honest prospects
+    "email_domain": (0.5, 25),
+    "property": (0.3, 80),
+}
+
+# Shared mailbox providers say nothing about who is submitting
+FREE_EMAIL_DOMAINS = {
+    "gmail.com", "yahoo.com", "yahoo.co.in", "outlook.com", "hotmail.com",
+    "live.com", "icloud.com", "rediffmail.com", "protonmail.com",
+}
+
+MIN_TEMPLATE_LENGTH = 12  # shorter messages ("hi", "interested") are too common to count
+
+ALLOW = "allow"
+QUARANTINE = "quarantine"
+REJECT = "reject"
+
+
+class SlidingCountMinSketch:
+    """
+    Approximate per-key counts over a sliding window.
+
+    A ring of `buckets` count-min sketches (depth rows x width counters), one
+    per bucket of window_seconds / buckets, plus their running total, so an
+    estimate is `depth` lookups. Buckets that age out are subtracted from the
+    total and zeroed. Estimates are >= the true count and exceed it by about
+    e/width of the window's total traffic at most (with high probability).
+    """
+
+    def __init__(self, window_seconds: int, buckets: int = 12, width: int = 1024, depth: int = 4):
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.width = width
+        self.depth = depth
+        self.bucket_seconds = max(1, window_seconds // buckets)
+        self._cells = [array("I", bytes(4 * depth * width)) for _ in range(buckets)]
+        self._epochs = [-1] * buckets  # bucket number held by each slot (-1: empty)
+        self._totals = array("I", bytes(4 * depth * width))
+        self._current = -1  # bucket number at the last expiry pass
+        self._row_hashes = struct.Struct(f"<{depth}I")
+
+    def cells(self, key: str) -> List[int]:
+        """Flat counter index in each row for `key`"""
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        width = self.width
+        return [row * width + h % width for row, h in enumerate(self._row_hashes.unpack(digest))]
+
+    def bucket(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def add(self, key: str, now: float) -> int:
+        """Count one occurrence of `key`; returns its estimate over the window"""
+        current = self._advance(now)
+        slot = current % self.buckets
+        self._epochs[slot] = current
+        counters, totals = self._cells[slot], self._totals
+        cells = self.cells(key)
+        for cell in cells:
+            counters[cell] += 1
+            totals[cell] += 1
+        return min(totals[cell] for cell in cells)
+
+    def estimate(self, key: str, now: float) -> int:
+        self._advance(now)
+        return min(self._totals[cell] for cell in self.cells(key))
+
+    def _advance(self, now: float) -> int:
+        """Expire buckets older than the window; returns the current bucket number"""
+        current = self.bucket(now)
+        if current == self._current:
+            return current
+        self._current = current
+        for slot, epoch in enumerate(self._epochs):
+            if epoch != -1 and epoch <= current - self.buckets:
+                counters, totals = self._cells[slot], self._totals
+                for cell, count in enumerate(counters):
+                    if count:
+                        totals[cell] -= count
+                self._cells[slot] = array("I", bytes(4 * self.depth * self.width))
+                self._epochs[slot] = -1
+        return current
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(counters.itemsize * len(counters) for counters in [*self._cells, self._totals])
+
+
+class VelocityVerdict:
+    """Spam score for one submission and the window counts behind it"""
+
+    __slots__ = ("score", "action", "counts")
+
+    def __init__(self, score: float, action: str, counts: Dict[str, int]):
+        self.score = score
+        self.action = action
+        self.counts = counts
+
+    def as_dict(self) -> dict:
+        return {"score": self.score, "action": self.action, "counts": self.counts}
+
+
+def velocity_keys(lead_data: LeadCreate) -> Dict[str, str]:
+    """Normalized value per dimension (dimensions that don't apply are left out)"""
+    keys = {"phone": normalize_phone_number(lead_data.phone)}
+    if lead_data.email:
+        domain = str(lead_data.email).rsplit("@", 1)[-1].lower()
+        if domain not in FREE_EMAIL_DOMAINS:
+            keys["email_domain"] = domain
+    if lead_data.message:
+        # Templates vary numbers and spacing; fold those away before hashing
+        template = re.sub(r"[\W_]+", " ", re.sub(r"\d+", "#", lead_data.message.lower())).strip()
+        if len(template) >= MIN_TEMPLATE_LENGTH:
+            keys["message"] = hashlib.sha1(template.encode()).hexdigest()
+    if lead_data.property_id is not None:
+        keys["property"] = str(lead_data.property_id)
+    return keys
+
+
+def spam_score(counts: Dict[str, int]) -> float:
+    """Noisy-OR of each dimension's saturation, 0-100"""
+    clean = 1.0
+    for dimension, count in counts.items():
+        weight, saturation = VELOCITY_DIMENSIONS[dimension]
+        clean *= 1.0 - weight * min(1.0, max(0, count - 1) / (saturation - 1))
+    return round(100 * (1.0 - clean), 1)
+
+
+class LeadVelocity:
+    """Sliding-window counters per dimension, spam verdicts and the quarantine list"""
+
+    def __init__(
+        self,
+        window_seconds: int = settings.LEAD_VELOCITY_WINDOW_SECONDS,
+        quarantine_score: float = settings.LEAD_SPAM_QUARANTINE_SCORE,
+        reject_score: float = settings.LEAD_SPAM_REJECT_SCORE,
+        quarantine_size: int = settings.LEAD_QUARANTINE_SIZE,
+        enabled: bool = settings.LEAD_VELOCITY_ENABLED,
+    ):
+        self.window_seconds = window_seconds
+        self.quarantine_score = quarantine_score
+        self.reject_score = reject_score
+        self.quarantine_size = quarantine_size
+        self.enabled = enabled
+        self.sketches = {dimension: SlidingCountMinSketch(window_seconds) for dimension in VELOCITY_DIMENSIONS}
+        self._quarantine = deque(maxlen=quarantine_size)
+
+    async def check(self, lead_data: LeadCreate, repeat: bool = False) -> VelocityVerdict:
+        """Count this submission and score it (a repeat counts and scores its phone only)"""
+        if not self.enabled:
+            return VelocityVerdict(0.0, ALLOW, {})
+        keys = velocity_keys(lead_data)
+        if repeat:
+            keys = {"phone": keys["phone"]}
+        now = time.time()
+
+        counts = None
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                counts = await self._add_redis(redis, keys, now)
+            except Exception as e:
+                logger.warning(f"Redis velocity failed: {e} - using in-memory counters")
+        if counts is None:
+            counts = {dimension: self.sketches[dimension].add(key, now) for dimension, key in keys.items()}
+
+        score = spam_score(counts)
+        if score >= self.reject_score:
+            action = REJECT
+        elif score >= self.quarantine_score:
+            action = QUARANTINE
+        else:
+            action = ALLOW
+        return VelocityVerdict(score, action, counts)
+
+    async def _add_redis(self, redis, keys: Dict[str, str], now: float) -> Dict[str, int]:
+        """Increment and read every dimension's sketch cells in one pipeline"""
+        pipe = redis.pipeline(transaction=False)
+        reads = []
+        for dimension, key in keys.items():
+            sketch = self.sketches[dimension]
+            current = sketch.bucket(now)
+            fields = [str(cell) for cell in sketch.cells(key)]
+            bucket_key = f"velocity:{dimension}:{current}"
+            for field in fields:
+                pipe.hincrby(bucket_key, field, 1)
+            pipe.expire(bucket_key, sketch.window_seconds + sketch.bucket_seconds)
+            for bucket in range(current - sketch.buckets + 1, current + 1):
+                pipe.hmget(f"velocity:{dimension}:{bucket}", fields)
+            reads.append((dimension, len(fields), sketch.buckets))
+        results = await pipe.execute()
+
+        counts, position = {}, 0
+        for dimension, depth, buckets in reads:
+            position += depth + 1
+            rows = results[position:position + buckets]
+            position += buckets
+            counts[dimension] = min(sum(int(row[i] or 0) for row in rows) for i in range(depth))
+        return counts
+
+    async def quarantine(self, lead_data: LeadCreate, verdict: VelocityVerdict, reference: str):
+        """Keep a suspicious submission for review instead of storing a lead"""
+        entry = {
+            "reference": reference,
+            "received_at": datetime.now(timezone.utc).isoformat(),
+            "lead": lead_data.model_dump(mode="json"),
+            **verdict.as_dict(),
+        }
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                pipe = redis.pipeline(transaction=False)
+                pipe.lpush("velocity:quarantine", json.dumps(entry))
+                pipe.ltrim("velocity:quarantine", 0, self.quarantine_size - 1)
+                await pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Redis quarantine failed: {e} - keeping it in memory")
+        self._quarantine.appendleft(entry)
+
+    async def quarantined(self, limit: int = 100) -> List[dict]:
+        """Most recent quarantined submissions, newest first"""
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                return [json.loads(raw) for raw in await redis.lrange("velocity:quarantine", 0, limit - 1)]
+            except Exception as e:
+                logger.warning(f"Redis quarantine failed: {e} - reading the in-memory list")
+        return list(self._quarantine)[:limit]
+
+    def clear(self):
+        self.sketches = {dimension: SlidingCountMinSketch(self.window_seconds) for dimension in VELOCITY_DIMENSIONS}
+        self._quarantine.clear()
+
+
+lead_velocity = LeadVelocity()
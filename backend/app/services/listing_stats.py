@@ -0,0 +1,220 @@
+"""
+IndoHomz Listing Stats
+
+Denormalized per-property lead counters, updated in the same transaction as
+every lead insert, status change and property reassignment:
+- property_lead_stats: one row per property - total leads and conversions
+  (leads currently converted), indexed on total_leads so the all-time top
+  listings are an index range read
+- property_lead_daily: (property, UTC creation day) buckets with the same
+  two counters; the last 7/30 days and any report window are sums over
+  O(days) bucket rows
+
+Leads without a property are not counted.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.database import models
+from app.services.lead_funnel import status_value, utc
+
+CONVERTED = "converted"
+TOP_LISTINGS = 10
+
+# (property_id, status) of a lead before or after a write; None if it did not exist
+LeadPlacement = Optional[Tuple[Optional[int], Optional[str]]]
+
+
+def creation_day(created_at: Optional[datetime] = None) -> date:
+    """UTC day a lead is bucketed under (default: today)"""
+    return utc(created_at or datetime.now(timezone.utc)).date()
+
+
+# =============================================================================
+# RECORDING
+# =============================================================================
+
+def record_lead_changes(db: Session, changes: Iterable[Tuple[Optional[datetime], LeadPlacement, LeadPlacement]]):
+    """
+    Apply (created_at, before, after) lead changes to the counters; the
+    caller commits. A new lead has before=None; a status change or move to
+    another property passes both placements.
+    """
+    deltas: Dict[Tuple[int, date], List[int]] = defaultdict(lambda: [0, 0])  # leads, conversions
+    for created_at, before, after in changes:
+        day = creation_day(created_at)
+        for placement, sign in ((before, -1), (after, 1)):
+            property_id, status = placement or (None, None)
+            if property_id is None:
+                continue
+            cell = deltas[(property_id, day)]
+            cell[0] += sign
+            cell[1] += sign * (status_value(status) == CONVERTED)
+    apply_listing_deltas(db, {key: cell for key, cell in deltas.items() if any(cell)})
+
+
+def apply_listing_deltas(db: Session, deltas: Dict[Tuple[int, date], List[int]]):
+    """Add deltas to the daily buckets and per-property totals (two upserts)"""
+    if not deltas:
+        return
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    totals: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    for (property_id, _), (leads, conversions) in deltas.items():
+        totals[property_id][0] += leads
+        totals[property_id][1] += conversions
+
+    daily = models.PropertyLeadDaily
+    stmt = dialect.insert(daily)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[daily.property_id, daily.day],
+            set_={"leads": daily.leads + stmt.excluded.leads, "conversions": daily.conversions + stmt.excluded.conversions},
+        ),
+        [
+            {"property_id": property_id, "day": day, "leads": leads, "conversions": conversions}
+            for (property_id, day), (leads, conversions) in sorted(deltas.items())  # fixed lock order
+        ],
+    )
+
+    stats = models.PropertyLeadStats
+    stmt = dialect.insert(stats)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[stats.property_id],
+            set_={
+                "total_leads": stats.total_leads + stmt.excluded.total_leads,
+                "conversions": stats.conversions + stmt.excluded.conversions,
+                "updated_at": func.now(),
+            },
+        ),
+        [
+            {"property_id": property_id, "total_leads": leads, "conversions": conversions}
+            for property_id, (leads, conversions) in sorted(totals.items())
+        ],
+    )
+
+
+def count_created_leads(db: Session, rows: Iterable[dict]):
+    """Count leads bulk-inserted from `rows` (property_id, status, created_at)"""
+    record_lead_changes(db, [
+        (r.get("created_at"), None, (r.get("property_id"), r.get("status") or "new")) for r in rows
+    ])
+
+
+def forget_property(db: Session, property_id: int):
+    """Drop the counters of a property being deleted (its leads are detached)"""
+    db.execute(delete(models.PropertyLeadDaily).where(models.PropertyLeadDaily.property_id == property_id))
+    db.execute(delete(models.PropertyLeadStats).where(models.PropertyLeadStats.property_id == property_id))
+
+
+def rebuild_listing_stats(db: Session):
+    """Recompute every counter from the leads table (backfill and repair); the caller commits"""
+    lead = models.Lead
+    if db.get_bind().dialect.name == "postgresql":
+        day = func.date(func.timezone("UTC", lead.created_at))
+    else:
+        day = func.date(lead.created_at)  # text on SQLite
+    rows = db.execute(
+        select(lead.property_id, day, func.count(), func.sum(case((lead.status == CONVERTED, 1), else_=0)))
+        .where(lead.property_id.isnot(None))
+        .group_by(lead.property_id, day)
+    ).all()
+    db.execute(delete(models.PropertyLeadDaily))
+    db.execute(delete(models.PropertyLeadStats))
+    apply_listing_deltas(db, {
+        (property_id, date.fromisoformat(d) if isinstance(d, str) else d): [count, conversions]
+        for property_id, d, count, conversions in rows
+    })
+
+
+# =============================================================================
+# QUERIES
+# =============================================================================
+
+def recent_leads(db: Session, property_ids: List[int], today: Optional[date] = None) -> Dict[int, Tuple[int, int]]:
+    """(leads in the last 7 days, last 30 days) per property, today included"""
+    if not property_ids:
+        return {}
+    today = today or creation_day()
+    daily = models.PropertyLeadDaily
+    rows = db.execute(
+        select(
+            daily.property_id,
+            func.sum(case((daily.day > today - timedelta(days=7), daily.leads), else_=0)),
+            func.sum(daily.leads),
+        )
+        .where(daily.property_id.in_(property_ids), daily.day > today - timedelta(days=30))
+        .group_by(daily.property_id)
+    ).all()
+    return {property_id: (int(week), int(month)) for property_id, week, month in rows}
+
+
+def top_listings(db: Session, limit: int = TOP_LISTINGS) -> List[dict]:
+    """Properties with the most leads ever (index range read on total_leads)"""
+    stats = models.PropertyLeadStats
+    prop = models.Property
+    rows = db.execute(
+        select(prop.id, prop.title, prop.location, stats.total_leads, stats.conversions)
+        .join(prop, prop.id == stats.property_id)
+        .where(stats.total_leads > 0)
+        .order_by(stats.total_leads.desc(), stats.property_id.desc())
+        .limit(limit)
+    ).all()
+    return [
+        {"property_id": r.id, "title": r.title, "location": r.location,
+         "total_leads": r.total_leads, "conversions": r.conversions}
+        for r in rows
+    ]
+
+
+def top_listings_between(
+    db: Session,
+    start_day: date,
+    end_day: date,
+    limit: int = TOP_LISTINGS,
+    today: Optional[date] = None,
+) -> List[dict]:
+    """
+    Properties with the most leads created between start_day and end_day
+    (inclusive), with their conversions in the window, all-time total and
+    last 7/30 days.
+    """
+    daily = models.PropertyLeadDaily
+    leads = func.sum(daily.leads)
+    window = (
+        select(daily.property_id, leads.label("leads"), func.sum(daily.conversions).label("conversions"))
+        .where(daily.day >= start_day, daily.day <= end_day)
+        .group_by(daily.property_id)
+        .having(leads > 0)
+        .order_by(leads.desc(), daily.property_id.desc())
+        .limit(limit)
+        .subquery()
+    )
+    prop = models.Property
+    stats = models.PropertyLeadStats
+    rows = db.execute(
+        select(prop.id, prop.title, prop.location, window.c.leads, window.c.conversions, stats.total_leads)
+        .join(prop, prop.id == window.c.property_id)
+        .outerjoin(stats, stats.property_id == window.c.property_id)
+        .order_by(window.c.leads.desc(), window.c.property_id.desc())
+    ).all()
+    recent = recent_leads(db, [r.id for r in rows], today)
+    return [
+        {
+            "property_id": r.id,
+            "title": r.title,
+            "location": r.location,
+            "leads": int(r.leads),
+            "conversions": int(r.conversions),
+            "total_leads": r.total_leads or 0,
+            "leads_last_7_days": recent.get(r.id, (0, 0))[0],
+            "leads_last_30_days": recent.get(r.id, (0, 0))[1],
+        }
+        for r in rows
+    ]
@@ -0,0 +1,242 @@
+"""
+IndoHomz Live Events
+
+Dashboard deltas (new lead, status change, availability change, property
+created) pushed to admin dashboards over Server-Sent Events instead of
+polling the analytics endpoints.
+
+Write paths queue events on their session (emit); they are published only
+once that session commits, and dropped on rollback, so a dashboard never
+sees a change that did not happen. The LiveEventBroadcaster fans them out
+to one bounded queue per open stream. With Redis enabled, events go
+through a pub/sub channel so every worker's streams see every worker's
+writes.
+
+An idle stream is a parked coroutine and a small queue - no thread and no
+database session - so one worker holds thousands. A stream that falls
+LIVE_EVENTS_QUEUE_SIZE events behind gets a single "resync" event (refetch
+the dashboard) instead of an unbounded backlog.
+"""
+
+import asyncio
+import json
+import logging
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis not installed: in-process fan-out only
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "live_events"
+RESYNC = {"type": "resync", "data": {}}
+
+# Event types
+LEAD_CREATED = "lead.created"
+LEAD_STATUS_CHANGED = "lead.status_changed"
+LEADS_STATUS_CHANGED = "leads.status_changed"  # bulk update, one event per call
+PROPERTY_CREATED = "property.created"
+PROPERTIES_IMPORTED = "properties.imported"
+AVAILABILITY_CHANGED = "property.availability_changed"
+
+
+class TooManySubscribers(Exception):
+    """Raised when LIVE_EVENTS_MAX_SUBSCRIBERS streams are already open"""
+
+
+# =============================================================================
+# PUBLISHING (on commit)
+# =============================================================================
+
+def emit(db: Session, event_type: str, **data):
+    """Queue an event on `db`; published when it commits, dropped on rollback"""
+    db.info.setdefault(PENDING_KEY, []).append({
+        "type": event_type,
+        "data": data,
+        "at": datetime.now(timezone.utc).isoformat(),
+    })
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session):
+    events = session.info.pop(PENDING_KEY, None)
+    if events:
+        live_events.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session):
+    session.info.pop(PENDING_KEY, None)
+
+
+# =============================================================================
+# BROADCASTER
+# =============================================================================
+
+class LiveEventBroadcaster:
+    """Fans published events out to every open stream in this worker"""
+
+    def __init__(
+        self,
+        queue_size: int = settings.LIVE_EVENTS_QUEUE_SIZE,
+        max_subscribers: int = settings.LIVE_EVENTS_MAX_SUBSCRIBERS,
+        channel: str = settings.LIVE_EVENTS_CHANNEL,
+    ):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.channel = channel
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[asyncio.Task] = None
+        self.stats = {"published": 0, "delivered": 0, "resyncs": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    @property
+    def via_redis(self) -> bool:
+        return self._listener is not None and not self._listener.done()
+
+    def start(self):
+        """Bind to the running event loop; subscribe to Redis if caching uses it"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        if cache.redis_client is not None and aioredis is not None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """End every open stream and the Redis subscription"""
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+        for queue in list(self._subscribers):
+            self._replace_backlog(queue, None)  # None ends the stream
+        self._loop = None
+
+    def publish(self, events: List[dict]):
+        """Publish committed events (thread-safe; writes also run in worker threads)"""
+        self.stats["published"] += len(events)
+        if self.via_redis:
+            try:
+                # Every worker, this one included, fans out from the channel
+                cache.redis_client.publish(self.channel, json.dumps(events, default=str))
+                return
+            except Exception as e:
+                logger.warning(f"Live event publish to Redis failed, delivering locally: {e}")
+        self._dispatch(events)
+
+    def _dispatch(self, events: List[dict]):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return  # not started (scripts, tests): nobody is listening
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if current is loop:
+            self._fan_out(events)
+        else:
+            loop.call_soon_threadsafe(self._fan_out, events)
+
+    def _fan_out(self, events: List[dict]):
+        for queue in list(self._subscribers):
+            for item in events:
+                try:
+                    queue.put_nowait(item)
+                    self.stats["delivered"] += 1
+                except asyncio.QueueFull:
+                    # Too far behind: drop the backlog, the client refetches instead
+                    self._replace_backlog(queue, RESYNC)
+                    self.stats["resyncs"] += 1
+                    break
+
+    @staticmethod
+    def _replace_backlog(queue: asyncio.Queue, item: Optional[dict]):
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(item)
+
+    async def _listen(self):
+        """Relay events published by any worker to this worker's streams"""
+        while True:
+            client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._fan_out(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Live event subscription lost, retrying: {e}")
+                await asyncio.sleep(1.0)
+            finally:
+                await client.aclose()
+
+    # Streams
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a stream's queue (call unsubscribe when it closes)"""
+        if self.full:
+            raise TooManySubscribers(f"{self.max_subscribers} live streams already open")
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    async def stream(self, heartbeat: float = settings.LIVE_EVENTS_HEARTBEAT_SECONDS) -> AsyncIterator[str]:
+        """
+        SSE-formatted events for one client until the broadcaster stops or
+        the client goes away (the response task is cancelled). Comment
+        lines every `heartbeat` seconds keep proxies from closing idle
+        connections.
+        """
+        queue = self.subscribe()
+        try:
+            yield f"retry: {int(settings.LIVE_EVENTS_RETRY_SECONDS * 1000)}\n\n"
+            yield format_sse({"type": "ready", "data": {}})
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    return
+                yield format_sse(item)
+        finally:
+            self.unsubscribe(queue)
+
+
+def format_sse(item: dict) -> str:
+    """One SSE message: the event type as `event:` and the rest as JSON `data:`"""
+    body = {k: v for k, v in item.items() if k != "type"}
+    return f"event: {item['type']}\ndata: {json.dumps(body, default=str)}\n\n"
+
+
+live_events = LiveEventBroadcaster()
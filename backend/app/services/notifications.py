@@ -0,0 +1,403 @@
+"""
+IndoHomz Notifications
+
+New-lead alerts to the assigned agent over WhatsApp, SMS, email and
+webhooks, delivered through a transactional outbox.
+
+The request path only adds notification_outbox rows (lead_outbox_rows) in
+the same transaction as the lead, so provider latency and outages never
+reach lead submission and no alert is lost if the process dies. The
+NotificationDispatcher polls for due rows, claims them with a lease and
+sends with bounded concurrency (NOTIFY_CONCURRENCY), a token bucket per
+provider (NOTIFY_RATE_LIMITS) and exponential backoff between attempts.
+Rows the provider rejects outright (4xx), or that exhaust
+NOTIFY_MAX_ATTEMPTS, end as "failed" with the last error kept.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import models
+from app.database.connection import SessionLocal
+from app.services.otp_service import send_sms_msg91, send_sms_twilio
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ("whatsapp", "sms", "email", "webhook")
+SENDGRID_API_URL = "https://api.sendgrid.com/v3/mail/send"
+
+# Lead fields copied into the outbox payload
+PAYLOAD_FIELDS = ("reference", "name", "phone", "email", "property_id", "message", "source", "preferred_visit_date")
+
+
+class NotificationError(Exception):
+    """A send failed; retryable=False means trying again cannot help"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enabled_channels() -> List[str]:
+    return [c.strip() for c in settings.NOTIFY_CHANNELS.split(",") if c.strip() in CHANNELS]
+
+
+def lead_outbox_rows(lead: dict) -> List[dict]:
+    """
+    Outbox insert parameters for a new lead, one row per enabled channel.
+
+    Add them in the lead's own transaction; the dispatcher does the rest.
+    """
+    channels = enabled_channels()
+    if not channels:
+        return []
+    payload = json.dumps({field: lead.get(field) for field in PAYLOAD_FIELDS}, default=str)
+    now = utcnow()
+    return [
+        {
+            "event": "lead.created",
+            "channel": channel,
+            "lead_reference": lead.get("reference"),
+            "payload": payload,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+        }
+        for channel in channels
+    ]
+
+
+def format_message(payload: dict) -> str:
+    """Plain-text alert body shared by WhatsApp, SMS and email"""
+    lines = [f"New IndoHomz lead: {payload.get('name')} ({payload.get('phone')})"]
+    if payload.get("property_id"):
+        lines.append(f"Property #{payload['property_id']}")
+    if payload.get("preferred_visit_date"):
+        lines.append(f"Visit: {payload['preferred_visit_date']}")
+    if payload.get("message"):
+        lines.append(payload["message"][:300])
+    return "\n".join(lines)
+
+
+# =============================================================================
+# PROVIDERS
+# =============================================================================
+
+def _check_response(response: httpx.Response, provider: str):
+    if response.status_code < 300:
+        return
+    retryable = response.status_code >= 500 or response.status_code in (408, 429)
+    raise NotificationError(f"{provider} returned HTTP {response.status_code}", retryable=retryable)
+
+
+async def send_whatsapp(client: httpx.AsyncClient, to: str, note: dict):
+    """WhatsApp Cloud API text message"""
+    if not (settings.WHATSAPP_API_URL and settings.WHATSAPP_PHONE_NUMBER_ID):
+        raise NotificationError("WhatsApp API not configured", retryable=False)
+    response = await client.post(
+        f"{settings.WHATSAPP_API_URL.rstrip('/')}/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages",
+        headers={"Authorization": f"Bearer {settings.WHATSAPP_API_TOKEN}"},
+        json={
+            "messaging_product": "whatsapp",
+            "to": to.lstrip("+") if len(to) > 10 else f"91{to}",
+            "type": "text",
+            "text": {"body": format_message(note["payload"])},
+        },
+    )
+    _check_response(response, "WhatsApp")
+
+
+async def send_sms(client: httpx.AsyncClient, to: str, note: dict):
+    """SMS through the OTP service's configured provider"""
+    sender = send_sms_msg91 if settings.SMS_PROVIDER == "msg91" else send_sms_twilio
+    if not await sender(to, format_message(note["payload"])):
+        raise NotificationError(f"{settings.SMS_PROVIDER} did not accept the SMS")
+
+
+async def send_email(client: httpx.AsyncClient, to: str, note: dict):
+    """Email through the SendGrid v3 API"""
+    if not settings.SENDGRID_API_KEY:
+        raise NotificationError("SendGrid API key not configured", retryable=False)
+    payload = note["payload"]
+    response = await client.post(
+        SENDGRID_API_URL,
+        headers={"Authorization": f"Bearer {settings.SENDGRID_API_KEY}"},
+        json={
+            "personalizations": [{"to": [{"email": to}]}],
+            "from": {"email": settings.NOTIFY_EMAIL_FROM},
+            "subject": f"New lead: {payload.get('name')}",
+            "content": [{"type": "text/plain", "value": format_message(payload)}],
+        },
+    )
+    _check_response(response, "SendGrid")
+
+
+async def send_webhook(client: httpx.AsyncClient, to: str, note: dict):
+    """JSON POST; the Idempotency-Key lets receivers drop redelivered attempts"""
+    response = await client.post(
+        to,
+        headers={"Idempotency-Key": f"outbox-{note['id']}"},
+        json={"event": note["event"], "lead": note["payload"]},
+    )
+    _check_response(response, "Webhook")
+
+
+Sender = Callable[[httpx.AsyncClient, str, dict], Awaitable[None]]
+
+SENDERS: Dict[str, Sender] = {
+    "whatsapp": send_whatsapp,
+    "sms": send_sms,
+    "email": send_email,
+    "webhook": send_webhook,
+}
+
+
+# =============================================================================
+# DISPATCHER
+# =============================================================================
+
+class TokenBucket:
+    """Async token bucket: `rate` acquisitions per second, bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class NotificationDispatcher:
+    """Polls the outbox and delivers due notifications"""
+
+    def __init__(
+        self,
+        concurrency: int = settings.NOTIFY_CONCURRENCY,
+        batch_size: int = settings.NOTIFY_BATCH_SIZE,
+        poll_interval: float = settings.NOTIFY_POLL_INTERVAL,
+        lease_seconds: int = settings.NOTIFY_LEASE_SECONDS,
+        max_attempts: int = settings.NOTIFY_MAX_ATTEMPTS,
+        backoff_base: float = settings.NOTIFY_BACKOFF_BASE,
+        backoff_max: float = settings.NOTIFY_BACKOFF_MAX,
+        rate_limits: Optional[Dict[str, float]] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        senders: Optional[Dict[str, Sender]] = None,
+    ):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limits = rate_limits if rate_limits is not None else settings.NOTIFY_RATE_LIMITS
+        self.session_factory = session_factory
+        self.senders = senders or SENDERS
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "batches": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the polling task (must be called from the running event loop)"""
+        if self.running:
+            return
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._buckets = {channel: TokenBucket(rate) for channel, rate in self.rate_limits.items()}
+        self._client = httpx.AsyncClient(timeout=10.0)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 30.0):
+        """Finish the batch in flight, then stop; unsent rows stay in the outbox"""
+        if not self.running:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout=timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        await self._client.aclose()
+        self._task = None
+
+    def wake(self):
+        """Poll now instead of at the next interval (call from the event loop)"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while not self._stopping:
+            # Cleared before claiming so a wake() during the batch is not lost
+            self._wake.clear()
+            try:
+                claimed = await self.dispatch_once()
+            except Exception:
+                logger.exception("Notification dispatch failed")
+                claimed = 0
+            if claimed < self.batch_size and not self._stopping:
+                # Caught up; sleep until the next poll or a wake()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+
+    async def dispatch_once(self) -> int:
+        """Claim one batch of due rows and send them; returns the number claimed"""
+        notes = await asyncio.to_thread(self._claim_batch)
+        if notes:
+            results = await asyncio.gather(*(self._deliver(note) for note in notes))
+            await asyncio.to_thread(self._record_results, results)
+            self.stats["batches"] += 1
+        return len(notes)
+
+    def _claim_batch(self) -> List[dict]:
+        """
+        Lease due rows to this worker. Rows still "sending" after their lease
+        (a worker died mid-send) are due again, so delivery is at-least-once.
+        """
+        outbox = models.NotificationOutbox
+        now = utcnow()
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(outbox.id, outbox.channel, outbox.event, outbox.payload, outbox.attempts, outbox.lead_reference)
+                .where(outbox.status.in_(("pending", "sending")), outbox.next_attempt_at <= now)
+                .order_by(outbox.next_attempt_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not rows:
+                db.rollback()
+                return []
+            db.execute(
+                update(outbox)
+                .where(outbox.id.in_([row.id for row in rows]))
+                .values(
+                    status="sending",
+                    attempts=outbox.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=self.lease_seconds),
+                )
+            )
+            contacts = self._assignee_contacts(db, {row.lead_reference for row in rows if row.lead_reference})
+            db.commit()
+        finally:
+            db.close()
+
+        return [
+            {
+                "id": row.id,
+                "channel": row.channel,
+                "event": row.event,
+                "payload": json.loads(row.payload),
+                "attempt": row.attempts + 1,
+                "to": self._recipient(row.channel, contacts.get(row.lead_reference)),
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _assignee_contacts(db: Session, references: Iterable[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """(phone, email) of the assigned agent, by lead reference"""
+        if not references:
+            return {}
+        rows = db.execute(
+            select(models.Lead.reference, models.User.phone, models.User.email)
+            .join(models.User, models.User.id == models.Lead.assigned_to)
+            .where(models.Lead.reference.in_(list(references)))
+        ).all()
+        return {reference: (phone, email) for reference, phone, email in rows}
+
+    @staticmethod
+    def _recipient(channel: str, contact: Optional[Tuple[Optional[str], Optional[str]]]) -> Optional[str]:
+        phone, email = contact or (None, None)
+        if channel in ("whatsapp", "sms"):
+            return phone or settings.NOTIFY_DEFAULT_PHONE
+        if channel == "email":
+            return email or settings.NOTIFY_DEFAULT_EMAIL
+        return settings.NOTIFY_WEBHOOK_URL
+
+    async def _deliver(self, note: dict) -> Tuple[dict, Optional[str], bool]:
+        """Send one notification; returns (note, error, retryable)"""
+        sender = self.senders.get(note["channel"])
+        if sender is None:
+            return note, f"Unknown channel {note['channel']}", False
+        if not note["to"]:
+            return note, f"No {note['channel']} recipient configured", False
+
+        bucket = self._buckets.get(note["channel"])
+        if bucket is not None:
+            await bucket.acquire()
+        async with self._semaphore:
+            try:
+                await sender(self._client, note["to"], note)
+            except NotificationError as e:
+                return note, str(e), e.retryable
+            except httpx.HTTPError as e:
+                return note, f"{type(e).__name__}: {e}", True
+        return note, None, False
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds before retrying after `attempt` failed (capped, with jitter)"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _record_results(self, results: List[Tuple[dict, Optional[str], bool]]):
+        """Write every outcome of a batch on one connection"""
+        outbox = models.NotificationOutbox
+        now = utcnow()
+        db = self.session_factory()
+        try:
+            for note, error, retryable in results:
+                if error is None:
+                    values = {"status": "sent", "sent_at": now, "last_error": None}
+                    self.stats["sent"] += 1
+                elif retryable and note["attempt"] < self.max_attempts:
+                    values = {
+                        "status": "pending",
+                        "next_attempt_at": now + timedelta(seconds=self.backoff(note["attempt"])),
+                        "last_error": error,
+                    }
+                    self.stats["retried"] += 1
+                else:
+                    values = {"status": "failed", "last_error": error}
+                    self.stats["failed"] += 1
+                    logger.error(f"Notification {note['id']} ({note['channel']}) failed: {error}")
+                db.execute(update(outbox).where(outbox.id == note["id"]).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+
+notification_dispatcher = NotificationDispatcher()
@@ -0,0 +1,192 @@
+"""
+IndoHomz Price Analytics
+
+Rent histograms and percentiles over properties.price_numeric, computed in
+the database so only O(buckets x groups) rows come back:
+- histogram: one GROUP BY over a CASE expression mapping each rent to its bucket
+- percentiles: percentile_cont on Postgres; elsewhere ROW_NUMBER() windows
+  return just the two rows around each percentile rank for interpolation
+- auto buckets: edges at equal-count quantiles of the filtered rents
+
+Properties without price_numeric are reported as `unpriced`.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import case, func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.database import models
+
+DEFAULT_PRICE_EDGES = [50000.0, 100000.0, 200000.0, 300000.0]
+PERCENTILES = (0.1, 0.5, 0.9)
+UNPRICED = -1  # bucket number for properties without a numeric rent
+
+GROUP_COLUMNS = {
+    "city": models.Property.city,
+    "property_type": models.Property.property_type,
+    "bedrooms": models.Property.bedrooms,
+}
+
+
+def format_rent(value: float) -> str:
+    """₹ label in the listing style: ₹8,500 / ₹50K / ₹1.5L"""
+    if value >= 100000:
+        return f"₹{value / 100000:g}L"
+    if value >= 1000:
+        return f"₹{value / 1000:g}K"
+    return f"₹{value:,.0f}"
+
+
+def bucket_labels(edges: Sequence[float]) -> List[dict]:
+    """Range label and bounds for each of the len(edges) + 1 buckets"""
+    bounds = [None, *edges, None]
+    buckets = []
+    for low, high in zip(bounds, bounds[1:]):
+        if low is None:
+            label = f"Under {format_rent(high)}"
+        elif high is None:
+            label = f"Above {format_rent(low)}"
+        else:
+            label = f"{format_rent(low)} - {format_rent(high)}"
+        buckets.append({"range": label, "min": low, "max": high})
+    return buckets
+
+
+def bucket_expression(edges: Sequence[float]):
+    """CASE mapping price_numeric to its bucket number (lower edge inclusive)"""
+    price = models.Property.price_numeric
+    whens = [(price.is_(None), UNPRICED)]
+    whens += [(price < edge, number) for number, edge in enumerate(edges)]
+    return case(*whens, else_=len(edges))
+
+
+def price_percentiles(
+    db: Session,
+    clauses: Sequence = (),
+    group_by: Optional[str] = None,
+    points: Sequence[float] = PERCENTILES,
+) -> Dict[object, Dict[float, float]]:
+    """
+    Continuous percentiles (linear interpolation, like percentile_cont) of
+    price_numeric, per group value (key None when ungrouped).
+    """
+    price = models.Property.price_numeric
+    groups = [GROUP_COLUMNS[group_by].label("grp")] if group_by else []
+    where = [price.isnot(None), *clauses]
+
+    if db.get_bind().dialect.name == "postgresql":
+        columns = [func.percentile_cont(p).within_group(price.asc()) for p in points]
+        stmt = select(*groups, *columns).where(*where).group_by(*groups)
+        rows = db.execute(stmt).all()
+        if not group_by:
+            return {None: dict(zip(points, rows[0]))} if rows and rows[0][0] is not None else {}
+        return {row[0]: dict(zip(points, row[1:])) for row in rows}
+
+    partition = groups[0].element if groups else None
+    ranked = select(
+        *groups,
+        price.label("price"),
+        func.row_number().over(partition_by=partition, order_by=price).label("rn"),
+        func.count().over(partition_by=partition).label("n"),
+    ).where(*where).subquery()
+    # 1-based rank position of each percentile; keep the rows on either side
+    near = or_(*(func.abs(ranked.c.rn - (1 + p * (ranked.c.n - 1))) < 1 for p in points))
+    group_column = [ranked.c.grp] if group_by else [literal(None)]
+    rows = db.execute(select(*group_column, ranked.c.rn, ranked.c.n, ranked.c.price).where(near))
+
+    by_rank: Dict[object, Dict[int, float]] = {}
+    sizes: Dict[object, int] = {}
+    for grp, rn, n, value in rows:
+        by_rank.setdefault(grp, {})[rn] = value
+        sizes[grp] = n
+    result = {}
+    for grp, ranks in by_rank.items():
+        values = {}
+        for p in points:
+            position = 1 + p * (sizes[grp] - 1)
+            low, high = ranks[math.floor(position)], ranks[math.ceil(position)]
+            values[p] = low + (high - low) * (position - math.floor(position))
+        result[grp] = values
+    return result
+
+
+def quantile_edges(db: Session, buckets: int, clauses: Sequence = ()) -> List[float]:
+    """Edges splitting the filtered rents into `buckets` roughly equal-count buckets"""
+    points = [k / buckets for k in range(1, buckets)]
+    overall = price_percentiles(db, clauses, points=points).get(None)
+    if not overall:
+        return []
+    # Round to readable amounts; ties collapse (few distinct rents -> fewer buckets)
+    return sorted({round(overall[p], -2) for p in points})
+
+
+def percentile_summary(values: Optional[Dict[float, float]]) -> Dict[str, Optional[float]]:
+    return {f"p{round(p * 100)}": (values or {}).get(p) for p in PERCENTILES}
+
+
+def price_histogram(
+    db: Session,
+    edges: Optional[Sequence[float]] = None,
+    quantile_buckets: Optional[int] = None,
+    group_by: Optional[str] = None,
+    city: Optional[str] = None,
+    property_type: Optional[str] = None,
+) -> dict:
+    """
+    Rent histogram with p10/p50/p90, overall and (with group_by) per group.
+
+    Buckets come from `edges` (ascending, in ₹), or `quantile_buckets`
+    equal-count buckets, or DEFAULT_PRICE_EDGES (also when there are no
+    priced rows to take quantiles of).
+    """
+    clauses = []
+    if city:
+        clauses.append(models.Property.city == city)
+    if property_type:
+        clauses.append(models.Property.property_type == property_type)
+
+    if quantile_buckets:
+        # No priced rows match the filters: keep the default buckets (all empty)
+        edges = quantile_edges(db, quantile_buckets, clauses) or DEFAULT_PRICE_EDGES
+    elif edges is None:
+        edges = DEFAULT_PRICE_EDGES
+    edges = list(edges)
+
+    bucket = bucket_expression(edges).label("bucket")
+    group_columns = [GROUP_COLUMNS[group_by]] if group_by else []
+    stmt = select(*group_columns, bucket, func.count()).where(*clauses).group_by(*group_columns, bucket)
+
+    labels = bucket_labels(edges)
+    groups: Dict[object, dict] = {}
+    for row in db.execute(stmt):
+        grp, number, count = row if group_by else (None, *row)
+        entry = groups.setdefault(grp, {"counts": [0] * len(labels), "unpriced": 0})
+        if number == UNPRICED:
+            entry["unpriced"] += count
+        else:
+            entry["counts"][number] += count
+
+    overall_counts = [sum(entry["counts"][i] for entry in groups.values()) for i in range(len(labels))]
+    result = {
+        "edges": edges,
+        "group_by": group_by,
+        "total": sum(overall_counts),
+        "unpriced": sum(entry["unpriced"] for entry in groups.values()),
+        "distribution": [{**label, "count": count} for label, count in zip(labels, overall_counts)],
+        "percentiles": percentile_summary(price_percentiles(db, clauses).get(None)),
+    }
+    if group_by:
+        percentiles = price_percentiles(db, clauses, group_by=group_by)
+        result["groups"] = [
+            {
+                "group": grp,
+                "total": sum(entry["counts"]),
+                "unpriced": entry["unpriced"],
+                "distribution": [{**label, "count": count} for label, count in zip(labels, entry["counts"])],
+                "percentiles": percentile_summary(percentiles.get(grp)),
+            }
+            for grp, entry in sorted(groups.items(), key=lambda item: -sum(item[1]["counts"]))
+        ]
+    return result
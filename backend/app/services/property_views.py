@@ -0,0 +1,341 @@
+"""
+IndoHomz Property Views
+
+Detail-page view counters that keep the hottest read path read-only. A
+view is one increment in an in-process counter shard (each thread is
+dealt the next shard round-robin on its first view, one lock each, so
+concurrent requests rarely share a lock); the
+ViewCounter's flush task adds the buffered counts to the database every
+PROPERTY_VIEW_FLUSH_SECONDS with one batched upsert per table:
+- property_view_stats: all-time views per property, indexed on views
+- property_view_daily: (property, UTC day) buckets; windows, view-to-lead
+  conversion and trending are sums over O(days) bucket rows
+
+With Redis enabled each worker's flush HINCRBYs its counts into one shared
+hash and drains the hash in the same MULTI, so the database sees one
+batch per interval whichever worker flushes, not one per worker.
+
+Reads lag the buffer by up to one flush interval.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+from collections import Counter
+from contextlib import suppress
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.database import models
+from app.database.connection import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = "views:pending"  # hash of "<property_id>:<day>" -> buffered views
+TOP_LISTINGS = 10
+
+ViewCounts = Counter  # (property_id, day) -> views
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+# =============================================================================
+# WRITING
+# =============================================================================
+
+def apply_view_counts(db: Session, counts: ViewCounts) -> int:
+    """Add buffered views to the daily buckets and totals (two upserts); the caller commits"""
+    existing = set(db.execute(
+        select(models.Property.id).where(models.Property.id.in_({property_id for property_id, _ in counts}))
+    ).scalars())
+    counts = {key: views for key, views in counts.items() if key[0] in existing and views}  # deleted since viewed
+    if not counts:
+        return 0
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    totals: Counter = Counter()
+    for (property_id, _), views in counts.items():
+        totals[property_id] += views
+
+    daily = models.PropertyViewDaily
+    stmt = dialect.insert(daily)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[daily.property_id, daily.day],
+            set_={"views": daily.views + stmt.excluded.views},
+        ),
+        [
+            {"property_id": property_id, "day": day, "views": views}
+            for (property_id, day), views in sorted(counts.items())  # fixed lock order
+        ],
+    )
+
+    stats = models.PropertyViewStats
+    stmt = dialect.insert(stats)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[stats.property_id],
+            set_={"views": stats.views + stmt.excluded.views, "updated_at": func.now()},
+        ),
+        [{"property_id": property_id, "views": views} for property_id, views in sorted(totals.items())],
+    )
+    return len(counts)
+
+
+def forget_property_views(db: Session, property_id: int):
+    """Drop the view counters of a property being deleted"""
+    db.execute(delete(models.PropertyViewDaily).where(models.PropertyViewDaily.property_id == property_id))
+    db.execute(delete(models.PropertyViewStats).where(models.PropertyViewStats.property_id == property_id))
+
+
+# =============================================================================
+# BUFFER
+# =============================================================================
+
+class ViewCounter:
+    """Sharded in-process view counts, flushed to the database in batches"""
+
+    def __init__(
+        self,
+        shards: int = settings.PROPERTY_VIEW_SHARDS,
+        flush_interval: float = settings.PROPERTY_VIEW_FLUSH_SECONDS,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self._shards: List[Tuple[threading.Lock, ViewCounts]] = [
+            (threading.Lock(), Counter()) for _ in range(max(1, shards))
+        ]
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"recorded": 0, "flushed": 0, "failed": 0}
+
+    @property
+    def redis(self):
+        return cache.redis_client
+
+    def _shard(self) -> Tuple[threading.Lock, ViewCounts]:
+        """This thread's shard (thread idents are aligned addresses, so no modulo)"""
+        index = getattr(self._local, "shard", None)
+        if index is None:
+            index = self._local.shard = next(self._next_shard) % len(self._shards)
+        return self._shards[index]
+
+    @property
+    def pending(self) -> int:
+        return sum(sum(counts.values()) for _, counts in self._shards)
+
+    def record(self, property_id: int, views: int = 1, day: Optional[date] = None):
+        """Count a detail-page view (no I/O)"""
+        lock, counts = self._shard()
+        with lock:
+            counts[(property_id, day or utc_today())] += views
+            self.stats["recorded"] += views
+
+    def _drain(self) -> ViewCounts:
+        drained: ViewCounts = Counter()
+        for lock, counts in self._shards:
+            with lock:
+                drained.update(counts)
+                counts.clear()
+        return drained
+
+    def _restore(self, counts: ViewCounts):
+        lock, shard = self._shards[0]
+        with lock:
+            shard.update(counts)
+
+    def _exchange(self, counts: ViewCounts) -> ViewCounts:
+        """Add this worker's counts to the shared Redis hash and take everything in it"""
+        pipe = self.redis.pipeline()  # MULTI: nothing is lost or drained twice between workers
+        for (property_id, day), views in counts.items():
+            pipe.hincrby(REDIS_KEY, f"{property_id}:{day.isoformat()}", views)
+        pipe.hgetall(REDIS_KEY)
+        pipe.delete(REDIS_KEY)
+        buffered = pipe.execute()[-2]
+        drained: ViewCounts = Counter()
+        for field, views in buffered.items():
+            property_id, day = field.split(":")
+            drained[(int(property_id), date.fromisoformat(day))] += int(views)
+        return drained
+
+    def flush(self, db: Session) -> int:
+        """Write buffered views; returns the (property, day) buckets updated"""
+        counts = self._drain()
+        if self.redis is not None:
+            try:
+                counts = self._exchange(counts)
+            except Exception as e:
+                logger.warning(f"View counter HINCRBY failed, writing this worker's counts directly: {e}")
+        if not counts:
+            return 0
+        try:
+            written = apply_view_counts(db, counts)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._restore(counts)  # retried (and re-shared through Redis) next flush
+            raise
+        self.stats["flushed"] += written
+        return written
+
+    # Background task
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the flush task (must be called from the running event loop)"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the task and flush what is buffered"""
+        if not self.running:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        await asyncio.to_thread(self._flush_once)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.to_thread(self._flush_once)
+
+    def _flush_once(self):
+        db = self.session_factory()
+        try:
+            self.flush(db)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Property view flush failed: {e}")
+        finally:
+            db.close()
+
+
+view_counter = ViewCounter()
+
+
+# =============================================================================
+# QUERIES
+# =============================================================================
+
+def property_views(db: Session, property_id: int, start: date, end: date) -> dict:
+    """All-time views of a property and its views per day between start and end (inclusive)"""
+    daily = models.PropertyViewDaily
+    rows = db.execute(
+        select(daily.day, daily.views)
+        .where(daily.property_id == property_id, daily.day >= start, daily.day <= end)
+        .order_by(daily.day)
+    ).all()
+    total = db.execute(
+        select(models.PropertyViewStats.views).where(models.PropertyViewStats.property_id == property_id)
+    ).scalar()
+    return {
+        "total_views": total or 0,
+        "views": sum(views for _, views in rows),
+        "daily": [{"day": day.isoformat(), "views": views} for day, views in rows],
+    }
+
+
+def view_conversion(
+    db: Session,
+    start: date,
+    end: date,
+    limit: int = TOP_LISTINGS,
+    min_views: int = 1,
+) -> List[dict]:
+    """
+    Most viewed properties between start and end (inclusive) with the leads
+    created over the same days and the view-to-lead rate.
+    """
+    daily = models.PropertyViewDaily
+    views = func.sum(daily.views)
+    window = (
+        select(daily.property_id, views.label("views"))
+        .where(daily.day >= start, daily.day <= end)
+        .group_by(daily.property_id)
+        .having(views >= max(1, min_views))
+        .order_by(views.desc(), daily.property_id.desc())
+        .limit(limit)
+        .subquery()
+    )
+    prop = models.Property
+    rows = db.execute(
+        select(prop.id, prop.title, prop.location, window.c.views)
+        .join(prop, prop.id == window.c.property_id)
+        .order_by(window.c.views.desc(), window.c.property_id.desc())
+    ).all()
+
+    lead_daily = models.PropertyLeadDaily
+    leads = {
+        property_id: (int(count), int(conversions))
+        for property_id, count, conversions in db.execute(
+            select(lead_daily.property_id, func.sum(lead_daily.leads), func.sum(lead_daily.conversions))
+            .where(lead_daily.property_id.in_([r.id for r in rows]), lead_daily.day >= start, lead_daily.day <= end)
+            .group_by(lead_daily.property_id)
+        )
+    } if rows else {}
+    result = []
+    for r in rows:
+        count, conversions = leads.get(r.id, (0, 0))
+        result.append({
+            "property_id": r.id,
+            "title": r.title,
+            "location": r.location,
+            "views": int(r.views),
+            "leads": count,
+            "conversions": conversions,
+            "view_to_lead_rate": round(count / r.views * 100, 2),
+        })
+    return result
+
+
+def trending_listings(db: Session, days: int = 7, limit: int = TOP_LISTINGS, today: Optional[date] = None) -> List[dict]:
+    """
+    Properties whose views in the last `days` days (today included) grew
+    the most over the `days` days before.
+    """
+    today = today or utc_today()
+    recent_start = today - timedelta(days=days - 1)
+    daily = models.PropertyViewDaily
+    recent = func.sum(case((daily.day >= recent_start, daily.views), else_=0))
+    previous = func.sum(case((daily.day < recent_start, daily.views), else_=0))
+    window = (
+        select(daily.property_id, recent.label("recent"), previous.label("previous"))
+        .where(daily.day >= recent_start - timedelta(days=days), daily.day <= today)
+        .group_by(daily.property_id)
+        .having(recent > previous)
+        .order_by((recent - previous).desc(), recent.desc(), daily.property_id.desc())
+        .limit(limit)
+        .subquery()
+    )
+    prop = models.Property
+    rows = db.execute(
+        select(prop.id, prop.title, prop.location, window.c.recent, window.c.previous)
+        .join(prop, prop.id == window.c.property_id)
+        .order_by((window.c.recent - window.c.previous).desc(), window.c.recent.desc(), window.c.property_id.desc())
+    ).all()
+    return [
+        {
+            "property_id": r.id,
+            "title": r.title,
+            "location": r.location,
+            "views": int(r.recent),
+            "previous_views": int(r.previous),
+            "growth": round((r.recent - r.previous) / r.previous * 100, 2) if r.previous else None,
+        }
+        for r in rows
+    ]
@@ -0,0 +1,124 @@
+"""
+IndoHomz Search Service
+
+Backend-agnostic text search for properties. Picks the database-native index
+for the connected backend and falls back to ILIKE when none is installed:
+- SQLite:     FTS5 trigram table (properties_fts) via MATCH
+- PostgreSQL: search_vector @@ prefix tsquery; ILIKE filters hit pg_trgm indexes
+"""
+
+import re
+from typing import Dict, Optional
+from sqlalchemy import bindparam, func, inspect, literal_column, or_, select, table
+from sqlalchemy.orm import Session
+
+from app.database import models
+from app.database.search_indexes import PROPERTY_FTS_TABLE
+
+# Trigram FTS can't match substrings shorter than this; those fall back to ILIKE
+FTS_MIN_TERM_LENGTH = 3
+
+# Search modes
+FTS5 = "fts5"
+POSTGRES = "postgres"
+LIKE = "like"
+
+
+def fts_phrase(value: str) -> str:
+    """Quote a value as an FTS5 phrase (substring match with the trigram tokenizer)"""
+    return '"' + value.replace('"', '""') + '"'
+
+
+def fts_column_query(column: str, value: str) -> str:
+    """FTS5 query restricting a phrase to one column, e.g. city : "gurg" """
+    return f"{column} : {fts_phrase(value)}"
+
+
+def fts_match_clause(param):
+    """
+    WHERE clause selecting properties whose FTS row matches `param`.
+
+    `param` is a bind parameter name (for cached statements) or a BindParameter.
+    """
+    match = bindparam(param) if isinstance(param, str) else param
+    fts = table(PROPERTY_FTS_TABLE)
+    return models.Property.id.in_(
+        select(literal_column("rowid")).select_from(fts).where(
+            literal_column(PROPERTY_FTS_TABLE).op("MATCH")(match)
+        )
+    )
+
+
+def fts_usable(value: Optional[str], phrase: bool = False) -> bool:
+    """True if the value (or, for term queries, every term) is long enough for the trigram index"""
+    if phrase:
+        return len(value or "") >= FTS_MIN_TERM_LENGTH
+    terms = (value or "").split()
+    return bool(terms) and all(len(term) >= FTS_MIN_TERM_LENGTH for term in terms)
+
+
+class SearchService:
+    """Builds index-backed text search clauses for the connected database"""
+
+    def __init__(self):
+        self._modes: Dict[object, str] = {}
+
+    def mode(self, db: Session) -> str:
+        """Detect (once per engine) which native search structure is installed"""
+        bind = db.get_bind()
+        engine = getattr(bind, "engine", bind)
+        mode = self._modes.get(engine)
+        if mode is None:
+            inspector = inspect(engine)
+            mode = LIKE
+            if engine.dialect.name == "sqlite" and inspector.has_table(PROPERTY_FTS_TABLE):
+                mode = FTS5
+            elif engine.dialect.name == "postgresql":
+                columns = {c["name"] for c in inspector.get_columns("properties")}
+                if "search_vector" in columns:
+                    mode = POSTGRES
+            self._modes[engine] = mode
+        return mode
+
+    def reset(self):
+        """Forget detected modes (call after installing or dropping search indexes)"""
+        self._modes.clear()
+
+    def text_match(self, db: Session, query_text: str):
+        """Clause matching properties whose text columns contain every term"""
+        mode = self.mode(db)
+
+        if mode == FTS5 and fts_usable(query_text):
+            match = " ".join(fts_phrase(term) for term in query_text.split())
+            return fts_match_clause(bindparam("fts_query", match, unique=True))
+
+        if mode == POSTGRES:
+            terms = re.findall(r"\w+", query_text)
+            if terms:
+                tsquery = " & ".join(f"{term}:*" for term in terms)
+                return literal_column("properties.search_vector").op("@@")(
+                    func.to_tsquery("simple", tsquery)
+                )
+
+        from app.services.crud import escape_like_pattern  # crud imports this module
+
+        search_term = f"%{escape_like_pattern(query_text)}%"
+        return or_(
+            models.Property.title.ilike(search_term, escape='\\'),
+            models.Property.location.ilike(search_term, escape='\\'),
+            models.Property.area.ilike(search_term, escape='\\'),
+            models.Property.amenities.ilike(search_term, escape='\\'),
+            models.Property.description.ilike(search_term, escape='\\'),
+        )
+
+    def column_contains(self, db: Session, column: str, value: str):
+        """Case-insensitive substring filter on a single property column"""
+        if self.mode(db) == FTS5 and fts_usable(value, phrase=True):
+            return fts_match_clause(bindparam(f"{column}_fts", fts_column_query(column, value), unique=True))
+        from app.services.crud import escape_like_pattern  # crud imports this module
+
+        # On Postgres the pg_trgm GIN indexes serve ILIKE '%x%' directly
+        return getattr(models.Property, column).ilike(f"%{escape_like_pattern(value)}%", escape='\\')
+
+
+search_service = SearchService()
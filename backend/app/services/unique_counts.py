@@ -0,0 +1,458 @@
+"""
+IndoHomz Unique Counts
+
+Approximate distinct visitors and inquirer phones per property and per
+city over any window of days, from HyperLogLog sketches kept per key per
+UTC day. Recording never does I/O on the request path; UniqueCounter's
+flush task writes what was buffered every UNIQUE_COUNTS_FLUSH_SECONDS:
+- Redis (when caching uses it): the distinct values seen since the last
+  flush are PFADDed into hll:<metric>:<scope>:<id>:<day> in one pipeline;
+  a window is one PFCOUNT over its day keys (Redis merges them)
+- otherwise: HyperLogLog registers buffered in process (sparse while
+  small, NumPy when installed) and merged into hll_sketches rows
+
+A sketch never exceeds 2^precision one-byte registers and merging is a
+register-wise max, so memory per key-day is fixed and a window query reads
+O(days) sketches whatever the traffic. Standard error is 1.04/sqrt(2^p)
+(0.81% at the default precision of 14, as Redis). Raw visitor ids and
+phone numbers are hashed into registers, never stored.
+"""
+
+import asyncio
+import logging
+import math
+import struct
+import threading
+from contextlib import suppress
+from datetime import date, datetime, timedelta, timezone
+from hashlib import blake2b
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.rate_limit import get_client_identifier
+from app.core.security import normalize_phone_number
+from app.database import models
+from app.database.connection import SessionLocal
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python registers
+    np = None
+
+logger = logging.getLogger(__name__)
+
+VISITORS = "visitors"
+INQUIRERS = "inquirers"
+METRICS = (VISITORS, INQUIRERS)
+
+SPARSE, DENSE = 0, 1
+# Reciprocal powers of two for the pure-Python harmonic mean
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+
+class UniqueCountsUnavailable(Exception):
+    """Raised when Redis cannot answer a count (rather than reporting zero)"""
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+# =============================================================================
+# HYPERLOGLOG
+# =============================================================================
+
+class HyperLogLog:
+    """
+    HyperLogLog over 64-bit blake2b hashes. Registers are an {index: rank}
+    dict until that costs more than the dense array (3 bytes per entry vs
+    one per register), then a uint8 array (bytearray without NumPy).
+    """
+
+    def __init__(self, precision: int = settings.UNIQUE_COUNTS_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        self._sparse: Optional[Dict[int, int]] = {}
+        self._dense = None
+
+    @property
+    def is_sparse(self) -> bool:
+        return self._sparse is not None
+
+    def add(self, value: str):
+        x = int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), "big")
+        width = 64 - self.precision
+        rest = x & ((1 << width) - 1)
+        self._set(x >> width, width - rest.bit_length() + 1)
+
+    def _set(self, index: int, rank: int):
+        if self._sparse is not None:
+            if rank > self._sparse.get(index, 0):
+                self._sparse[index] = rank
+                if 3 * len(self._sparse) > self.m:
+                    self._densify()
+        elif rank > self._dense[index]:
+            self._dense[index] = rank
+
+    def _densify(self):
+        if self._sparse is None:
+            return
+        dense = np.zeros(self.m, dtype=np.uint8) if np is not None else bytearray(self.m)
+        for index, rank in self._sparse.items():
+            dense[index] = rank
+        self._dense, self._sparse = dense, None
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold `other` into this sketch (union of the two sets)"""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precision")
+        if other._sparse is not None:
+            for index, rank in other._sparse.items():
+                self._set(index, rank)
+            return self
+        self._densify()
+        if np is not None:
+            np.maximum(self._dense, np.asarray(other._dense, dtype=np.uint8), out=self._dense)
+        else:
+            self._dense = bytearray(map(max, self._dense, other._dense))
+        return self
+
+    def count(self) -> int:
+        """Estimated number of distinct values added"""
+        if self._sparse is not None:
+            zeros = self.m - len(self._sparse)
+            harmonic = zeros + sum(_INVERSE_POWERS[rank] for rank in self._sparse.values())
+        elif np is not None:
+            zeros = int(np.count_nonzero(self._dense == 0))
+            harmonic = float(np.exp2(-self._dense.astype(np.float64)).sum())
+        else:
+            zeros = self._dense.count(0)
+            harmonic = sum(_INVERSE_POWERS[rank] for rank in self._dense)
+        estimate = 0.7213 / (1 + 1.079 / self.m) * self.m * self.m / harmonic
+        if estimate <= 2.5 * self.m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        """[format, precision] then (uint16 index, uint8 rank) pairs or the dense registers"""
+        if self._sparse is not None:
+            pairs = b"".join(struct.pack(">HB", index, rank) for index, rank in sorted(self._sparse.items()))
+            return bytes([SPARSE, self.precision]) + pairs
+        return bytes([DENSE, self.precision]) + bytes(self._dense)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        sketch = cls(data[1])
+        if data[0] == SPARSE:
+            sketch._sparse = {index: rank for index, rank in struct.iter_unpack(">HB", data[2:])}
+        else:
+            sketch._sparse = None
+            sketch._dense = np.frombuffer(data, dtype=np.uint8, offset=2).copy() if np is not None else bytearray(data[2:])
+        return sketch
+
+
+# =============================================================================
+# KEYS AND IDENTITIES
+# =============================================================================
+
+def sketch_key(metric: str, scope: str, ident) -> str:
+    """hll:<metric>:<property|city>:<id or normalised city>"""
+    if scope == "city":
+        ident = str(ident).strip().lower()
+    return f"hll:{metric}:{scope}:{ident}"
+
+
+def visitor_id(request: Request) -> str:
+    """The frontend's anonymous X-Visitor-Id, else client IP + user agent"""
+    header = request.headers.get("X-Visitor-Id")
+    if header:
+        return header[:64]
+    return f"{get_client_identifier(request)}|{request.headers.get('User-Agent', '')}"
+
+
+def window_days(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=n) for n in range((end - start).days + 1)]
+
+
+# =============================================================================
+# COUNTER
+# =============================================================================
+
+class UniqueCounter:
+    """Records visitors and inquirers into per-day sketches and answers window counts"""
+
+    def __init__(
+        self,
+        precision: int = settings.UNIQUE_COUNTS_PRECISION,
+        flush_interval: float = settings.UNIQUE_COUNTS_FLUSH_SECONDS,
+        retention_days: int = settings.UNIQUE_COUNTS_RETENTION_DAYS,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.precision = precision
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.session_factory = session_factory
+        self._pending: Dict[Tuple[str, date], HyperLogLog] = {}
+        self._pending_values: Dict[Tuple[str, date], Set[str]] = {}  # Redis mode: PFADDed on flush
+        self._lock = threading.Lock()
+        self._cities: Dict[int, Optional[str]] = {}
+        self._unplaced: List[Tuple[str, int, date]] = []  # inquiries whose property's city isn't known yet
+        self._task: Optional[asyncio.Task] = None
+        self._pruned_on: Optional[date] = None
+        self.stats = {"recorded": 0, "flushed": 0, "failed": 0}
+
+    @property
+    def redis(self):
+        return cache.redis_client
+
+    @property
+    def standard_error(self) -> float:
+        return 1.04 / math.sqrt(1 << self.precision)
+
+    # Recording
+
+    def record(self, metric: str, value: str, property_id: Optional[int], city: Optional[str], day: Optional[date] = None):
+        """Add `value` to the property's and the city's sketch for `day` (default today); no I/O"""
+        keys = []
+        if property_id is not None:
+            keys.append(sketch_key(metric, "property", property_id))
+        if city:
+            keys.append(sketch_key(metric, "city", city))
+        if not keys or not value:
+            return
+        self.stats["recorded"] += 1
+        self._buffer(keys, value, day or utc_today())
+
+    def _buffer(self, keys: List[str], value: str, day: date):
+        with self._lock:
+            for key in keys:
+                if self.redis is not None:
+                    # Redis hashes values itself, so keep them (deduplicated) until the flush
+                    self._pending_values.setdefault((key, day), set()).add(value)
+                    continue
+                sketch = self._pending.get((key, day))
+                if sketch is None:
+                    sketch = self._pending[(key, day)] = HyperLogLog(self.precision)
+                sketch.add(value)
+
+    def record_visit(self, property_obj: models.Property, visitor: str):
+        """A property detail view"""
+        self._cities[property_obj.id] = property_obj.city
+        self.record(VISITORS, visitor, property_obj.id, property_obj.city)
+
+    def record_inquiry(self, property_id: Optional[int], phone: str):
+        """
+        An accepted lead submission (phones normalised, so +91 and spacing
+        variants count once). If the property's city isn't cached yet, the
+        city sketch is updated by the next flush.
+        """
+        phone = normalize_phone_number(phone)
+        day = utc_today()
+        if property_id is not None and property_id not in self._cities:
+            with self._lock:
+                self._unplaced.append((phone, property_id, day))
+        self.record(INQUIRERS, phone, property_id, self._cities.get(property_id), day)
+
+    def _place_cities(self, db: Session):
+        """Add buffered inquiries to their property's city sketch (one SELECT for the unknown cities)"""
+        with self._lock:
+            unplaced, self._unplaced = self._unplaced, []
+        if not unplaced:
+            return
+        unknown = {property_id for _, property_id, _ in unplaced if property_id not in self._cities}
+        if unknown:
+            try:
+                cities = dict(db.execute(
+                    select(models.Property.id, models.Property.city).where(models.Property.id.in_(unknown))
+                ).all())
+            except Exception:
+                with self._lock:
+                    self._unplaced.extend(unplaced)
+                raise
+            if len(self._cities) + len(unknown) > 10000:
+                self._cities.clear()
+            self._cities.update({property_id: cities.get(property_id) for property_id in unknown})
+        for phone, property_id, day in unplaced:
+            city = self._cities.get(property_id)
+            if city:
+                self._buffer([sketch_key(INQUIRERS, "city", city)], phone, day)
+
+    # Queries
+
+    def count(self, db: Session, metric: str, scope: str, ident, start: date, end: date) -> int:
+        """
+        Approximate distinct values for one key between start and end
+        (inclusive). Raises UniqueCountsUnavailable if Redis fails.
+        """
+        key = sketch_key(metric, scope, ident)
+        if self.redis is not None:
+            try:
+                return int(self.redis.pfcount(*(f"{key}:{day.isoformat()}" for day in window_days(start, end))))
+            except Exception as e:
+                raise UniqueCountsUnavailable(f"PFCOUNT failed: {e}") from e
+        sketch = HyperLogLog(self.precision)
+        sketches = models.HllSketch
+        rows = db.execute(
+            select(sketches.registers).where(sketches.key == key, sketches.day >= start, sketches.day <= end)
+        ).scalars()
+        for registers in rows:
+            self._merge_stored(sketch, registers)
+        with self._lock:
+            for (pending_key, day), pending in self._pending.items():
+                if pending_key == key and start <= day <= end:
+                    sketch.merge(pending)
+        return sketch.count()
+
+    def _merge_stored(self, sketch: HyperLogLog, registers: bytes):
+        stored = HyperLogLog.from_bytes(registers)
+        if stored.precision != sketch.precision:
+            logger.warning("Skipping a sketch stored with a different UNIQUE_COUNTS_PRECISION")
+            return
+        sketch.merge(stored)
+
+    def window(self, db: Session, scope: str, ident, start: date, end: date) -> dict:
+        """Unique visitors and inquirers for a property or city over a window"""
+        return {
+            "unique_visitors": self.count(db, VISITORS, scope, ident, start, end),
+            "unique_inquirers": self.count(db, INQUIRERS, scope, ident, start, end),
+            "approximate": True,
+            "standard_error": round(self.standard_error, 4),
+        }
+
+    # Flushing
+
+    def flush_redis(self) -> int:
+        """PFADD buffered values in one pipeline; returns the key-days written"""
+        with self._lock:
+            pending, self._pending_values = self._pending_values, {}
+        if not pending:
+            return 0
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for (key, day), values in sorted(pending.items()):
+                name = f"{key}:{day.isoformat()}"
+                pipe.pfadd(name, *values)
+                pipe.expire(name, self.retention_days * 86400)
+            pipe.execute()
+        except Exception:
+            # PFADD is idempotent, so re-adding on the next flush is safe
+            with self._lock:
+                for key_day, values in pending.items():
+                    self._pending_values.setdefault(key_day, set()).update(values)
+            raise
+        self.stats["flushed"] += len(pending)
+        return len(pending)
+
+    def flush(self, db: Session) -> int:
+        """
+        Place inquiries in their cities, then merge buffered sketches into
+        hll_sketches; returns the key-days written.
+        """
+        self._place_cities(db)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            self._write(db, pending)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Keep what was buffered; merging is idempotent, so the retry is safe
+            with self._lock:
+                for key_day, sketch in pending.items():
+                    current = self._pending.get(key_day)
+                    self._pending[key_day] = sketch.merge(current) if current is not None else sketch
+            raise
+        self.stats["flushed"] += len(pending)
+        return len(pending)
+
+    def _write(self, db: Session, pending: Dict[Tuple[str, date], HyperLogLog]):
+        sketches = models.HllSketch
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        # Make sure every row exists, then lock and merge (no lost updates between workers)
+        db.execute(
+            dialect.insert(sketches).on_conflict_do_nothing(index_elements=[sketches.key, sketches.day]),
+            [
+                {"key": key, "day": day, "registers": HyperLogLog(self.precision).to_bytes()}
+                for key, day in sorted(pending)  # fixed lock order
+            ],
+        )
+        for key in sorted({key for key, _ in pending}):
+            days = [day for k, day in pending if k == key]
+            rows = db.execute(
+                select(sketches.day, sketches.registers)
+                .where(sketches.key == key, sketches.day.in_(days))
+                .with_for_update()
+            ).all()
+            for day, registers in rows:
+                sketch = pending[(key, day)]
+                self._merge_stored(sketch, registers)
+                db.execute(
+                    update(sketches).where(sketches.key == key, sketches.day == day)
+                    .values(registers=sketch.to_bytes(), updated_at=datetime.now(timezone.utc))
+                )
+
+    def prune(self, db: Session, today: Optional[date] = None) -> int:
+        """Delete sketches older than the retention window (Redis keys expire on their own)"""
+        cutoff = (today or utc_today()) - timedelta(days=self.retention_days)
+        result = db.execute(delete(models.HllSketch).where(models.HllSketch.day < cutoff))
+        db.commit()
+        return result.rowcount
+
+    # Background task
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the flush task (must be called from the running event loop)"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the task and flush what is buffered"""
+        if not self.running:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        await asyncio.to_thread(self._flush_once)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.to_thread(self._flush_once)
+
+    def _flush_once(self):
+        db = self.session_factory()
+        try:
+            self.flush(db)  # in Redis mode this only places inquiries in their cities
+            if self._pruned_on != utc_today():
+                self.prune(db)
+                self._pruned_on = utc_today()
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Unique count flush failed: {e}")
+        finally:
+            db.close()
+        if self._pending_values:
+            try:
+                self.flush_redis()
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Unique count PFADD failed: {e}")
+
+
+unique_counter = UniqueCounter()
@@ -0,0 +1,146 @@
+"""
+Booking Concurrency Benchmark
+
+Many threads book properties in parallel, each with its own BookingService
+and BookingCalendar (like separate app workers). Scenarios:
+- hot:    every thread books random stays on the SAME property
+- spread: threads book random stays across many properties
+
+Each scenario runs with the versioned engine and with a naive baseline
+(calendar check + unconditional UPDATE, the pre-version behaviour), then
+counts overlapping active bookings left in the database (must be 0).
+
+Usage:
+    cd backend && python bench_booking_concurrency.py [--threads 16] [--attempts 50]
+    python bench_booking_concurrency.py --database-url postgresql://...  # empty scratch DB
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DEBUG", "false")
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.database import models
+from app.schemas import schemas
+from app.services.booking_calendar import BookingCalendar, BookingConflictError, PropertyVersionConflict
+from app.services.crud import BookingService
+
+
+class NaiveBookingService(BookingService):
+    """Baseline: per-worker calendar check, then an unconditional write"""
+
+    def _claim_property(self, db, property_id, check_in, check_out, exclude_booking_id=None, **values):
+        conflict = self.calendar.find_conflict(db, property_id, check_in, check_out, exclude_booking_id)
+        if conflict is not None:
+            raise BookingConflictError(property_id, conflict)
+        db.execute(update(models.Property).where(models.Property.id == property_id).values(**values))
+        return None if db.get(models.Property, property_id) is None else 0
+
+
+def random_stay(rng: random.Random, property_id: int) -> schemas.BookingCreate:
+    check_in = datetime(2027, 1, 1) + timedelta(days=rng.randint(0, 360))
+    return schemas.BookingCreate(
+        property_id=property_id,
+        tenant_name="Bench",
+        tenant_phone="9876543210",
+        check_in=check_in,
+        check_out=check_in + timedelta(days=rng.randint(3, 20)),
+        monthly_rent=25000,
+    )
+
+
+def overlapping_bookings(db) -> int:
+    """Active bookings that overlap an earlier-starting booking of the same property"""
+    rows = db.query(models.Booking.property_id, models.Booking.check_in, models.Booking.check_out).filter(
+        models.Booking.status != "cancelled"
+    ).order_by(models.Booking.property_id, models.Booking.check_in).all()
+    overlaps, last_property, max_end = 0, None, None
+    for property_id, start, end in rows:
+        if property_id == last_property and start < max_end:
+            overlaps += 1
+        if property_id != last_property or end > max_end:
+            last_property, max_end = property_id, end
+    return overlaps
+
+
+def run(factory, service_cls, threads: int, attempts: int, properties: int, seed: int):
+    outcomes = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(n: int):
+        rng = random.Random(seed * 1000 + n)
+        service = service_cls(calendar=BookingCalendar(ttl=3600))
+        db = factory()
+        barrier.wait()
+        for _ in range(attempts):
+            try:
+                service.create_booking(db, random_stay(rng, rng.randint(1, properties)))
+                outcome = "booked"
+            except BookingConflictError:
+                outcome = "overlap_409"
+                db.rollback()
+            except PropertyVersionConflict:
+                outcome = "version_409"
+            with lock:
+                outcomes[outcome] += 1
+        db.close()
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return outcomes, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=50, help="booking attempts per thread")
+    parser.add_argument("--properties", type=int, default=200, help="properties in the spread scenario")
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url, pool_size=args.threads, connect_args={"timeout": 60} if url.startswith("sqlite") else {})
+        models.Base.metadata.create_all(engine)
+        factory = sessionmaker(bind=engine)
+
+        print(f"{args.threads} threads x {args.attempts} attempts on {engine.dialect.name}")
+        print(f"{'scenario':<18} {'booked':>7} {'overlap':>8} {'version':>8} {'attempts/s':>11} {'overlaps':>9}")
+        print("-" * 66)
+        for scenario, properties in (("hot", 1), ("spread", args.properties)):
+            for label, service_cls in (("versioned", BookingService), ("naive", NaiveBookingService)):
+                db = factory()
+                db.query(models.Booking).delete()
+                db.query(models.Property).delete()
+                db.add_all(
+                    models.Property(id=i, title=f"Flat {i}", slug=f"bench-{i}", price="-")
+                    for i in range(1, properties + 1)
+                )
+                db.commit()
+
+                outcomes, seconds = run(factory, service_cls, args.threads, args.attempts, properties, seed=7)
+                total = sum(outcomes.values())
+                print(
+                    f"{scenario + ' ' + label:<18} {outcomes['booked']:>7} {outcomes['overlap_409']:>8} "
+                    f"{outcomes['version_409']:>8} {total / seconds:>11.0f} {overlapping_bookings(db):>9}"
+                )
+                db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Lead Scoring Benchmark
+
+Seeds a SQLite database with synthetic leads and times:
+- score:   the scoring math alone, NumPy vs the pure-Python reference
+- rescore: full LeadScorer.rescore() runs (read, score, write back), the
+           second one writing only scores that moved, plus an incremental run
+
+Usage:
+    cd backend && python bench_lead_scoring.py [--leads 1000000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DEBUG", "false")
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import models
+from app.services import lead_scoring
+from app.services.lead_scoring import LeadScorer, _SCORE_COLUMNS
+
+SOURCES = list(lead_scoring.SOURCE_WEIGHTS) + ["unknown"]
+STATUSES = ["new", "new", "contacted", "site_visit", "negotiation", "converted", "lost"]
+
+
+def seed(db, leads: int, properties: int = 2000):
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    db.execute(insert(models.Property), [
+        {"title": f"P{i}", "slug": f"p-{i}", "price": "-", "price_numeric": rng.choice([None, rng.randint(8000, 250000)])}
+        for i in range(properties)
+    ])
+    batch = []
+    for i in range(leads):
+        created = now - timedelta(hours=rng.randint(0, 24 * 90))
+        batch.append({
+            "name": "Lead",
+            "phone": f"9{i:09d}",
+            "source": rng.choice(SOURCES),
+            "status": rng.choice(STATUSES),
+            "property_id": rng.randint(1, properties),
+            "submission_count": rng.choice([1, 1, 1, 2, 3]),
+            "created_at": created,
+            "updated_at": created + timedelta(hours=rng.randint(1, 96)) if rng.random() < 0.6 else None,
+            "preferred_visit_date": now + timedelta(days=rng.randint(-5, 30)) if rng.random() < 0.3 else None,
+        })
+        if len(batch) == 50000:
+            db.execute(insert(models.Lead), batch)
+            batch = []
+    if batch:
+        db.execute(insert(models.Lead), batch)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--leads", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        models.Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+
+        start = time.perf_counter()
+        seed(db, args.leads)
+        print(f"seeded {args.leads:,} leads in {time.perf_counter() - start:.1f}s")
+
+        sample = db.execute(
+            select(*_SCORE_COLUMNS)
+            .outerjoin(models.Property, models.Property.id == models.Lead.property_id)
+            .limit(100_000)
+        ).all()
+        now = lead_scoring._epoch(datetime.utcnow())
+
+        print(f"{'stage':<32} {'seconds':>8}")
+        print("-" * 41)
+        if lead_scoring.np is not None:
+            start = time.perf_counter()
+            lead_scoring.score_rows_numpy(sample, now)
+            print(f"{'score 100k (numpy)':<32} {time.perf_counter() - start:>8.3f}")
+        else:
+            print("numpy not installed; skipping vectorized timing")
+        start = time.perf_counter()
+        lead_scoring.score_rows_python(sample, now)
+        print(f"{'score 100k (python)':<32} {time.perf_counter() - start:>8.3f}")
+
+        result = LeadScorer().rescore(db, full=True)
+        label = f"rescore {args.leads:,} ({result['engine']})"
+        print(f"{label:<32} {result['seconds']:>8.3f}")
+
+        result = LeadScorer().rescore(db, full=True)
+        label = f"rescore again ({result['written']:,} written)"
+        print(f"{label:<32} {result['seconds']:>8.3f}")
+
+        result = LeadScorer().rescore(db)
+        print(f"{'incremental, nothing changed':<32} {result['seconds']:>8.3f}")
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Property Query Construction Benchmark
+
+Compares the legacy get_properties() path (chained Query.filter() for the data
+and count queries on every request) with the cached, parameterized statements
+in PropertyStatementCache.
+
+Measures, per request:
+- build:   Python-side statement construction only
+- execute: full round trip against an in-memory SQLite database; both paths
+           go through Session.execute and the engine's default compiled
+           cache, so this is the number that reflects production
+
+Usage:
+    cd backend && python bench_query_statements.py
+"""
+
+import os
+import time
+import statistics
+
+os.environ.setdefault("DEBUG", "false")
+
+from sqlalchemy import create_engine, func, desc
+from sqlalchemy.orm import sessionmaker
+
+from app.database import models
+from app.services.crud import (
+    apply_property_view,
+    build_property_filter_params,
+    escape_like_pattern,
+    property_statements,
+)
+
+ITERATIONS = 2000
+
+# The filter combinations the listing pages actually send
+SHAPES = [
+    {},
+    {"is_available": True},
+    {"city": "Gurgaon", "is_available": True},
+    {"city": "Gurgaon", "property_type": "apartment", "min_bedrooms": 2},
+]
+
+
+def legacy_build(db, view="card", **filters):
+    """Query construction as done before the statement cache"""
+    query = apply_property_view(db.query(models.Property), view)
+    count_query = db.query(func.count(models.Property.id))
+
+    if filters.get("is_available") is not None:
+        query = query.filter(models.Property.is_available == filters["is_available"])
+        count_query = count_query.filter(models.Property.is_available == filters["is_available"])
+    if filters.get("city"):
+        escaped_city = escape_like_pattern(filters["city"])
+        query = query.filter(models.Property.city.ilike(f"%{escaped_city}%", escape='\\'))
+        count_query = count_query.filter(models.Property.city.ilike(f"%{escaped_city}%", escape='\\'))
+    if filters.get("property_type"):
+        query = query.filter(models.Property.property_type == filters["property_type"])
+        count_query = count_query.filter(models.Property.property_type == filters["property_type"])
+    if filters.get("min_bedrooms") is not None:
+        query = query.filter(models.Property.bedrooms >= filters["min_bedrooms"])
+        count_query = count_query.filter(models.Property.bedrooms >= filters["min_bedrooms"])
+
+    query = query.order_by(desc(models.Property.created_at)).offset(0).limit(12)
+    return query, count_query
+
+
+def cached_build(view="card", **filters):
+    """Statement lookup through PropertyStatementCache"""
+    params = build_property_filter_params(**filters)
+    shape = frozenset(params)
+    return (
+        property_statements.list_statement(view, shape),
+        property_statements.count_statement(shape),
+        params,
+    )
+
+
+def timed(fn):
+    samples = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(samples)
+
+
+def main():
+    engine = create_engine("sqlite:///:memory:")
+    models.Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    for i in range(200):
+        db.add(models.Property(
+            title=f"Property {i}",
+            price="₹25,000/month",
+            city="Gurgaon" if i % 2 else "Noida",
+            property_type="apartment",
+            bedrooms=i % 4,
+        ))
+    db.commit()
+
+    print(f"{'shape':<45} {'stage':<8} {'legacy µs':>10} {'cached µs':>10} {'speedup':>8}")
+    print("-" * 85)
+
+    for shape in SHAPES:
+        label = ",".join(sorted(shape)) or "(no filters)"
+
+        def legacy_execute():
+            query, count_query = legacy_build(db, **shape)
+            count_query.scalar()
+            query.all()
+
+        def cached_execute():
+            stmt, count_stmt, params = cached_build(**shape)
+            db.execute(count_stmt, params).scalar()
+            db.execute(stmt, {**params, "skip": 0, "limit": 12}).scalars().all()
+
+        stages = [
+            ("build", lambda: legacy_build(db, **shape), lambda: cached_build(**shape)),
+            ("execute", legacy_execute, cached_execute),
+        ]
+        for stage, legacy_fn, cached_fn in stages:
+            legacy_us = timed(legacy_fn)
+            cached_us = timed(cached_fn)
+            print(f"{label:<45} {stage:<8} {legacy_us:>10.1f} {cached_us:>10.1f} {legacy_us / cached_us:>7.1f}x")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
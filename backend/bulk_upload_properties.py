@@ -6,6 +6,10 @@ How to use:
 2. Put all property images in backend/uploads/properties/ folder
 3. Run: python bulk_upload_properties.py properties.csv
 
+The CSV is streamed to the admin-only POST /api/v1/properties/bulk endpoint,
+which imports it server-side in batches. Set INDOHOMZ_ADMIN_TOKEN to an admin
+access token. Use --per-row to fall back to one POST per property.
+
 CSV Template (properties.csv):
 title,location,area,city,price,bedrooms,bathrooms,area_sqft,property_type,furnishing,amenities,description,images
 "Luxury 3BHK in Sushant Lok","Sushant Lok 2, Sector 57","Sector 57","Gurgaon","45000","3","2","1500","apartment","furnished","Rooftop Dining Area, High-Speed WiFi, Washing Machine","Beautiful 3BHK with modern amenities","property1_1.jpg,property1_2.jpg,property1_3.jpg"
@@ -14,6 +18,7 @@ title,location,area,city,price,bedrooms,bathrooms,area_sqft,property_type,furnis
 
 import csv
 import json
+import os
 import sys
 from pathlib import Path
 import requests
@@ -21,6 +26,12 @@ import requests
 # Configuration
 API_BASE_URL = "http://localhost:8000/api/v1"
 UPLOAD_FOLDER = Path(__file__).parent / "uploads" / "properties"
+ADMIN_TOKEN = os.getenv("INDOHOMZ_ADMIN_TOKEN")
+
+
+def auth_headers() -> dict:
+    """Authorization header for admin endpoints"""
+    return {"Authorization": f"Bearer {ADMIN_TOKEN}"} if ADMIN_TOKEN else {}
 
 
 def read_csv_properties(csv_file: str):
@@ -62,10 +73,10 @@ def upload_property(property_data: dict):
         response = requests.post(
             f"{API_BASE_URL}/properties/",
             json=property_data,
-            headers={"Content-Type": "application/json"}
+            headers={"Content-Type": "application/json", **auth_headers()}
         )
         
-        if response.status_code == 200:
+        if response.status_code in (200, 201):
             property_id = response.json()['id']
             print(f"   ✅ Uploaded: {property_data['title']} (ID: {property_id})")
             return True
@@ -78,14 +89,44 @@ def upload_property(property_data: dict):
         return False
 
 
+def upload_bulk(csv_file: str):
+    """Stream the whole CSV to the server-side bulk import endpoint"""
+    print(f"\n📤 Streaming {csv_file} to {API_BASE_URL}/properties/bulk ...")
+    with open(csv_file, 'rb') as f:
+        response = requests.post(
+            f"{API_BASE_URL}/properties/bulk",
+            data=f,
+            headers={"Content-Type": "text/csv", **auth_headers()},
+        )
+    
+    if response.status_code != 200:
+        print(f"   ❌ Import failed: {response.status_code} - {response.text}")
+        return
+    
+    result = response.json()
+    for error in result["errors"]:
+        print(f"   ❌ Row {error['row']} ({error.get('title') or 'untitled'}): {error['error']}")
+    if result["errors_truncated"]:
+        print("   ... more errors not shown")
+    
+    print("\n" + "=" * 60)
+    print("✅ UPLOAD COMPLETE")
+    print("=" * 60)
+    print(f"   Success: {result['inserted']}")
+    print(f"   Failed: {result['failed']}")
+    print(f"   Total: {result['total_rows']}")
+    print()
+
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python bulk_upload_properties.py <csv_file>")
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print("Usage: python bulk_upload_properties.py <csv_file> [--per-row]")
         print("\nExample:")
         print("  python bulk_upload_properties.py properties.csv")
         return
     
-    csv_file = sys.argv[1]
+    csv_file = args[0]
     
     if not Path(csv_file).exists():
         print(f"❌ File not found: {csv_file}")
@@ -95,6 +136,10 @@ def main():
     print("🏠 BULK PROPERTY UPLOAD")
     print("=" * 60)
     
+    if "--per-row" not in sys.argv:
+        upload_bulk(csv_file)
+        return
+    
     # Read properties
     print(f"\n📖 Reading properties from: {csv_file}")
     properties = read_csv_properties(csv_file)
@@ -16,12 +16,21 @@ from datetime import datetime
 import time
 
 # Import routers
-from app.api.routers import properties, leads, analytics, reports, maps, auth
+from app.api.routers import properties, leads, bookings, analytics, reports, maps, auth
 from app.database.connection import get_db, engine
 from app.database import models
+from app.database.search_indexes import ensure_search_indexes
 from app.core.config import settings, get_database_url
 from app.core.rate_limit import init_rate_limiting
 from app.core.cache import cache
+from app.core.idempotency import IdempotencyMiddleware
+from app.services.lead_ingestion import lead_ingestion
+from app.services.notifications import enabled_channels, notification_dispatcher
+from app.services.availability_history import availability_compactor
+from app.services.analytics_snapshot import snapshot_exporter, snapshots_available
+from app.services.live_events import live_events
+from app.services.property_views import view_counter
+from app.services.unique_counts import unique_counter
 
 
 @asynccontextmanager
@@ -47,14 +56,66 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"✗ Database initialization error: {e}")
     
+    # Full-text search indexes (FTS5 on SQLite; Postgres gets tsvector + pg_trgm from migrations)
+    try:
+        native_search = ensure_search_indexes(engine)
+        print(f"✓ Search indexes {'ready' if native_search else 'unavailable (using ILIKE)'}")
+    except Exception as e:
+        print(f"✗ Search index initialization error: {e}")
+    
     # Initialize rate limiting (async to support Redis)
     using_redis = await init_rate_limiting()
     print(f"✓ Rate limiting initialized {'(Redis)' if using_redis else '(in-memory)'}")
     
+    # Buffered lead ingestion writer
+    if settings.LEAD_INGESTION_MODE == "buffered":
+        lead_ingestion.start()
+        print(f"✓ Lead ingestion buffered (batch {lead_ingestion.batch_size}, queue {lead_ingestion.max_size})")
+    
+    # Outbox dispatcher for new-lead notifications
+    if enabled_channels():
+        notification_dispatcher.start()
+        print(f"✓ Lead notifications via {', '.join(enabled_channels())}")
+    
+    # Nightly availability snapshots (catches up on missed days at startup)
+    availability_compactor.start()
+    print("✓ Availability history compaction scheduled")
+    
+    # Live dashboard events (SSE), relayed through Redis pub/sub when caching uses Redis
+    live_events.start()
+    print(f"✓ Live dashboard events {'(Redis pub/sub)' if live_events.via_redis else '(in-process)'}")
+    
+    # Unique visitor/inquirer sketches, buffered here and flushed to Redis (PFADD) or the database
+    unique_counter.start()
+    print(f"✓ Unique counts flushed every {unique_counter.flush_interval}s{' (Redis)' if cache.redis_client else ''}")
+    
+    # Buffered property view counters
+    view_counter.start()
+    print(f"✓ Property views flushed every {view_counter.flush_interval}s{' (shared via Redis)' if cache.redis_client else ''}")
+    
+    # Columnar analytics snapshots (Parquet)
+    if settings.ANALYTICS_SNAPSHOT_EXPORT:
+        if snapshots_available():
+            snapshot_exporter.start()
+            print(f"✓ Analytics snapshots every {snapshot_exporter.interval}s")
+        else:
+            print("✗ Analytics snapshots disabled (pyarrow not installed)")
+    
     yield
     
     # Shutdown
     print(f"👋 Shutting down {settings.APP_NAME} API...")
+    if lead_ingestion.running:
+        pending = lead_ingestion.pending
+        await lead_ingestion.stop()
+        print(f"✓ Lead queue flushed ({pending} pending at shutdown)")
+    if notification_dispatcher.running:
+        await notification_dispatcher.stop()
+    await availability_compactor.stop()
+    await snapshot_exporter.stop()
+    await unique_counter.stop()
+    await view_counter.stop()
+    await live_events.stop()  # ends open streams so shutdown doesn't wait on them
 
 
 # Initialize FastAPI app
@@ -67,6 +128,18 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
+# Idempotency-Key replay for create endpoints (added first so it sits innermost:
+# replayed responses still get CORS and security headers)
+app.add_middleware(
+    IdempotencyMiddleware,
+    routes=[
+        ("POST", "/api/v1/leads/"),
+        ("POST", "/api/v1/leads/inquiry"),
+        ("POST", "/api/v1/properties/"),
+        ("POST", "/api/v1/bookings/"),
+    ],
+)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -121,6 +194,13 @@ app.include_router(
     tags=["leads"]
 )
 
+# Booking routes
+app.include_router(
+    bookings.router,
+    prefix="/api/v1/bookings",
+    tags=["bookings"]
+)
+
 # Analytics routes
 app.include_router(
     analytics.router, 
@@ -161,6 +241,7 @@ async def root():
             "auth": "/api/v1/auth",
             "properties": "/api/v1/properties",
             "leads": "/api/v1/leads",
+            "bookings": "/api/v1/bookings",
             "analytics": "/api/v1/analytics",
             "reports": "/api/v1/reports",
         }
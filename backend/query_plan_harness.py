@@ -0,0 +1,564 @@
+"""
+Query Plan Regression Harness
+
+Seeds a large dataset, runs every query shape the services and routers emit,
+and EXPLAINs each captured SQL statement:
+- SQLite:   EXPLAIN QUERY PLAN
+- Postgres: EXPLAIN (FORMAT JSON)
+
+Fails on full table scans over large tables (unless listed in ALLOWED_SCANS
+with a reason), and reports unused and redundant indexes. The indexes from
+backend/alembic/versions/002_add_indexes.py are created alongside the model
+indexes so overlaps between the two are visible.
+
+Usage:
+    cd backend && python query_plan_harness.py
+    cd backend && python query_plan_harness.py --database-url postgresql://.../scratch
+
+WARNING: with --database-url, tables are created and seeded in that database.
+Point it at a scratch database, never at production.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import re
+import sys
+import types
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+os.environ.setdefault("DEBUG", "false")
+
+from sqlalchemy import Index, MetaData, Table, create_engine, event, func, inspect, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import models
+from app.database.search_indexes import create_postgres_search_indexes, ensure_search_indexes
+from app.database.connection import Base
+from app.core.cache import cache
+
+MIGRATION_INDEXES = Path(__file__).parent / "alembic" / "versions" / "002_add_indexes.py"
+
+# Tables with at least this many rows must not be scanned without an index
+LARGE_TABLE_ROWS = 1000
+
+# Query labels allowed to scan a whole table, with the reason.
+# Every entry here is known debt - remove it once the query is fixed.
+ALLOWED_SCANS: Dict[str, str] = {
+    "properties.list.bedrooms": "no index on bedrooms; min_bedrooms alone is rarely selective",
+    "bookings.calendar_rebuild": "loads every active booking into the in-memory interval index by design",
+    "reports.market_analysis": "loads every property to count types in Python",
+}
+
+
+# =============================================================================
+# RESULTS
+# =============================================================================
+
+@dataclass
+class PlanResult:
+    """EXPLAIN output for one captured statement"""
+    label: str
+    sql: str
+    plan: List[str]
+    scanned_tables: Set[str] = field(default_factory=set)
+    indexes_used: Set[str] = field(default_factory=set)
+
+
+@dataclass
+class IndexInfo:
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+    unique: bool
+
+
+@dataclass
+class HarnessReport:
+    backend: str
+    table_rows: Dict[str, int]
+    results: List[PlanResult]
+    failures: List[Tuple[PlanResult, str]]
+    allowed: List[Tuple[PlanResult, str, str]]
+    unused_indexes: List[IndexInfo]
+    redundant_indexes: List[Tuple[IndexInfo, str]]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+
+# =============================================================================
+# SEEDING
+# =============================================================================
+
+CITIES = ["Gurgaon", "Noida", "Delhi", "Bangalore", "Mumbai", "Pune", "Hyderabad", "Chennai"]
+PROPERTY_TYPES = ["apartment", "villa", "studio", "penthouse", "pg", "independent_house"]
+LEAD_STATUSES = ["new", "contacted", "site_visit", "negotiation", "converted", "lost"]
+LEAD_SOURCES = ["website", "whatsapp", "referral", "instagram", "google", "walk_in"]
+AMENITIES = ["Wifi", "AC", "Power Backup", "Gym", "Pool", "Parking", "Lift", "Security"]
+
+
+def seed_database(
+    db: Session,
+    properties: int = 20000,
+    leads: int = 60000,
+    bookings: int = 5000,
+    batch_size: int = 5000,
+):
+    """Insert a deterministic, realistically skewed dataset"""
+    rng = random.Random(42)
+    now = datetime.now()
+
+    def batched(rows_fn, total):
+        for start in range(0, total, batch_size):
+            yield [rows_fn(i) for i in range(start, min(start + batch_size, total))]
+
+    def property_row(i):
+        city = rng.choice(CITIES)
+        price = rng.randrange(8000, 400000, 500)
+        return {
+            "title": f"{rng.randint(1, 4)}BHK in Sector {i % 120} {city}",
+            "slug": f"property-{i}",
+            "price": f"₹{price:,}/month",
+            "price_numeric": float(price),
+            "location": f"Sector {i % 120}, {city}",
+            "area": f"Sector {i % 120}",
+            "city": city,
+            "property_type": rng.choice(PROPERTY_TYPES),
+            "bedrooms": rng.randint(0, 5),
+            "bathrooms": rng.randint(1, 4),
+            "area_sqft": rng.randint(300, 5000),
+            "furnishing": rng.choice(["furnished", "semi-furnished", "unfurnished"]),
+            "image_url": f"https://cdn.example.com/p/{i}.jpg",
+            "images": json.dumps([f"https://cdn.example.com/p/{i}_{n}.jpg" for n in range(4)]),
+            "amenities": ", ".join(rng.sample(AMENITIES, 4)),
+            "description": "Spacious home with great light and ventilation. " * 8,
+            "is_available": rng.random() < 0.7,
+            "created_at": now - timedelta(days=rng.randint(0, 720)),
+        }
+
+    def lead_row(i):
+        return {
+            "name": f"Lead {i}",
+            "email": f"lead{i}@example.com",
+            "phone": f"9{rng.randint(100000000, 999999999)}",
+            "property_id": rng.randint(1, properties),
+            "message": "Interested, please call back.",
+            "status": rng.choice(LEAD_STATUSES),
+            "source": rng.choice(LEAD_SOURCES),
+            "created_at": now - timedelta(days=rng.randint(0, 365)),
+        }
+
+    def booking_row(i):
+        check_in = now - timedelta(days=rng.randint(0, 365))
+        return {
+            "property_id": rng.randint(1, properties),
+            "lead_id": rng.randint(1, leads),
+            "tenant_name": f"Tenant {i}",
+            "tenant_phone": f"8{rng.randint(100000000, 999999999)}",
+            "check_in": check_in,
+            "check_out": check_in + timedelta(days=rng.randint(30, 365)),
+            "monthly_rent": float(rng.randrange(8000, 400000, 500)),
+            "status": rng.choice(["confirmed", "active", "completed", "cancelled"]),
+            "created_at": check_in - timedelta(days=rng.randint(1, 30)),
+        }
+
+    for model, rows_fn, total in (
+        (models.Property, property_row, properties),
+        (models.Lead, lead_row, leads),
+        (models.Booking, booking_row, bookings),
+    ):
+        for rows in batched(rows_fn, total):
+            db.execute(insert(model), rows)
+        db.commit()
+
+    # Per-property lead counters, as the lead writes would have maintained them
+    from app.services.listing_stats import rebuild_listing_stats
+    rebuild_listing_stats(db)
+    db.commit()
+
+
+class _IndexRecorder:
+    """Stand-in for alembic `op` that records create_index() calls"""
+
+    def __init__(self):
+        self.indexes: List[IndexInfo] = []
+
+    def create_index(self, name, table, columns, unique=False, **kwargs):
+        self.indexes.append(IndexInfo(table, name, tuple(columns), unique))
+
+
+def load_migration_indexes(path: Path = MIGRATION_INDEXES) -> List[IndexInfo]:
+    """Read the indexes a migration's upgrade() would create"""
+    recorder = _IndexRecorder()
+    # Serve `from alembic import op` from a stub so no migration context is
+    # needed (and the repo-root alembic/ folder can't shadow the package)
+    stub = types.ModuleType("alembic")
+    stub.op = recorder
+    saved = sys.modules.get("alembic")
+    sys.modules["alembic"] = stub
+    try:
+        spec = importlib.util.spec_from_file_location(f"_migration_{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        if saved is not None:
+            sys.modules["alembic"] = saved
+        else:
+            del sys.modules["alembic"]
+    module.upgrade()
+    return recorder.indexes
+
+
+def apply_migration_indexes(engine: Engine, indexes: List[IndexInfo]):
+    """Create migration-defined indexes that the models don't already declare"""
+    inspector = inspect(engine)
+    existing = {ix["name"] for table in Base.metadata.tables for ix in inspector.get_indexes(table)}
+    # Reflect into separate metadata so the app's models aren't modified
+    reflected = MetaData()
+    for info in indexes:
+        if info.name in existing or info.table not in Base.metadata.tables:
+            continue
+        table = Table(info.table, reflected, autoload_with=engine)
+        Index(info.name, *(table.c[col] for col in info.columns), unique=info.unique).create(bind=engine)
+
+
+# =============================================================================
+# WORKLOAD (every query shape the services and routers emit)
+# =============================================================================
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def build_workload() -> List[Tuple[str, Callable[[Session], Any]]]:
+    """Labelled calls covering the service and router query paths"""
+    from app.services.crud import property_service, lead_service, booking_service
+    from app.services.booking_calendar import booking_calendar
+    from app.api.routers import analytics, reports
+
+    user = {"user_id": 1, "role": "admin"}
+    return [
+        # Properties
+        ("properties.get", lambda db: property_service.get_property(db, 42)),
+        ("properties.get_by_slug", lambda db: property_service.get_property_by_slug(db, "property-42")),
+        ("properties.list", lambda db: property_service.get_properties(db, view="card")),
+        ("properties.list.full", lambda db: property_service.get_properties(db, view="full")),
+        ("properties.list.available", lambda db: property_service.get_properties(db, is_available=True)),
+        ("properties.list.city", lambda db: property_service.get_properties(db, city="Gurgaon")),
+        ("properties.list.city_available", lambda db: property_service.get_properties(db, city="Gurgaon", is_available=True)),
+        ("properties.list.location", lambda db: property_service.get_properties(db, location="Sector 45")),
+        ("properties.list.type_available", lambda db: property_service.get_properties(db, property_type="villa", is_available=True)),
+        ("properties.list.bedrooms", lambda db: property_service.get_properties(db, min_bedrooms=3)),
+        # Loads the calendar so the listing below only hits the in-memory index
+        ("bookings.calendar_rebuild", lambda db: booking_calendar.rebuild(db)),
+        ("properties.list.available_between", lambda db: property_service.get_properties(
+            db, available_between=(date(2026, 3, 1), date(2026, 6, 30)))),
+        ("properties.list.max_price", lambda db: property_service.get_properties(db, max_price=30000)),
+        ("properties.count.city", lambda db: property_service.get_properties_count(db, is_available=True, city="Noida")),
+        ("properties.featured", lambda db: property_service.get_featured_properties(db, limit=6, view="card")),
+        ("properties.search.text", lambda db: property_service.search_properties(db, query_text="pool", view="card")),
+        ("properties.search.filters", lambda db: property_service.search_properties(
+            db, filters={"city": "Pune", "property_type": "apartment", "bedrooms": 2, "is_available": True}
+        )),
+        ("properties.stats", lambda db: property_service.get_property_stats(db)),
+        # Leads
+        ("leads.get", lambda db: lead_service.get_lead(db, 42)),
+        ("leads.by_reference", lambda db: lead_service.get_lead_by_reference(db, "0" * 32)),
+        ("leads.list", lambda db: lead_service.get_leads(db)),
+        ("leads.list.status", lambda db: lead_service.get_leads(db, status="new")),
+        ("leads.list.source", lambda db: lead_service.get_leads(db, source="instagram")),
+        ("leads.by_property", lambda db: lead_service.get_leads_by_property(db, 42)),
+        ("leads.stats", lambda db: lead_service.get_lead_stats(db)),
+        # Bookings
+        ("bookings.get", lambda db: booking_service.get_booking(db, 42)),
+        ("bookings.list", lambda db: booking_service.get_bookings(db)),
+        ("bookings.list.status", lambda db: booking_service.get_bookings(db, status="active")),
+        ("bookings.by_property", lambda db: booking_service.get_bookings_by_property(db, 42)),
+        # Analytics router
+        ("analytics.dashboard", lambda db: _run(analytics.get_dashboard_analytics(db=db, current_user=user))),
+        ("analytics.price_distribution", lambda db: _run(analytics.get_price_distribution(
+            edges=None, quantiles=None, group_by=None, city=None, property_type=None, db=db, current_user=user
+        ))),
+        ("analytics.price_distribution.city", lambda db: _run(analytics.get_price_distribution(
+            edges="20000,40000,80000", quantiles=None, group_by="bedrooms", city="Gurgaon", property_type=None,
+            db=db, current_user=user
+        ))),
+        ("analytics.price_distribution.quantiles", lambda db: _run(analytics.get_price_distribution(
+            edges=None, quantiles=5, group_by=None, city=None, property_type=None, db=db, current_user=user
+        ))),
+        ("analytics.lead_cohorts", lambda db: _run(analytics.get_lead_cohorts(weeks=12, db=db, current_user=user))),
+        ("analytics.source_performance", lambda db: _run(analytics.get_source_performance(
+            start_date=None, end_date=None, property_id=None, db=db, current_user=user
+        ))),
+        ("analytics.source_performance.filtered", lambda db: _run(analytics.get_source_performance(
+            start_date=date(2026, 1, 1), end_date=date(2026, 3, 31), property_id=42, db=db, current_user=user
+        ))),
+        ("analytics.availability_trend", lambda db: _run(analytics.get_availability_trend(days=30, db=db, current_user=user))),
+        # Reports router
+        ("reports.property_overview", lambda db: _run(reports.get_property_overview_data(db))),
+        ("reports.availability", lambda db: _run(reports.get_availability_data(db))),
+        ("reports.lead_insights", lambda db: _run(reports.get_lead_insights_data(
+            db, datetime.now() - timedelta(days=30), datetime.now()
+        ))),
+        ("reports.listing_performance", lambda db: _run(reports.get_listing_performance_data(
+            db, datetime.now() - timedelta(days=30), datetime.now()
+        ))),
+        ("reports.market_analysis", lambda db: _run(reports.get_market_analysis_data(db))),
+    ]
+
+
+@contextmanager
+def capture_statements(engine: Engine):
+    """Record (statement, parameters) for every SELECT executed on engine"""
+    captured: List[Tuple[str, Any]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+# =============================================================================
+# EXPLAIN
+# =============================================================================
+
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+
+def explain_sqlite(conn, statement: str, parameters) -> Tuple[List[str], Set[str], Set[str]]:
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    plan, scanned, indexes = [], set(), set()
+    for row in rows:
+        detail = row[-1]
+        plan.append(detail)
+        match = _SQLITE_SCAN.match(detail)
+        if match:
+            scanned.add(match.group(1))
+        indexes.update(_SQLITE_INDEX.findall(detail))
+    return plan, scanned, indexes
+
+
+def explain_postgres(conn, statement: str, parameters) -> Tuple[List[str], Set[str], Set[str]]:
+    raw = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    document = raw if isinstance(raw, list) else json.loads(raw)
+    plan, scanned, indexes = [], set(), set()
+
+    def walk(node, depth=0):
+        node_type = node.get("Node Type", "?")
+        relation = node.get("Relation Name")
+        index_name = node.get("Index Name")
+        line = "  " * depth + node_type
+        if relation:
+            line += f" on {relation}"
+        if index_name:
+            line += f" using {index_name}"
+            indexes.add(index_name)
+        plan.append(line)
+        if node_type == "Seq Scan" and relation:
+            scanned.add(relation)
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    walk(document[0]["Plan"])
+    return plan, scanned, indexes
+
+
+# =============================================================================
+# INDEX REPORT
+# =============================================================================
+
+def collect_indexes(engine: Engine) -> Tuple[List[IndexInfo], Dict[str, Tuple[str, ...]]]:
+    inspector = inspect(engine)
+    indexes, primary_keys = [], {}
+    for table in Base.metadata.tables:
+        if not inspector.has_table(table):
+            continue
+        primary_keys[table] = tuple(inspector.get_pk_constraint(table)["constrained_columns"])
+        for ix in inspector.get_indexes(table):
+            indexes.append(IndexInfo(table, ix["name"], tuple(ix["column_names"]), bool(ix["unique"])))
+    return indexes, primary_keys
+
+
+def find_redundant_indexes(
+    indexes: List[IndexInfo],
+    primary_keys: Dict[str, Tuple[str, ...]],
+) -> List[Tuple[IndexInfo, str]]:
+    """Indexes duplicated by the primary key, another index, or a wider index"""
+    redundant = []
+    for ix in indexes:
+        if ix.columns == primary_keys.get(ix.table):
+            redundant.append((ix, "duplicates the primary key"))
+            continue
+        for other in indexes:
+            if other is ix or other.table != ix.table:
+                continue
+            if other.columns == ix.columns:
+                # Report only one side of a duplicate pair; keep the unique one
+                keep_other = (other.unique, other.name) > (ix.unique, ix.name)
+                if keep_other:
+                    redundant.append((ix, f"duplicates {other.name}"))
+                    break
+            elif not ix.unique and other.columns[:len(ix.columns)] == ix.columns:
+                redundant.append((ix, f"is a prefix of {other.name} {other.columns}"))
+                break
+    return redundant
+
+
+# =============================================================================
+# HARNESS
+# =============================================================================
+
+def run_harness(
+    engine: Engine,
+    seed: bool = True,
+    properties: int = 20000,
+    leads: int = 60000,
+    bookings: int = 5000,
+    migration_indexes: bool = True,
+) -> HarnessReport:
+    """Seed, run the workload, EXPLAIN every captured statement and analyze"""
+    backend = engine.dialect.name
+    Base.metadata.create_all(bind=engine)
+    if backend == "postgresql":
+        create_postgres_search_indexes(engine)  # normally applied by migration 003
+    ensure_search_indexes(engine)
+    if migration_indexes:
+        apply_migration_indexes(engine, load_migration_indexes())
+
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    db = SessionLocal()
+    cache_enabled = cache.enabled
+    cache.enabled = False  # Every call must reach the database
+    try:
+        if seed:
+            seed_database(db, properties=properties, leads=leads, bookings=bookings)
+        if backend == "postgresql":
+            db.execute(func.now().select())  # open a transaction for ANALYZE below
+            db.connection().exec_driver_sql("ANALYZE")
+
+        table_rows = {
+            table: db.execute(select(func.count()).select_from(Base.metadata.tables[table])).scalar() or 0
+            for table in Base.metadata.tables
+        }
+
+        captured: List[Tuple[str, str, Any]] = []
+        for label, call in build_workload():
+            with capture_statements(engine) as statements:
+                call(db)
+            db.rollback()
+            seen = set()
+            for statement, parameters in statements:
+                if statement not in seen:
+                    seen.add(statement)
+                    captured.append((label, statement, parameters))
+
+        explain = explain_postgres if backend == "postgresql" else explain_sqlite
+        results = []
+        with engine.connect() as conn:
+            for label, statement, parameters in captured:
+                plan, scanned, used = explain(conn, statement, parameters)
+                results.append(PlanResult(label, statement, plan, scanned, used))
+    finally:
+        cache.enabled = cache_enabled
+        db.close()
+
+    failures, allowed = [], []
+    for result in results:
+        for table in sorted(result.scanned_tables):
+            if table_rows.get(table, 0) < LARGE_TABLE_ROWS:
+                continue
+            message = f"full scan of {table} ({table_rows[table]} rows)"
+            if result.label in ALLOWED_SCANS:
+                allowed.append((result, message, ALLOWED_SCANS[result.label]))
+            else:
+                failures.append((result, message))
+
+    indexes, primary_keys = collect_indexes(engine)
+    used = set().union(*(r.indexes_used for r in results)) if results else set()
+    unused = [ix for ix in indexes if ix.name not in used and table_rows.get(ix.table, 0) >= LARGE_TABLE_ROWS]
+
+    return HarnessReport(
+        backend=backend,
+        table_rows=table_rows,
+        results=results,
+        failures=failures,
+        allowed=allowed,
+        unused_indexes=unused,
+        redundant_indexes=find_redundant_indexes(indexes, primary_keys),
+    )
+
+
+def format_report(report: HarnessReport, verbose: bool = False) -> str:
+    lines = [f"Query plan report ({report.backend})", "=" * 60]
+    lines.append("Rows: " + ", ".join(f"{t}={n}" for t, n in sorted(report.table_rows.items())))
+    lines.append(f"Statements explained: {len(report.results)}")
+
+    if verbose:
+        for result in report.results:
+            lines.append(f"\n[{result.label}]")
+            lines.append("  " + " ".join(result.sql.split())[:200])
+            lines.extend(f"    {step}" for step in result.plan)
+
+    lines.append(f"\nFull scans on large tables: {len(report.failures)}")
+    for result, message in report.failures:
+        lines.append(f"  ✗ [{result.label}] {message}")
+        lines.append("      " + " ".join(result.sql.split())[:160])
+    for result, message, reason in report.allowed:
+        lines.append(f"  ~ [{result.label}] {message} (allowed: {reason})")
+
+    lines.append(f"\nRedundant indexes: {len(report.redundant_indexes)}")
+    for ix, reason in report.redundant_indexes:
+        lines.append(f"  - {ix.table}.{ix.name} {ix.columns} {reason}")
+
+    lines.append(f"\nUnused indexes on large tables: {len(report.unused_indexes)}")
+    for ix in report.unused_indexes:
+        note = " (unique - kept for the constraint)" if ix.unique else ""
+        lines.append(f"  - {ix.table}.{ix.name} {ix.columns}{note}")
+
+    lines.append("\n" + ("✅ PASS" if report.ok else "❌ FAIL"))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every service query shape against a seeded database")
+    parser.add_argument("--database-url", default="sqlite://", help="Scratch database (default: in-memory SQLite)")
+    parser.add_argument("--properties", type=int, default=20000)
+    parser.add_argument("--leads", type=int, default=60000)
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--no-seed", action="store_true", help="Use the rows already in the database")
+    parser.add_argument("--no-migration-indexes", action="store_true", help="Only create the model-declared indexes")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every statement and its plan")
+    args = parser.parse_args()
+
+    url = args.database_url.replace("postgres://", "postgresql://", 1)
+    engine = create_engine(url)
+    report = run_harness(
+        engine,
+        seed=not args.no_seed,
+        properties=args.properties,
+        leads=args.leads,
+        bookings=args.bookings,
+        migration_indexes=not args.no_migration_indexes,
+    )
+    print(format_report(report, verbose=args.verbose))
+    sys.exit(0 if report.ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import sys
+import os
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Make the backend `app` package importable during tests
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+from app.database import models
+
+
+@pytest.fixture()
+def session_factory():
+    """Sessions on one empty in-memory database"""
+    # Writers and flush tasks run in worker threads, so share one connection across threads
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    models.Base.metadata.create_all(engine)
+    try:
+        yield sessionmaker(bind=engine)
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture()
+def db(session_factory):
+    """A session on the empty database; modules seed it by overriding `db(db)`"""
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,93 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+import pytest
+
+from app.api.routers import reports
+from app.database import models
+from app.services import analytics_snapshot
+from app.services.analytics_snapshot import SnapshotEngine, export_snapshot
+from app.services.dashboard import dashboard_summary
+from app.services.listing_stats import rebuild_listing_stats
+
+needs_pyarrow = pytest.mark.skipif(analytics_snapshot.pa is None, reason="pyarrow not installed")
+
+
+@pytest.fixture()
+def db(db):
+    rng = random.Random(8)
+    now = datetime.now()
+    for i in range(120):
+        db.add(models.Property(
+            title=f"Flat {i}", slug=f"flat-{i}", price="₹20,000/month", location=f"Sector {i % 9}",
+            city=rng.choice(["Gurgaon", "Noida", "Delhi", None]), property_type=rng.choice(["apartment", "pg", None]),
+            is_available=rng.random() < 0.6, created_at=now - timedelta(days=rng.randint(0, 20)),
+        ))
+    db.flush()
+    for i in range(400):
+        db.add(models.Lead(
+            reference=f"ref-{i}", name="Lead", phone="9876543210", property_id=rng.choice([None, *range(1, 40)]),
+            status=rng.choice(["new", "contacted", "converted", "lost"]), source=rng.choice(["website", "referral"]),
+            created_at=now - timedelta(days=rng.randint(0, 60)),
+        ))
+    rebuild_listing_stats(db)
+    db.commit()
+    return db
+
+
+def unordered(payload):
+    """Lists of dicts compared as sets (group order is unspecified)"""
+    if isinstance(payload, dict):
+        return {k: unordered(v) for k, v in payload.items()}
+    if isinstance(payload, list):
+        return frozenset(tuple(sorted(unordered(item).items())) for item in payload)
+    return payload
+
+
+def test_engine_is_unused_without_a_snapshot(tmp_path, monkeypatch):
+    assert not SnapshotEngine(directory=str(tmp_path)).ready()
+    monkeypatch.setattr(analytics_snapshot.settings, "ANALYTICS_ENGINE", "database")
+    assert analytics_snapshot.analytics_engine() is None
+
+
+@needs_pyarrow
+def test_snapshot_answers_match_the_database(db, tmp_path):
+    export_snapshot(db, str(tmp_path), batch_size=50)  # several row groups per table
+    engine = SnapshotEngine(directory=str(tmp_path))
+    assert engine.ready()
+    assert engine.table("leads").schema.field("status").type == analytics_snapshot.pa.dictionary(
+        analytics_snapshot.pa.int32(), analytics_snapshot.pa.string()
+    )
+
+    expected = dashboard_summary(db)
+    actual = engine.dashboard()
+    by_location = lambda payload: sorted(r["count"] for r in payload["property_breakdown"].pop("by_location"))
+    assert by_location(actual) == by_location(expected)
+    assert unordered(actual) == unordered(expected)
+
+    end = datetime.now()
+    start = end - timedelta(days=30)
+    run = asyncio.run
+    assert unordered(engine.property_overview()) == unordered(run(reports.get_property_overview_data(db)))
+    assert unordered(engine.availability()) == unordered(run(reports.get_availability_data(db)))
+    assert unordered(engine.lead_insights(start, end)) == unordered(run(reports.get_lead_insights_data(db, start, end)))
+    assert unordered(engine.market_analysis()) == unordered(run(reports.get_market_analysis_data(db)))
+    assert engine.listing_performance(start, end) == run(reports.get_listing_performance_data(db, start, end))
+
+
+@needs_pyarrow
+def test_new_exports_replace_the_current_snapshot(db, tmp_path):
+    engine = SnapshotEngine(directory=str(tmp_path))
+    first = export_snapshot(db, str(tmp_path), keep=2)
+    assert engine.ready() and engine.table("properties").num_rows == 120
+
+    db.add(models.Property(title="New", slug="new", price="₹1/month"))
+    db.commit()
+    export_snapshot(db, str(tmp_path), keep=2)
+    latest = export_snapshot(db, str(tmp_path), keep=2)
+    assert engine.ready() and engine.table("properties").num_rows == 121
+    assert not first.exists() and latest.exists()
+    assert len(list(tmp_path.glob("snapshot-*"))) == 2
+
+    stale = SnapshotEngine(directory=str(tmp_path), max_age=0)
+    assert not stale.ready()  # exporter stopped: fall back to the database
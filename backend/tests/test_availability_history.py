@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import update
+
+from app.database import models
+from app.schemas import schemas
+from app.services import availability_history
+from app.services.availability_history import availability_trend, compact_availability, prune_events
+from app.services.booking_calendar import BookingCalendar
+from app.services.crud import BookingService, PropertyService
+
+TODAY = date(2026, 10, 19)
+Event = models.PropertyAvailabilityEvent
+
+
+def days_ago(db, days: int, after_id: int) -> int:
+    """Move the events logged after `after_id` to `days` before TODAY; returns the last id"""
+    stamp = datetime.combine(TODAY - timedelta(days=days), datetime.min.time()) + timedelta(hours=9)
+    db.execute(update(Event).where(Event.id > after_id).values(created_at=stamp))
+    db.commit()
+    return db.query(Event.id).order_by(Event.id.desc()).limit(1).scalar() or after_id
+
+
+def test_changes_are_logged_and_compacted_into_daily_snapshots(db):
+    properties = PropertyService()
+    bookings = BookingService(calendar=BookingCalendar())
+
+    for i in range(3):
+        properties.create_property(db, schemas.PropertyCreate(title=f"Flat {i}", price="₹20,000/month"))
+    last = days_ago(db, 3, 0)
+
+    properties.set_availability(db, 1, False)
+    properties.set_availability(db, 1, False)  # unchanged, not logged
+    last = days_ago(db, 2, last)
+
+    booking = bookings.create_booking(db, schemas.BookingCreate(
+        property_id=2, tenant_name="Tenant", tenant_phone="9876543210",
+        check_in=datetime(2026, 11, 1), monthly_rent=20000,
+    ))
+    properties.delete_property(db, 3)
+    last = days_ago(db, 1, last)
+
+    bookings.cancel_booking(db, booking.id)
+    properties.hard_delete_property(db, 3)
+    days_ago(db, 0, last)
+
+    assert [e.reason for e in db.query(Event).order_by(Event.id)] == [
+        "created", "created", "created", "toggled", "booked", "soft_deleted", "booking_cancelled", "deleted",
+    ]
+
+    assert compact_availability(db, today=TODAY) == [TODAY - timedelta(days=d) for d in (3, 2, 1)]
+    assert compact_availability(db, today=TODAY) == []  # already up to date
+
+    series = availability_trend(db, days=7, today=TODAY)
+    assert [(p["date"], p["total_properties"], p["available_properties"], p["changes"]) for p in series] == [
+        ("2026-10-16", 3, 3, 3),
+        ("2026-10-17", 3, 2, 1),
+        ("2026-10-18", 3, 0, 2),
+        ("2026-10-19", 2, 1, 2),  # today, from the live table
+    ]
+
+
+def test_compaction_catches_up_and_prunes_old_events(db):
+    properties = PropertyService()
+    properties.create_property(db, schemas.PropertyCreate(title="Flat", price="₹20,000/month"))
+    last = days_ago(db, 40, 0)
+    properties.set_availability(db, 1, False)
+    days_ago(db, 5, last)
+
+    written = compact_availability(db, today=TODAY, max_days=30)
+    assert written[0] == TODAY - timedelta(days=30) and written[-1] == TODAY - timedelta(days=1)
+    snapshots = {s.day: s.available_properties for s in db.query(models.DailyAvailabilitySnapshot)}
+    assert (snapshots[TODAY - timedelta(days=6)], snapshots[TODAY - timedelta(days=5)]) == (1, 0)
+
+    assert prune_events(db, today=TODAY, retention_days=30) == 1  # the 40-day-old create
+    assert [e.reason for e in db.query(Event)] == ["toggled"]
+
+
+def test_concurrent_compaction_skips_days_already_written(db, monkeypatch):
+    PropertyService().create_property(db, schemas.PropertyCreate(title="Flat", price="₹20,000/month"))
+    days_ago(db, 3, 0)
+
+    # Another worker writes yesterday's snapshot between this one's read and its insert
+    original = availability_history.daily_deltas
+
+    def racing_deltas(session, first):
+        session.add(models.DailyAvailabilitySnapshot(
+            day=TODAY - timedelta(days=1), total_properties=1, available_properties=1, changes=0,
+        ))
+        session.flush()
+        return original(session, first)
+
+    monkeypatch.setattr(availability_history, "daily_deltas", racing_deltas)
+    assert compact_availability(db, today=TODAY) == [TODAY - timedelta(days=d) for d in (3, 2, 1)]
+    assert db.query(models.DailyAvailabilitySnapshot).count() == 3
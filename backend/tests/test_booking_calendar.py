@@ -0,0 +1,129 @@
+from datetime import date, datetime
+import pytest
+
+from app.database import models
+from app.schemas import schemas
+from app.services.booking_calendar import (
+    BookingConflictError,
+    PropertyIntervals,
+    booking_calendar,
+    parse_date_range,
+)
+from app.services.crud import BookingService, PropertyService
+
+
+@pytest.fixture()
+def session(db):
+    for i in range(3):
+        db.add(models.Property(title=f"Flat {i}", slug=f"flat-{i}", price="₹20,000/month"))
+    db.commit()
+    booking_calendar.invalidate()
+    try:
+        yield db
+    finally:
+        booking_calendar.invalidate()
+
+
+def book(service, db, property_id, check_in, check_out=None):
+    return service.create_booking(db, schemas.BookingCreate(
+        property_id=property_id,
+        tenant_name="Tenant",
+        tenant_phone="9876543210",
+        check_in=check_in,
+        check_out=check_out,
+        monthly_rent=20000,
+    ))
+
+
+def test_intervals_handle_legacy_overlaps():
+    intervals = PropertyIntervals()
+    intervals.add(datetime(2026, 1, 1), datetime(2026, 12, 31), 1)  # long stay
+    intervals.add(datetime(2026, 2, 1), datetime(2026, 2, 10), 2)
+    intervals.add(datetime(2026, 3, 1), datetime(2026, 3, 10), 3)
+
+    # Later short bookings end before April but the long one still covers it
+    assert intervals.overlapping(datetime(2026, 4, 1), datetime(2026, 4, 2)) == 1
+    assert intervals.overlapping(datetime(2027, 1, 1), datetime(2027, 2, 1)) is None
+    assert intervals.overlapping(datetime(2026, 2, 5), datetime(2026, 2, 6), exclude_id=1) == 2
+
+    intervals.remove(1)
+    assert intervals.overlapping(datetime(2026, 4, 1), datetime(2026, 4, 2)) is None
+
+
+def test_overlapping_booking_is_rejected(session):
+    service = BookingService()
+    book(service, session, 1, datetime(2026, 3, 1), datetime(2026, 6, 1))
+
+    with pytest.raises(BookingConflictError) as exc:
+        book(service, session, 1, datetime(2026, 5, 15), datetime(2026, 7, 1))
+    assert exc.value.property_id == 1
+
+    # Back-to-back stays share only the boundary
+    book(service, session, 1, datetime(2026, 6, 1), datetime(2026, 9, 1))
+    # Other properties are unaffected
+    book(service, session, 2, datetime(2026, 5, 15))
+
+
+def test_cancelled_booking_frees_the_dates(session):
+    service = BookingService()
+    first = book(service, session, 1, datetime(2026, 3, 1), datetime(2026, 6, 1))
+    service.cancel_booking(session, first.id)
+
+    book(service, session, 1, datetime(2026, 4, 1), datetime(2026, 5, 1))
+
+
+def test_cancelling_through_update_frees_the_property(session):
+    service = BookingService()
+    booking = book(service, session, 2, datetime(2026, 3, 1), datetime(2026, 6, 1))
+    version = session.get(models.Property, 2).version
+
+    service.update_booking(session, booking.id, schemas.BookingUpdate(status="cancelled"))
+    session.expire_all()
+    prop = session.get(models.Property, 2)
+    assert prop.is_available and prop.version == version + 1  # other workers reload their calendars
+    service.update_booking(session, booking.id, schemas.BookingUpdate(status="cancelled"))  # already cancelled
+    session.expire_all()
+    assert session.get(models.Property, 2).version == version + 1
+
+    book(service, session, 2, datetime(2026, 4, 1), datetime(2026, 5, 1))
+
+
+def test_reconfirming_a_cancelled_booking_takes_the_property(session):
+    service = BookingService()
+    booking = book(service, session, 3, datetime(2026, 3, 1), datetime(2026, 6, 1))
+    service.cancel_booking(session, booking.id)
+    session.expire_all()
+    version = session.get(models.Property, 3).version
+    service.cancel_booking(session, booking.id)  # already cancelled: no second release
+    session.expire_all()
+    assert session.get(models.Property, 3).version == version
+    assert session.query(models.PropertyAvailabilityEvent).filter_by(property_id=3).count() == 2
+
+    service.update_booking(session, booking.id, schemas.BookingUpdate(status="confirmed"))
+    session.expire_all()
+    assert not session.get(models.Property, 3).is_available
+
+
+def test_available_between_filters_listing_and_search(session):
+    bookings = BookingService()
+    book(bookings, session, 1, datetime(2026, 3, 1), datetime(2026, 4, 1))
+    book(bookings, session, 2, datetime(2026, 7, 1))  # open-ended
+    booking_calendar.invalidate()  # next lookup rebuilds from the table
+
+    properties = PropertyService()
+    march_to_june = parse_date_range("2026-03-15,2026-06-30")
+    items, total = properties.get_properties(session, available_between=march_to_june)
+    assert total == 2
+    assert sorted(p.id for p in items) == [2, 3]
+
+    august = parse_date_range("2026-08-01, 2026-08-31")
+    found = properties.search_properties(session, available_between=august)
+    assert sorted(p.id for p in found) == [1, 3]
+    assert properties.get_properties_count(session, available_between=august) == 2
+
+
+def test_parse_date_range_rejects_bad_input():
+    assert parse_date_range("2026-03-01,2026-06-30") == (date(2026, 3, 1), date(2026, 6, 30))
+    for value in ["2026-03-01", "2026-06-30,2026-03-01", "march,june"]:
+        with pytest.raises(ValueError):
+            parse_date_range(value)
@@ -0,0 +1,36 @@
+from app.database import models
+from app.services.crud import PropertyService, allocate_unique_slugs
+
+
+def test_allocate_unique_slugs_against_db_and_batch(db):
+    db.add_all([
+        models.Property(title="Sky Villa", slug="sky-villa", price="1"),
+        models.Property(title="Sky Villa", slug="sky-villa-1", price="1"),
+    ])
+    db.commit()
+
+    slugs = allocate_unique_slugs(db, ["Sky Villa", "Sky Villa", "Lake View"])
+
+    assert slugs == ["sky-villa-2", "sky-villa-3", "lake-view"]
+
+
+def test_bulk_import_batches_and_reports_row_errors(db):
+    rows = [
+        (1, {"title": "Cyberhub Studio", "price": "₹18,000/month", "bedrooms": "1", "images": "a.jpg, b.jpg"}, None),
+        (2, {"title": "Cyberhub Studio", "price": "₹19,000/month", "bedrooms": ""}, None),
+        (3, {"title": "Missing price"}, None),
+        (4, None, "Invalid JSON: Expecting value"),
+        (5, {"title": "Golf Course Road 3BHK", "price": "₹95,000/month", "bedrooms": "3"}, None),
+    ]
+
+    result = PropertyService().bulk_import_properties(db, iter(rows), batch_size=2)
+
+    assert result["total_rows"] == 5
+    assert result["inserted"] == 3
+    assert result["batches"] == 2
+    assert [e["row"] for e in result["errors"]] == [3, 4]
+
+    studio = db.query(models.Property).filter_by(slug="cyberhub-studio").one()
+    assert studio.image_url == "a.jpg"
+    assert studio.images == '["a.jpg", "b.jpg"]'
+    assert db.query(models.Property).filter_by(slug="cyberhub-studio-1").one().bedrooms is None
@@ -0,0 +1,79 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+
+from app.core.cache import cache
+from app.database import models
+from app.schemas import schemas
+from app.services.crud import lead_service, property_service
+from app.services.dashboard import dashboard_summary, get_dashboard
+
+
+@pytest.fixture()
+def db(db):
+    rng = random.Random(5)
+    now = datetime.now()
+    for i in range(300):
+        db.add(models.Property(
+            title=f"Flat {i}", slug=f"flat-{i}", price="₹20,000/month",
+            city=rng.choice(["Gurgaon", "Noida", "Delhi", "Pune", "Mumbai", "Goa", None]),
+            property_type=rng.choice(["apartment", "villa", "pg"]),
+            is_available=rng.random() < 0.7,
+            created_at=now - timedelta(days=rng.randint(0, 30)),
+        ))
+    for i in range(900):
+        db.add(models.Lead(
+            reference=f"ref-{i}", name="Lead", phone="9876543210",
+            status=rng.choice(["new", "contacted", "converted", "lost"]),
+            source=rng.choice(["website", "whatsapp", "referral"]),
+            created_at=now - timedelta(days=rng.randint(0, 30)),
+        ))
+    db.commit()
+    return db
+
+
+def as_set(items):
+    return {tuple(item.values()) for item in items}
+
+
+def test_summary_matches_per_table_stats(db):
+    summary = dashboard_summary(db)
+    properties = property_service.get_property_stats(db)
+    leads = lead_service.get_lead_stats(db)
+    week_ago = datetime.now() - timedelta(days=7)
+
+    assert summary["overview"] == {
+        "total_properties": properties["total_properties"],
+        "available_properties": properties["available_properties"],
+        "rented_properties": properties["rented_properties"],
+        "total_leads": leads["total_leads"],
+        "conversion_rate": leads["conversion_rate"],
+    }
+    assert summary["recent_activity"] == {
+        "new_properties_this_week": db.query(models.Property).filter(models.Property.created_at >= week_ago).count(),
+        "new_leads_this_week": db.query(models.Lead).filter(models.Lead.created_at >= week_ago).count(),
+    }
+    assert as_set(summary["property_breakdown"]["by_type"]) == as_set(properties["property_types"])
+    assert [l["count"] for l in summary["property_breakdown"]["by_location"]] == [
+        l["count"] for l in properties["top_locations"]
+    ]
+    assert as_set(summary["lead_breakdown"]["by_status"]) == as_set(leads["by_status"])
+    assert as_set(summary["lead_breakdown"]["by_source"]) == as_set(leads["by_source"])
+
+
+def test_cached_payload_is_dropped_by_lead_and_property_writes(db, monkeypatch):
+    monkeypatch.setattr(cache, "enabled", True)
+    cache.clear_all()
+    try:
+        before = get_dashboard(db)["overview"]
+        db.add(models.Lead(reference="direct", name="Lead", phone="9876543210"))
+        db.commit()
+        assert get_dashboard(db)["overview"] == before  # served from cache
+
+        lead_service.create_lead(db, schemas.LeadCreate(name="Lead", phone="9876543210"))
+        assert get_dashboard(db)["overview"]["total_leads"] == before["total_leads"] + 2
+
+        property_service.create_property(db, schemas.PropertyCreate(title="New flat", price="₹30,000/month"))
+        assert get_dashboard(db)["overview"]["total_properties"] == before["total_properties"] + 1
+    finally:
+        cache.clear_all()
@@ -0,0 +1,69 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import models
+from app.services.crud import lead_filter_clauses
+from app.services.export_service import encode_csv, lead_export_statement, stream_export
+
+LEADS = 2500
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    models.Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all(
+        models.Lead(
+            name=f"Lead, {i}",  # comma needs CSV quoting
+            phone=f"9{i:09d}",
+            source="instagram" if i % 5 == 0 else "website",
+            message="line one\nline two" if i == 7 else None,
+        )
+        for i in range(LEADS)
+    )
+    db.commit()
+    db.close()
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+def test_csv_export_streams_every_row_on_one_connection(engine):
+    checkouts = []
+    event.listen(engine, "checkout", lambda *args: checkouts.append(1))
+
+    chunks = list(stream_export(engine, lead_export_statement([]), "csv"))
+
+    assert len(chunks) > 1  # produced incrementally, not as one blob
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert len(rows) == LEADS
+    assert rows[0]["name"] == "Lead, 0"
+    assert rows[7]["message"] == "line one\nline two"
+    assert len(checkouts) == 1
+
+
+def test_gzipped_ndjson_export_with_filter(engine):
+    stmt = lead_export_statement(lead_filter_clauses({"source": "instagram"}))
+
+    body = gzip.decompress(b"".join(stream_export(engine, stmt, "ndjson", gzip=True)))
+
+    records = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert len(records) == LEADS // 5
+    assert {r["source"] for r in records} == {"instagram"}
+    assert records[0]["created_at"]  # datetimes serialized as ISO strings
+
+
+def test_csv_export_neutralises_formulas():
+    rows = [("=HYPERLINK(\"http://x\")", "+1+1", "-2", "@SUM(A1)", "\tcmd", "Asha", -3, None)]
+    body = b"".join(encode_csv(["a", "b", "c", "d", "e", "f", "g", "h"], rows)).decode("utf-8")
+
+    assert next(csv.reader(io.StringIO(body.split("\r\n", 1)[1]))) == [
+        "'=HYPERLINK(\"http://x\")", "'+1+1", "'-2", "'@SUM(A1)", "'\tcmd", "Asha", "-3", "",
+    ]
@@ -0,0 +1,78 @@
+import asyncio
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from app.core.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+
+def make_app(delay: float = 0.0, fail_first: int = 0):
+    """A create endpoint that counts how often it actually runs"""
+    app = FastAPI()
+    calls = []
+
+    @app.post("/items/", status_code=201)
+    async def create_item(item: dict):
+        calls.append(item)
+        await asyncio.sleep(delay)
+        if len(calls) <= fail_first:
+            raise HTTPException(status_code=503, detail="busy", headers={"Retry-After": "1"})
+        return {"id": len(calls), **item}
+
+    app.add_middleware(IdempotencyMiddleware, routes=[("POST", "/items/")], store=IdempotencyStore(), wait_seconds=2)
+    return app, calls
+
+
+def client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_retry_replays_stored_response():
+    app, calls = make_app()
+
+    async def scenario():
+        async with client(app) as c:
+            key = {"Idempotency-Key": "abc-123"}
+            first = await c.post("/items/", json={"name": "Flat"}, headers=key)
+            retry = await c.post("/items/", json={"name": "Flat"}, headers=key)
+            changed = await c.post("/items/", json={"name": "Villa"}, headers=key)
+            unkeyed = [await c.post("/items/", json={"name": "Flat"}) for _ in range(2)]
+            return first, retry, changed, unkeyed
+
+    first, retry, changed, unkeyed = asyncio.run(scenario())
+    assert (first.status_code, retry.status_code) == (201, 201)
+    assert retry.json() == first.json() == {"id": 1, "name": "Flat"}
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert changed.status_code == 422  # same key, different payload
+    assert [r.json()["id"] for r in unkeyed] == [2, 3]  # no header, no dedupe
+    assert len(calls) == 3
+
+
+def test_concurrent_duplicates_wait_for_in_flight_request():
+    app, calls = make_app(delay=0.1)
+
+    async def scenario():
+        async with client(app) as c:
+            return await asyncio.gather(*(
+                c.post("/items/", json={"name": "Flat"}, headers={"Idempotency-Key": "same"}) for _ in range(5)
+            ))
+
+    responses = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {r.status_code for r in responses} == {201}
+    assert {r.json()["id"] for r in responses} == {1}
+
+
+def test_transient_failures_are_not_replayed():
+    app, calls = make_app(fail_first=1)
+
+    async def scenario():
+        async with client(app) as c:
+            key = {"Idempotency-Key": "retry-me"}
+            return [await c.post("/items/", json={"name": "Flat"}, headers=key) for _ in range(3)]
+
+    failed, succeeded, replayed = asyncio.run(scenario())
+    assert failed.status_code == 503
+    assert succeeded.status_code == 201 and "idempotent-replayed" not in succeeded.headers
+    assert replayed.json() == succeeded.json() and replayed.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 2
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+
+from app.core.cache import cache
+from app.database import models
+from app.schemas import schemas
+from app.services.crud import lead_service
+from app.services.lead_analytics import source_performance
+
+
+@pytest.fixture()
+def db(db):
+    db.add(models.Property(title="Flat", slug="flat", price="₹20,000/month"))
+    db.commit()
+    return db
+
+
+def lead(db, source, days_ago, status=None, property_id=None):
+    """A lead created `days_ago` days ago, then moved to `status` now"""
+    created = lead_service.create_lead(db, schemas.LeadCreate(
+        name="Lead", phone="9876543210", source=source, property_id=property_id,
+    ))
+    created.created_at = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    db.commit()
+    if status:
+        lead_service.update_lead_status(db, created.id, status)
+    return created.id
+
+
+def test_conversion_rate_and_median_time_per_source(db):
+    for days in (1, 3, 5):
+        lead(db, "website", days, "converted")
+    lead(db, "website", 2, "contacted")
+    lead(db, "whatsapp", 2, "converted", property_id=1)
+    lead(db, "whatsapp", 4, "converted")
+    lead(db, "whatsapp", 6)
+    lead(db, "whatsapp", 6, "lost")
+    lead(db, "referral", 1)
+
+    result = source_performance(db)
+    sources = {s["key"]: s for s in result["sources"]}
+    assert (result["total_leads"], result["conversions"]) == (9, 5)
+    assert [s["key"] for s in result["sources"]] == ["website", "whatsapp", "referral"]
+
+    website, whatsapp, referral = sources["website"], sources["whatsapp"], sources["referral"]
+    assert (website["leads"], website["conversions"], website["conversion_rate"]) == (4, 3, 75.0)
+    assert website["median_days_to_convert"] == pytest.approx(3, abs=0.01)
+    assert (whatsapp["leads"], whatsapp["conversion_rate"]) == (4, 50.0)
+    assert whatsapp["median_days_to_convert"] == pytest.approx(3, abs=0.01)  # mean of the middle two
+    assert whatsapp["by_status"] == {"converted": 2, "new": 1, "lost": 1}
+    assert referral["median_days_to_convert"] is None and referral["conversion_rate"] == 0
+
+    recent = source_performance(db, {"created_after": datetime.now(timezone.utc) - timedelta(days=3, hours=12)})
+    assert {s["key"]: s["conversions"] for s in recent["sources"]} == {"website": 2, "whatsapp": 1, "referral": 0}
+    assert source_performance(db, {"property_id": 1})["sources"][0]["median_days_to_convert"] == pytest.approx(2, abs=0.01)
+
+
+def test_results_are_cached_per_filter_set_until_a_lead_write(db, monkeypatch):
+    monkeypatch.setattr(cache, "enabled", True)
+    cache.clear_all()
+    try:
+        lead_id = lead(db, "website", 1)
+        assert source_performance(db)["conversions"] == 0
+        assert source_performance(db, {"property_id": 1})["total_leads"] == 0
+
+        db.query(models.Lead).update({"status": "converted"})  # bypasses the service: stale but cached
+        db.commit()
+        assert source_performance(db)["conversions"] == 0
+
+        lead_service.update_lead_status(db, lead_id, "converted")
+        assert source_performance(db)["conversions"] == 1
+    finally:
+        cache.clear_all()
@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import event
+
+from app.database import models
+from app.services.crud import LeadService
+
+
+@pytest.fixture()
+def session(db):
+    db.add(models.User(email="sales@indohomz.com", password_hash="x", role="staff"))
+    for i in range(6):
+        db.add(models.Lead(
+            name=f"Lead {i}",
+            phone=f"98765{i:05d}",
+            source="instagram" if i % 2 else "website",
+            status="new",
+        ))
+    db.commit()
+    return db
+
+
+def capture_statements(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, sql, *args: statements.append(sql))
+    return statements
+
+
+def test_ids_update_in_one_statement(session):
+    statements = capture_statements(session)
+
+    updated = LeadService().bulk_update_leads(
+        session, {"status": "contacted", "assigned_to": 1}, ids=[1, 2, 3, 999]
+    )
+
+    assert sorted(updated) == [1, 2, 3]
+    assert sum(sql.lstrip().upper().startswith("UPDATE") for sql in statements) == 1
+    leads = {lead.id: lead for lead in session.query(models.Lead)}
+    assert [leads[i].status for i in (1, 2, 3, 4)] == ["contacted"] * 3 + ["new"]
+    assert leads[2].assigned_to == 1
+
+
+def test_filter_update_and_archive(session):
+    service = LeadService()
+
+    updated = service.bulk_update_leads(session, {"archived": True}, filters={"source": "instagram"})
+
+    assert sorted(updated) == [2, 4, 6]
+    visible = service.get_leads(session)
+    assert sorted(lead.id for lead in visible) == [1, 3, 5]
+    assert len(service.get_leads(session, include_archived=True)) == 6
+
+    restored = service.bulk_update_leads(session, {"archived": False}, filters={"archived": True})
+    assert sorted(restored) == [2, 4, 6]
+    assert len(service.get_leads(session)) == 6
@@ -0,0 +1,109 @@
+import asyncio
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.database import models
+from app.schemas import schemas
+from app.services.crud import LeadService
+from app.services.lead_dedupe import DEDUPE_BUCKETS, LeadDeduplicator
+from app.services.lead_ingestion import LeadIngestionQueue
+
+
+def test_repeat_within_window_returns_first_reference():
+    dedupe = LeadDeduplicator(window_seconds=3600, enabled=True)
+    now = 1_000_000.0
+
+    assert dedupe._claim_memory(dedupe.prospect_key("+91 98765-43210", 7), "first", now) is None
+    # Same prospect, different formatting
+    assert dedupe._claim_memory(dedupe.prospect_key("9876543210", 7), "second", now + 60) == "first"
+    # Different property is a different inquiry
+    assert dedupe._claim_memory(dedupe.prospect_key("9876543210", 8), "third", now + 60) is None
+    # Once the bucket expires the prospect starts a new lead
+    later = now + dedupe.bucket_seconds * (DEDUPE_BUCKETS + 2)
+    assert dedupe._claim_memory(dedupe.prospect_key("9876543210", 7), "fourth", later) is None
+
+
+def test_merge_appends_message_and_counts(session_factory):
+    db = session_factory()
+    service = LeadService()
+    lead = service.create_lead(
+        db,
+        schemas.LeadCreate(name="Asha", phone="9876543210", message="2BHK?"),
+        reference="ref-1",
+    )
+
+    assert service.merge_duplicate_lead(db, "ref-1", "Any parking?")
+    assert service.merge_duplicate_lead(db, "ref-1", None)
+    assert not service.merge_duplicate_lead(db, "missing", "hello")
+
+    db.refresh(lead)
+    assert lead.submission_count == 3
+    assert lead.message == "2BHK?\n\nAny parking?"
+    db.close()
+
+
+def test_merged_message_stops_growing_at_the_limit(session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "LEAD_MERGED_MESSAGE_MAX_CHARS", 20)
+    db = session_factory()
+    service = LeadService()
+    lead = service.create_lead(db, schemas.LeadCreate(name="Asha", phone="9876543210", message="2BHK?"), reference="ref-1")
+
+    for _ in range(50):
+        assert service.merge_duplicate_lead(db, "ref-1", "Any parking?")
+    db.refresh(lead)
+    assert lead.submission_count == 51
+    assert lead.message == "2BHK?\n\nAny parking?"
+    db.close()
+
+
+def test_buffered_merge_follows_insert(session_factory):
+    queue = LeadIngestionQueue(batch_size=10, flush_interval=0.01, session_factory=session_factory)
+    lead = schemas.LeadCreate(name="Ravi", phone="9876500000", message="first")
+
+    async def submit_twice():
+        queue.start()
+        reference = await queue.submit(lead)
+        await queue.submit_merge(reference, lead.model_copy(update={"message": "second"}))
+        await queue.stop()
+        return reference
+
+    reference = asyncio.run(submit_twice())
+
+    db = session_factory()
+    assert db.query(func.count(models.Lead.id)).scalar() == 1
+    stored = db.query(models.Lead).filter_by(reference=reference).one()
+    assert stored.submission_count == 2
+    assert stored.message == "first\n\nsecond"
+    db.close()
+
+
+def test_release_forgets_only_its_own_claim():
+    dedupe = LeadDeduplicator(window_seconds=3600, enabled=True)
+
+    async def scenario():
+        assert await dedupe.claim("9876543210", 7, "queued") is None
+        await dedupe.release("9876543210", 7, "someone-else")
+        assert await dedupe.claim("9876543210", 7, "retry") == "queued"
+        await dedupe.release("+91 98765 43210", 7, "queued")  # enqueue failed
+        return await dedupe.claim("9876543210", 7, "retry")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_buffered_merge_into_missing_lead_writes_it(session_factory):
+    queue = LeadIngestionQueue(batch_size=10, flush_interval=0.01, session_factory=session_factory)
+    lead = schemas.LeadCreate(name="Ravi", phone="9876500000", message="retry")
+
+    async def merge_twice():
+        queue.start()
+        # The first submission's batch failed, so nothing has this reference
+        await queue.submit_merge("lost-ref", lead)
+        await queue.submit_merge("lost-ref", lead.model_copy(update={"message": "again"}))
+        await queue.stop()
+
+    asyncio.run(merge_twice())
+
+    db = session_factory()
+    stored = db.query(models.Lead).one()
+    assert (stored.reference, stored.submission_count, stored.message) == ("lost-ref", 2, "retry\n\nagain")
+    db.close()
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import insert
+
+from app.database import models
+from app.schemas import schemas
+from app.services.crud import lead_service
+from app.services.lead_funnel import cohort_matrix, cohort_week, record_created_leads
+
+
+def new_lead(db):
+    return lead_service.create_lead(db, schemas.LeadCreate(name="Lead", phone="9876543210")).id
+
+
+def test_transitions_maintain_the_cohort_matrix(db):
+    ids = [new_lead(db) for _ in range(6)]
+    move = lambda i, status: lead_service.update_lead_status(db, ids[i], status)
+
+    move(0, "contacted")
+    move(0, "site_visit")
+    lead = lead_service.get_lead(db, ids[0])
+    lead.status_changed_at = datetime.now(timezone.utc) - timedelta(days=2)  # two days in site_visit
+    db.commit()
+    move(0, "converted")
+
+    lead_service.update_lead(db, ids[1], schemas.LeadUpdate(status="contacted"))
+    move(1, "lost")
+    move(2, "contacted")
+    move(2, "new")
+    move(2, "contacted")  # re-entering a stage counts once
+    lead_service.bulk_update_leads(db, {"status": schemas.LeadStatus.CONTACTED}, ids=ids[2:5])
+    move(5, "new")  # unchanged, not logged
+
+    assert db.query(models.LeadStatusTransition).count() == 6 + 10  # creations, then 3 + 2 + 3 + 2 changes
+
+    cohort, = cohort_matrix(db, weeks=1)["cohorts"]
+    assert cohort["week"] == cohort_week().isoformat() and cohort["leads"] == 6
+    stages = cohort["stages"]
+    assert {name: (s["reached"], s["current"]) for name, s in stages.items()} == {
+        "new": (6, 1), "contacted": (5, 3), "site_visit": (1, 0),
+        "negotiation": (0, 0), "converted": (1, 1), "lost": (1, 1),
+    }
+    assert stages["contacted"]["from_previous_pct"] == 83.3
+    assert stages["site_visit"]["from_previous_pct"] == 20.0
+    assert stages["site_visit"]["avg_days_in_stage"] == pytest.approx(2.0, abs=0.01)
+    assert stages["negotiation"]["avg_days_in_stage"] is None
+
+
+def test_bulk_inserted_leads_join_their_creation_week(db):
+    created_at = datetime.now(timezone.utc) - timedelta(weeks=2)
+    rows = [
+        {"reference": f"ref-{i}", "name": "Lead", "phone": "9876543210", "status": "new", "created_at": created_at}
+        for i in range(3)
+    ]
+    db.execute(insert(models.Lead), rows)
+    record_created_leads(db, rows)
+    db.commit()
+    new_lead(db)
+
+    result = cohort_matrix(db, weeks=3)
+    assert [(c["week"], c["leads"]) for c in result["cohorts"]] == [
+        (cohort_week(created_at).isoformat(), 3),
+        (cohort_week().isoformat(), 1),
+    ]
+    assert cohort_matrix(db, weeks=1)["cohorts"][0]["leads"] == 1
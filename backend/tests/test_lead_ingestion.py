@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import pytest
+from sqlalchemy import func
+
+from app.database import models
+from app.schemas import schemas
+from app.services.lead_ingestion import LeadIngestionQueue, LeadQueueFull
+
+
+def make_lead(i: int) -> schemas.LeadCreate:
+    return schemas.LeadCreate(name=f"Lead {i}", phone=f"98765{i:05d}", source="instagram")
+
+
+def test_burst_is_written_in_batches(session_factory):
+    queue = LeadIngestionQueue(max_size=100, batch_size=10, flush_interval=0.05, session_factory=session_factory)
+
+    async def burst():
+        queue.start()
+        refs = [await queue.submit(make_lead(i)) for i in range(25)]
+        await queue.stop()
+        return refs
+
+    references = asyncio.run(burst())
+
+    db = session_factory()
+    stored = {ref for (ref,) in db.query(models.Lead.reference)}
+    assert stored == set(references)
+    assert db.query(func.count(models.Lead.id)).filter(models.Lead.status == "new").scalar() == 25
+    db.close()
+    assert queue.stats["written"] == 25
+    assert queue.stats["batches"] == 3
+    assert not queue.running
+
+
+def test_full_queue_applies_backpressure(session_factory):
+    release = threading.Event()
+
+    def blocked_sessions():
+        release.wait(5)
+        return session_factory()
+
+    queue = LeadIngestionQueue(
+        max_size=2, batch_size=1, flush_interval=0.01, enqueue_timeout=0.05,
+        session_factory=blocked_sessions,
+    )
+
+    async def overload():
+        queue.start()
+        await queue.submit(make_lead(0))
+        await asyncio.sleep(0.05)  # writer takes lead 0 and blocks
+        await queue.submit(make_lead(1))
+        await queue.submit(make_lead(2))
+        with pytest.raises(LeadQueueFull):
+            await queue.submit(make_lead(3))
+        release.set()
+        await queue.stop()
+
+    asyncio.run(overload())
+
+    assert queue.stats["rejected"] == 1
+    assert queue.stats["written"] == 3
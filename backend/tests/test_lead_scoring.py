@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import update
+
+from app.api.routers import leads
+from app.core.security import get_current_user
+from app.database import models
+from app.database.connection import get_db
+from app.services import lead_scoring
+from app.services.crud import LeadService
+from app.services.lead_scoring import LeadScorer, score_rows_python
+
+
+@pytest.fixture()
+def session(db):
+    db.add(models.Property(title="Mid", slug="mid", price="₹35,000/month", price_numeric=35000))
+    db.add(models.Property(title="Luxury", slug="lux", price="₹3,00,000/month", price_numeric=300000))
+    db.commit()
+    return db
+
+
+def add_lead(db, **fields):
+    lead = models.Lead(name="Lead", phone="9876543210", **fields)
+    db.add(lead)
+    db.commit()
+    return lead
+
+
+def test_score_ranks_strong_signals_higher(session):
+    soon = datetime.utcnow() + timedelta(days=2)
+    hot = add_lead(session, source="referral", property_id=1, submission_count=3, preferred_visit_date=soon)
+    cold = add_lead(session, source="instagram", property_id=2)
+    lost = add_lead(session, source="referral", property_id=1, status="lost")
+
+    LeadScorer(batch_size=2).rescore(session)
+
+    for lead in (hot, cold, lost):
+        session.refresh(lead)
+    assert 0 <= cold.score < hot.score <= 100
+    assert lost.score == 0
+
+    ranked = LeadService().get_leads(session, sort="score")
+    assert [lead.id for lead in ranked] == [hot.id, cold.id, lost.id]
+
+
+def test_incremental_rescore_only_touches_changed_leads(session):
+    first = add_lead(session, source="website")
+    second = add_lead(session, source="website")
+    scorer = LeadScorer()
+
+    assert scorer.rescore(session)["scored"] == 2
+    assert scorer.rescore(session)["scored"] == 0  # scoring does not count as a change
+
+    session.execute(
+        update(models.Lead).where(models.Lead.id == second.id)
+        .values(submission_count=4, updated_at=datetime.utcnow() + timedelta(seconds=1))
+    )
+    session.commit()
+    assert scorer.rescore(session)["scored"] == 1
+    assert scorer.rescore(session, full=True)["scored"] == 2
+
+
+@pytest.mark.skipif(lead_scoring.np is None, reason="numpy not installed")
+def test_numpy_matches_reference_implementation(session):
+    now = lead_scoring._epoch(datetime.utcnow())
+    hour, day = 3600.0, 86400.0
+    # (id, source, status, created, updated, count, visit, price) in epoch seconds
+    rows = [
+        (1, "referral", "contacted", now - 30 * hour, now - 2 * hour, 2, now + 3 * day, 40000.0),
+        (2, "instagram", "new", now - 4 * day, None, 1, None, None),
+        (3, "unknown", "site_visit", now - day, now, 1, now - day, 9000.0),
+        (4, "website", "converted", now, None, 1, None, 35000.0),
+    ]
+
+    assert lead_scoring.score_rows_numpy(rows, now) == pytest.approx(score_rows_python(rows, now), abs=0.01)
+
+
+def test_rescore_requires_an_admin(session):
+    app = FastAPI()
+    app.include_router(leads.router, prefix="/leads")
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "user", "role": "staff"}
+
+    async def post():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            return (await c.post("/leads/rescore")).status_code
+
+    assert asyncio.run(post()) == 403
+    session.add(models.Lead(name="Asha", phone="9876543210"))
+    session.commit()
+    LeadScorer().rescore(session)
+    scored_at = session.query(models.Lead.scored_at).first()[0]
+    assert abs((datetime.utcnow() - scored_at).total_seconds()) < 60  # stored as UTC
@@ -0,0 +1,137 @@
+import asyncio
+import math
+import time
+import random
+import pytest
+
+from app.api.routers import leads
+from app.database import models
+from app.schemas import schemas
+from app.services.lead_dedupe import LeadDeduplicator
+from app.services.lead_velocity import (
+    ALLOW, QUARANTINE, REJECT, LeadVelocity, SlidingCountMinSketch, velocity_keys,
+)
+
+
+def test_sketch_never_undercounts_and_forgets_old_buckets():
+    sketch = SlidingCountMinSketch(window_seconds=3600, buckets=12, width=256, depth=4)
+    now = 1_000_000.0
+    rng = random.Random(3)
+    truth = {}
+    for _ in range(20_000):
+        key = f"phone-{rng.randint(0, 5000)}"
+        truth[key] = truth.get(key, 0) + 1
+        sketch.add(key, now)
+
+    errors = [sketch.estimate(key, now) - count for key, count in truth.items()]
+    assert min(errors) >= 0
+    assert sum(errors) / len(errors) < 0.5 * math.e * 20_000 / 256  # well inside the e/width bound
+
+    # Memory is fixed by the shape, not by how many keys arrived
+    assert sketch.memory_bytes == (12 + 1) * 4 * 256 * 4
+
+    # After a full window everything has aged out
+    assert sketch.estimate("phone-1", now + 3600 + sketch.bucket_seconds) == 0
+    assert sketch.add("phone-1", now + 3600 + sketch.bucket_seconds) == 1
+
+
+def submission(phone, message="Looking for a 2BHK near Cyberhub", email=None, property_id=None):
+    return schemas.LeadCreate(name="Lead", phone=phone, message=message, email=email, property_id=property_id)
+
+
+def test_bot_reusing_phone_and_template_is_quarantined_then_rejected():
+    velocity = LeadVelocity(window_seconds=3600, quarantine_score=50, reject_score=90, enabled=True)
+
+    phrases = ["Is this flat still available?", "Can I visit this weekend?", "Is parking included?", None]
+
+    async def scenario():
+        honest = [
+            await velocity.check(submission(f"98765{i:05d}", message=phrases[i % len(phrases)], property_id=i % 7))
+            for i in range(60)
+        ]
+        bot = [
+            await velocity.check(submission("9123456789", message=f"BEST DEAL call {n} now!! visit spam.example"))
+            for n in range(20)
+        ]
+        return honest, bot
+
+    honest, bot = asyncio.run(scenario())
+    assert {v.action for v in honest} == {ALLOW}
+    assert [v.action for v in bot][:2] == [ALLOW, ALLOW]
+    assert QUARANTINE in [v.action for v in bot]
+    assert bot[-1].action == REJECT
+    assert bot[-1].counts == {"phone": 20, "message": 20}  # numbers folded out of the template
+    assert [v.score for v in bot] == sorted(v.score for v in bot)
+
+
+def test_velocity_keys_skip_free_mail_and_short_messages():
+    keys = velocity_keys(submission("+91 98765 43210", message="hi", email="a@gmail.com"))
+    assert keys == {"phone": "9876543210"}
+    keys = velocity_keys(submission("9876543210", email="ops@Agency.example", property_id=4))
+    assert keys["email_domain"] == "agency.example" and keys["property"] == "4" and "message" in keys
+
+
+def test_quarantine_list_is_capped():
+    velocity = LeadVelocity(quarantine_size=3, enabled=True)
+
+    async def scenario():
+        for n in range(5):
+            verdict = await velocity.check(submission("9123456789"))
+            await velocity.quarantine(submission("9123456789"), verdict, reference=f"ref-{n}")
+        return await velocity.quarantined()
+
+    entries = asyncio.run(scenario())
+    assert [e["reference"] for e in entries] == ["ref-4", "ref-3", "ref-2"]
+    assert entries[0]["counts"]["phone"] == 5
+
+
+@pytest.fixture()
+def db(db):
+    for i in range(1, 9):
+        db.add(models.Property(title=f"Flat {i}", slug=f"flat-{i}", price="₹20,000/month"))
+    db.commit()
+    return db
+
+
+def test_prospect_browsing_several_listings_is_not_quarantined(db, monkeypatch):
+    velocity = LeadVelocity(window_seconds=3600, quarantine_score=50, reject_score=90, enabled=True)
+    monkeypatch.setattr(leads, "lead_velocity", velocity)
+    monkeypatch.setattr(leads, "lead_deduplicator", LeadDeduplicator(window_seconds=3600, enabled=True))
+    message = "Hi, I am interested in this property. Please share details."
+
+    async def scenario():
+        await leads.store_lead(submission("9876543210", message=message, property_id=1), db)
+        await leads.store_lead(submission("9876543210", message=message, property_id=1), db)  # merged
+        for property_id in range(2, 9):
+            await leads.store_lead(submission("9876543210", message=message, property_id=property_id), db)
+
+    asyncio.run(scenario())
+    assert db.query(models.Lead).count() == 8
+    assert not velocity._quarantine
+    now = time.time()
+    # The repeat counts toward the phone but not toward the message template
+    assert velocity.sketches["phone"].estimate("9876543210", now) == 9
+    assert velocity.sketches["property"].estimate("1", now) == 1
+
+
+def test_repeats_count_toward_phone_velocity(db, monkeypatch):
+    velocity = LeadVelocity(window_seconds=3600, quarantine_score=50, reject_score=90, enabled=True)
+    monkeypatch.setattr(leads, "lead_velocity", velocity)
+    monkeypatch.setattr(leads, "lead_deduplicator", LeadDeduplicator(window_seconds=3600, enabled=True))
+
+    async def scenario():
+        for _ in range(15):
+            await leads.store_lead(submission("9876543210", message="Is this flat still available?", property_id=1), db)
+        return await leads.store_lead(submission("9876543210", message="Is this flat still available?", property_id=2), db)
+
+    result = asyncio.run(scenario())
+    assert result.status == "queued"  # quarantined: looks accepted, but no lead
+    assert db.query(models.Lead).count() == 1
+    assert db.query(models.Lead).one().submission_count == 15
+    assert [entry["lead"]["property_id"] for entry in velocity._quarantine] == [2]
+
+    # The earlier lead is gone: the repeat becomes a new lead and is held to its verdict
+    db.query(models.Lead).delete()
+    db.commit()
+    result = asyncio.run(leads.store_lead(submission("9876543210", message="Is this flat still available?", property_id=1), db))
+    assert result.status == "queued" and db.query(models.Lead).count() == 0
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select
+
+from app.database import models
+from app.schemas import schemas
+from app.services.crud import lead_service, property_service
+from app.services.lead_ingestion import LeadIngestionQueue
+from app.services.listing_stats import rebuild_listing_stats, top_listings, top_listings_between
+
+
+@pytest.fixture()
+def db(db):
+    for i in range(1, 4):
+        db.add(models.Property(title=f"Flat {i}", slug=f"flat-{i}", price="₹20,000/month", location=f"Sector {i}"))
+    db.commit()
+    return db
+
+
+def utc_today():
+    return datetime.now(timezone.utc).date()
+
+
+def counters(db):
+    stats = {r.property_id: (r.total_leads, r.conversions) for r in db.query(models.PropertyLeadStats)}
+    daily = sorted(db.execute(select(
+        models.PropertyLeadDaily.property_id, models.PropertyLeadDaily.day,
+        models.PropertyLeadDaily.leads, models.PropertyLeadDaily.conversions,
+    )).all())
+    return stats, daily
+
+
+def test_counters_follow_every_lead_write(db):
+    def lead(property_id):
+        return lead_service.create_lead(db, schemas.LeadCreate(name="Lead", phone="9876543210", property_id=property_id)).id
+
+    first, second, third = lead(1), lead(1), lead(2)
+    lead(None)  # not counted
+    LeadIngestionQueue._insert(db, [
+        {"reference": f"queued-{i}", "name": "Lead", "phone": "9876543210", "property_id": 3,
+         "status": "new", "created_at": datetime.now(timezone.utc) - timedelta(days=10)}
+        for i in range(2)
+    ])
+    db.commit()
+
+    lead_service.update_lead_status(db, first, "converted")
+    lead_service.update_lead(db, second, schemas.LeadUpdate(property_id=2, status="converted"))
+    lead_service.update_lead(db, second, schemas.LeadUpdate(status="lost"))
+    lead_service.bulk_update_leads(db, {"status": "converted"}, filters={"property_id": 3})
+    lead_service.update_lead_status(db, third, "contacted")
+
+    stats, daily = counters(db)
+    assert stats == {1: (1, 1), 2: (2, 0), 3: (2, 2)}
+    assert (3, utc_today() - timedelta(days=10), 2, 2) in daily
+    rebuild_listing_stats(db)
+    assert counters(db) == (stats, daily)  # incremental counters match a full recount
+
+    property_service.hard_delete_property(db, 3)
+    assert 3 not in counters(db)[0]
+
+
+def test_top_listings_by_window_and_all_time(db):
+    today = utc_today()
+    rows = []
+    for property_id, days_ago, count, converted in ((1, 40, 5, 1), (2, 2, 3, 0), (2, 20, 1, 1), (3, 0, 1, 0)):
+        rows += [
+            {"reference": f"{property_id}-{days_ago}-{i}", "name": "Lead", "phone": "9876543210",
+             "property_id": property_id, "status": "converted" if i < converted else "new",
+             "created_at": datetime.now(timezone.utc) - timedelta(days=days_ago)}
+            for i in range(count)
+        ]
+    LeadIngestionQueue._insert(db, rows)
+    db.commit()
+
+    assert [(t["title"], t["total_leads"], t["conversions"]) for t in top_listings(db)] == [
+        ("Flat 1", 5, 1), ("Flat 2", 4, 1), ("Flat 3", 1, 0),
+    ]
+    assert [t["title"] for t in top_listings(db, limit=1)] == ["Flat 1"]
+
+    month = top_listings_between(db, today - timedelta(days=30), today)
+    assert [(t["title"], t["leads"], t["conversions"]) for t in month] == [("Flat 2", 4, 1), ("Flat 3", 1, 0)]
+    assert (month[0]["total_leads"], month[0]["leads_last_7_days"], month[0]["leads_last_30_days"]) == (4, 3, 4)
+    assert [t["title"] for t in top_listings_between(db, today - timedelta(days=45), today - timedelta(days=35))] == ["Flat 1"]
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import httpx
+from fastapi import FastAPI
+
+from app.api.routers import analytics
+from app.database import models
+from app.schemas import schemas
+from app.services.crud import lead_service, property_service
+from app.services.live_events import LiveEventBroadcaster, emit, live_events
+
+
+def drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return [(item["type"], item["data"]) for item in items]
+
+
+def test_write_paths_publish_once_committed(db):
+    async def scenario():
+        live_events.start()
+        queue = live_events.subscribe()
+        try:
+            prop = property_service.create_property(db, schemas.PropertyCreate(title="Flat", price="₹20,000/month"))
+            lead = lead_service.create_lead(db, schemas.LeadCreate(name="Lead", phone="9876543210", property_id=prop.id))
+            lead_service.update_lead_status(db, lead.id, "contacted")
+            property_service.set_availability(db, prop.id, False)
+            lead_service.bulk_update_leads(db, {"status": "converted"}, ids=[lead.id])
+            committed = drain(queue)
+
+            db.add(models.Lead(name="Lead", phone="bad"))
+            emit(db, "lead.created", lead_id=99)
+            db.rollback()  # the failed write's events go with it
+            db.commit()
+            return committed, drain(queue)
+        finally:
+            live_events.unsubscribe(queue)
+            await live_events.stop()
+
+    committed, after_rollback = asyncio.run(scenario())
+    assert [event_type for event_type, _ in committed] == [
+        "property.created", "lead.created", "lead.status_changed",
+        "property.availability_changed", "leads.status_changed",
+    ]
+    assert committed[2][1] == {"lead_id": 1, "property_id": 1, "from_status": "new", "to_status": "contacted"}
+    assert committed[3][1]["is_available"] is False
+    assert committed[4][1] == {"count": 1, "from_status": {"contacted": 1}, "to_status": "converted"}
+    assert after_rollback == []
+
+
+def test_stream_formats_events_and_resyncs_slow_clients():
+    broadcaster = LiveEventBroadcaster(queue_size=2, max_subscribers=1)
+
+    async def scenario():
+        broadcaster.start()
+        stream = broadcaster.stream(heartbeat=0.05)
+        chunks = [await stream.__anext__(), await stream.__anext__()]  # retry + ready
+        assert broadcaster.full
+
+        # Published from a worker thread, like the buffered lead writer
+        await asyncio.to_thread(broadcaster.publish, [{"type": "lead.created", "data": {"lead_id": 1}}])
+        await asyncio.sleep(0)
+        chunks.append(await stream.__anext__())
+        broadcaster.publish([{"type": "lead.created", "data": {"lead_id": n}} for n in range(5)])  # overflows
+        chunks += [await stream.__anext__(), await stream.__anext__()]  # resync, then keepalive
+        await broadcaster.stop()
+        chunks += [chunk async for chunk in stream]
+        return chunks
+
+    chunks = asyncio.run(scenario())
+    assert chunks[0].startswith("retry: ") and chunks[1].startswith("event: ready\n")
+    event_type, data = chunks[2].split("\n")[:2]
+    assert event_type == "event: lead.created" and json.loads(data[len("data: "):])["data"] == {"lead_id": 1}
+    assert chunks[3].startswith("event: resync\n") and chunks[4] == ": keepalive\n\n"
+    assert len(chunks) == 5 and broadcaster.subscribers == 0 and broadcaster.stats["resyncs"] == 1
+
+
+def test_stream_requires_an_access_token():
+    app = FastAPI()
+    app.include_router(analytics.router, prefix="/analytics")
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            return (await c.get("/analytics/stream")).status_code, (await c.get("/analytics/stream?token=bogus")).status_code
+
+    assert asyncio.run(scenario()) == (401, 401)
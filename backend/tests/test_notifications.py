@@ -0,0 +1,154 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.database import models
+from app.schemas import schemas
+from app.services.crud import LeadService
+from app.services.notifications import NotificationDispatcher, TokenBucket
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local provider stand-in: records requests, answers with queued statuses (then 200)"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append((self.path, dict(self.headers), json.loads(body)))
+        code = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def provider():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.received, server.statuses = [], []
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    # File database: the dispatcher's worker threads and the test's polling each
+    # need their own connection (a shared one lets a poll roll back a claim)
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}", connect_args={"timeout": 30})
+    models.Base.metadata.create_all(engine)
+    try:
+        yield sessionmaker(bind=engine)
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture()
+def channels(monkeypatch, provider):
+    def enable(value: str):
+        monkeypatch.setattr(settings, "NOTIFY_CHANNELS", value)
+    monkeypatch.setattr(settings, "NOTIFY_WEBHOOK_URL", provider.url + "/hook")
+    monkeypatch.setattr(settings, "WHATSAPP_API_URL", provider.url + "/wa")
+    monkeypatch.setattr(settings, "WHATSAPP_PHONE_NUMBER_ID", "555")
+    monkeypatch.setattr(settings, "NOTIFY_DEFAULT_PHONE", "9876543210")
+    return enable
+
+
+def create_lead(session_factory, name="Asha"):
+    db = session_factory()
+    lead = LeadService().create_lead(db, schemas.LeadCreate(name=name, phone="9123456789", message="2BHK?"))
+    db.close()
+    return lead
+
+
+def outbox(session_factory):
+    db = session_factory()
+    rows = db.query(models.NotificationOutbox).order_by(models.NotificationOutbox.id).all()
+    db.close()
+    return rows
+
+
+def dispatch_until_settled(session_factory, timeout=5.0, **options):
+    dispatcher = NotificationDispatcher(
+        poll_interval=0.01, backoff_base=0.01, session_factory=session_factory, **options
+    )
+
+    async def run():
+        dispatcher.start()
+        deadline = time.monotonic() + timeout
+        while any(row.status in ("pending", "sending") for row in outbox(session_factory)):
+            assert time.monotonic() < deadline, "outbox did not settle"
+            await asyncio.sleep(0.02)
+        await dispatcher.stop()
+
+    asyncio.run(run())
+    return dispatcher
+
+
+def test_lead_insert_only_queues_and_dispatcher_retries(session_factory, provider, channels):
+    channels("webhook,whatsapp")
+    provider.statuses = [503]  # first send fails, the retry succeeds
+
+    lead = create_lead(session_factory)
+
+    queued = outbox(session_factory)
+    assert [row.channel for row in queued] == ["webhook", "whatsapp"]
+    assert {row.status for row in queued} == {"pending"}
+    assert {row.lead_reference for row in queued} == {lead.reference}
+    assert provider.received == []  # nothing sent on the request path
+
+    dispatcher = dispatch_until_settled(session_factory)
+
+    rows = outbox(session_factory)
+    assert {row.status for row in rows} == {"sent"}
+    assert sorted(row.attempts for row in rows) == [1, 2]
+    assert len(provider.received) == 3
+    assert dispatcher.stats == {"sent": 2, "retried": 1, "failed": 0, "batches": 2}
+
+    hook = next(r for r in provider.received if r[0] == "/hook")
+    assert hook[2]["lead"]["name"] == "Asha"
+    assert hook[1]["Idempotency-Key"] == f"outbox-{rows[0].id}"
+    whatsapp = next(r for r in provider.received if r[0] == "/wa/555/messages")
+    assert whatsapp[2]["to"] == "919876543210"
+
+
+@pytest.mark.parametrize("statuses, attempts", [([503, 503, 503], 3), ([400], 1)])
+def test_exhausted_or_rejected_sends_end_failed(session_factory, provider, channels, statuses, attempts):
+    channels("webhook")
+    provider.statuses = list(statuses)
+    create_lead(session_factory)
+
+    dispatch_until_settled(session_factory, max_attempts=3)
+
+    (row,) = outbox(session_factory)
+    assert row.status == "failed"
+    assert row.attempts == attempts
+    assert f"HTTP {statuses[0]}" in row.last_error
+
+
+def test_no_channels_means_no_outbox_rows(session_factory, channels):
+    channels("")
+    create_lead(session_factory)
+    assert outbox(session_factory) == []
+
+
+def test_token_bucket_limits_rate():
+    async def acquire_all():
+        bucket = TokenBucket(rate=50, burst=1)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(acquire_all()) >= 0.09  # 5 waits at 20ms each
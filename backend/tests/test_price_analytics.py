@@ -0,0 +1,96 @@
+import random
+import pytest
+
+from app.database import models
+from app.schemas import schemas
+from app.services.crud import PropertyService, parse_display_price
+from app.services.price_analytics import DEFAULT_PRICE_EDGES, price_histogram
+
+
+def percentile_cont(values, p):
+    """Reference: linear interpolation between closest ranks"""
+    ordered = sorted(values)
+    position = p * (len(ordered) - 1)
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+@pytest.fixture()
+def db(db):
+    rng = random.Random(11)
+    rents = []
+    for i in range(500):
+        rent = float(rng.randrange(8000, 400000, 500))
+        bedrooms = rng.choice([1, 2, 3])
+        rents.append((bedrooms, rent))
+        db.add(models.Property(
+            title=f"Flat {i}", slug=f"flat-{i}", price=f"₹{rent:,.0f}/month", price_numeric=rent,
+            city=rng.choice(["Gurgaon", "Noida"]), bedrooms=bedrooms,
+        ))
+    db.add(models.Property(title="Ask", slug="ask", price="Contact us", price_numeric=None))
+    db.commit()
+    db.rents = rents
+    return db
+
+
+def test_default_buckets_and_percentiles_match_reference(db):
+    result = price_histogram(db)
+    rents = [rent for _, rent in db.rents]
+
+    assert [b["range"] for b in result["distribution"]] == [
+        "Under ₹50K", "₹50K - ₹1L", "₹1L - ₹2L", "₹2L - ₹3L", "Above ₹3L",
+    ]
+    edges = [0, 50000, 100000, 200000, 300000, float("inf")]
+    expected = [sum(low <= r < high for r in rents) for low, high in zip(edges, edges[1:])]
+    assert [b["count"] for b in result["distribution"]] == expected
+    assert (result["total"], result["unpriced"]) == (500, 1)
+    for name, p in (("p10", 0.1), ("p50", 0.5), ("p90", 0.9)):
+        assert result["percentiles"][name] == pytest.approx(percentile_cont(rents, p))
+
+
+def test_grouped_histogram_with_custom_edges(db):
+    result = price_histogram(db, edges=[100000, 250000], group_by="bedrooms")
+
+    groups = {g["group"]: g for g in result["groups"]}
+    assert set(groups) == {1, 2, 3, None}  # the unpriced listing has no bedrooms
+    for bedrooms in (1, 2, 3):
+        rents = [rent for b, rent in db.rents if b == bedrooms]
+        group = groups[bedrooms]
+        assert group["total"] == len(rents)
+        assert [b["count"] for b in group["distribution"]] == [
+            sum(r < 100000 for r in rents),
+            sum(100000 <= r < 250000 for r in rents),
+            sum(r >= 250000 for r in rents),
+        ]
+        assert group["percentiles"]["p50"] == pytest.approx(percentile_cont(rents, 0.5))
+    assert groups[None]["unpriced"] == 1 and groups[None]["percentiles"]["p50"] is None
+
+
+def test_quantile_buckets_are_roughly_equal(db):
+    result = price_histogram(db, quantile_buckets=4)
+    assert len(result["edges"]) == 3
+    assert all(abs(b["count"] - 125) <= 5 for b in result["distribution"])
+
+
+def test_quantile_buckets_without_matching_rows(db):
+    result = price_histogram(db, quantile_buckets=4, city="Nowhere")
+    assert result["edges"] == list(DEFAULT_PRICE_EDGES)
+    assert result["total"] == 0 and {bucket["count"] for bucket in result["distribution"]} == {0}
+    assert set(result["percentiles"].values()) == {None}
+
+
+def test_parse_display_price():
+    assert parse_display_price("₹15,000/month") == 15000
+    assert parse_display_price("₹1.5L/month") == 150000
+    assert parse_display_price("45K") == 45000
+    assert parse_display_price("Price on request") is None
+
+
+def test_price_numeric_follows_price_updates(db):
+    service = PropertyService()
+    ask = db.query(models.Property).filter_by(slug="ask").one()
+
+    assert service.update_property(db, ask.id, schemas.PropertyUpdate(price="₹1.5L/month")).price_numeric == 150000.0
+    assert price_histogram(db)["unpriced"] == 0
+    assert service.update_property(db, ask.id, schemas.PropertyUpdate(price="On request")).price_numeric is None
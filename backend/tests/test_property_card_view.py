@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import inspect
+
+from app.database import models
+from app.schemas import schemas
+from app.services.crud import PropertyService
+
+
+@pytest.fixture()
+def session(db):
+    for i in range(3):
+        db.add(models.Property(
+            title=f"Skyline {i}",
+            slug=f"skyline-{i}",
+            price="₹40,000/month",
+            city="Gurgaon",
+            description="Long AI description " * 50,
+            images='["a.jpg", "b.jpg"]',
+            highlights="Corner unit",
+        ))
+    db.commit()
+    db.expunge_all()
+    return db
+
+
+def test_card_view_defers_heavy_columns(session):
+    items, total = PropertyService().get_properties(session, view="card")
+
+    assert total == 3
+    unloaded = inspect(items[0]).unloaded
+    assert {"description", "images", "highlights"} <= unloaded
+    assert "title" not in unloaded
+
+    card = schemas.PropertyCard.model_validate(items[0])
+    assert card.slug.startswith("skyline-")
+
+
+def test_full_view_loads_all_columns(session):
+    items, _ = PropertyService().get_properties(session, view="full")
+
+    assert not {"description", "images", "highlights"} & inspect(items[0]).unloaded
+    assert schemas.Property.model_validate(items[0]).description
+
+
+def test_search_card_view(session):
+    items = PropertyService().search_properties(session, query_text="skyline", view="card")
+
+    assert len(items) == 3
+    assert "description" in inspect(items[0]).unloaded
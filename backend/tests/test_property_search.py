@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import models
+from app.database.search_indexes import ensure_search_indexes, sqlite_supports_trigram
+from app.services.crud import PropertyService
+from app.services.search_service import FTS5, LIKE, search_service
+
+pytestmark = pytest.mark.skipif(not sqlite_supports_trigram(), reason="SQLite without FTS5 trigram")
+
+LISTINGS = [
+    ("Skyline Residency", "Gurgaon", "Sector 45", "Pool, Gym"),
+    ("Lakeview Homes", "Noida", "Sector 62", "Swimming Pool"),
+    ("Green Acres Villa", "Gurgaon", "DLF Phase 2", "Garden"),
+    ("Metro 100% Furnished", "New Delhi", "Saket", "Lift"),
+]
+
+
+def make_session(fts: bool):
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    models.Base.metadata.create_all(engine)
+    if fts:
+        ensure_search_indexes(engine)
+    sess = sessionmaker(bind=engine)()
+    for i, (title, city, location, amenities) in enumerate(LISTINGS):
+        sess.add(models.Property(
+            title=title, slug=f"p-{i}", price="₹30,000/month",
+            city=city, location=location, amenities=amenities,
+        ))
+    sess.commit()
+    return sess
+
+
+@pytest.fixture()
+def sessions():
+    search_service.reset()
+    fts, plain = make_session(True), make_session(False)
+    try:
+        yield fts, plain
+    finally:
+        for sess in (fts, plain):
+            sess.close()
+            sess.get_bind().dispose()
+        search_service.reset()
+
+
+def titles(items):
+    return sorted(item.title for item in items)
+
+
+def test_modes_detected(sessions):
+    fts, plain = sessions
+    assert search_service.mode(fts) == FTS5
+    assert search_service.mode(plain) == LIKE
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"city": "gurg"},
+    {"city": "New Delhi"},
+    {"city": "No"},  # shorter than a trigram: ILIKE fallback
+    {"location": "sector"},
+    {"location": "Phase 2", "city": "Gurgaon"},
+])
+def test_list_filters_match_ilike(sessions, kwargs):
+    fts, plain = sessions
+    service = PropertyService()
+
+    fts_items, fts_total = service.get_properties(fts, **kwargs)
+    plain_items, plain_total = service.get_properties(plain, **kwargs)
+
+    assert titles(fts_items) == titles(plain_items)
+    assert fts_total == plain_total
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("pool", ["Lakeview Homes", "Skyline Residency"]),
+    ("100%", ["Metro 100% Furnished"]),
+    ("skyline gym", ["Skyline Residency"]),
+    ("zz", []),
+])
+def test_text_search(sessions, text, expected):
+    fts, _ = sessions
+    assert titles(PropertyService().search_properties(fts, query_text=text)) == expected
+
+
+def test_index_follows_updates(sessions):
+    fts, _ = sessions
+    prop = fts.query(models.Property).filter_by(slug="p-0").one()
+    prop.title = "Aurora Towers"
+    fts.commit()
+
+    service = PropertyService()
+    assert titles(service.search_properties(fts, query_text="aurora")) == ["Aurora Towers"]
+    assert service.search_properties(fts, query_text="skyline") == []
@@ -0,0 +1,101 @@
+import threading
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import models
+from app.schemas import schemas
+from app.services.booking_calendar import BookingCalendar, BookingConflictError, PropertyVersionConflict
+from app.services.crud import BookingService, PropertyService
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    # File database so each thread gets its own connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'versions.db'}", connect_args={"timeout": 30})
+    models.Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add_all(models.Property(title=f"Flat {i}", slug=f"flat-{i}", price="₹20,000/month") for i in range(2))
+    db.commit()
+    db.close()
+    try:
+        yield factory
+    finally:
+        engine.dispose()
+
+
+def stay(property_id, month, months=1):
+    return schemas.BookingCreate(
+        property_id=property_id,
+        tenant_name="Tenant",
+        tenant_phone="9876543210",
+        check_in=datetime(2026, month, 1),
+        check_out=datetime(2026, month + months, 1),
+        monthly_rent=20000,
+    )
+
+
+def worker():
+    """A BookingService with its own calendar, like a separate app process"""
+    return BookingService(calendar=BookingCalendar(ttl=3600))
+
+
+def test_stale_calendar_in_another_worker_cannot_double_book(session_factory):
+    a, b = worker(), worker()
+    db_a, db_b = session_factory(), session_factory()
+
+    a.calendar.rebuild(db_a)  # A caches "no bookings"
+    b.create_booking(db_b, stay(1, 3, months=3))
+
+    with pytest.raises(BookingConflictError):
+        a.create_booking(db_a, stay(1, 4))
+    assert a.create_booking(db_a, stay(1, 6)).id  # the version reload, not a blanket refusal
+
+    version = db_a.query(models.Property.version).filter(models.Property.id == 1).scalar()
+    assert version == 3  # one bump per booking
+    db_a.close()
+    db_b.close()
+
+
+def test_parallel_bookings_for_same_dates_have_one_winner(session_factory):
+    outcomes = []
+
+    def attempt():
+        db = session_factory()
+        try:
+            worker().create_booking(db, stay(1, 5))
+            outcomes.append("booked")
+        except (BookingConflictError, PropertyVersionConflict) as e:
+            outcomes.append(type(e).__name__)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=attempt) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes.count("booked") == 1
+    db = session_factory()
+    assert db.query(models.Booking).count() == 1
+    db.close()
+
+
+def test_availability_flip_rejects_stale_version(session_factory):
+    db = session_factory()
+    service = PropertyService()
+
+    assert service.set_availability(db, 2, False, expected_version=1) == 2
+    with pytest.raises(PropertyVersionConflict):
+        service.set_availability(db, 2, True, expected_version=1)
+    assert service.set_availability(db, 99, True, expected_version=1) is None
+
+    # ORM updates are versioned too
+    with pytest.raises(PropertyVersionConflict):
+        service.update_property(db, 2, schemas.PropertyUpdate(title="Renamed", version=1))
+    updated = service.update_property(db, 2, schemas.PropertyUpdate(title="Renamed", version=2))
+    assert (updated.title, updated.version) == ("Renamed", 3)
+    db.close()
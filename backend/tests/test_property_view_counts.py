@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.routers import analytics
+from app.core.security import get_current_user
+from app.database import models
+from app.database.connection import get_db
+from app.services import property_views
+from app.services.crud import property_service
+from app.services.lead_ingestion import LeadIngestionQueue
+from app.services.property_views import ViewCounter, trending_listings, view_conversion
+
+
+@pytest.fixture()
+def db(db):
+    for i in range(1, 4):
+        db.add(models.Property(title=f"Flat {i}", slug=f"flat-{i}", price="₹20,000/month", location=f"Sector {i}"))
+    db.commit()
+    return db
+
+
+@pytest.fixture()
+def counter(monkeypatch):
+    monkeypatch.setattr(property_views.cache, "redis_client", None)
+    return ViewCounter(shards=4)
+
+
+def test_concurrent_views_are_flushed_in_one_batch(db, counter):
+    def view(n):
+        for _ in range(n):
+            counter.record(1)
+
+    threads = [threading.Thread(target=view, args=(500,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.record(2, views=3)
+    counter.record(3)
+    property_service.hard_delete_property(db, 3)  # buffered views of a deleted property are dropped
+
+    assert counter.pending == 4004
+    assert counter.flush(db) == 2 and counter.pending == 0
+    counter.record(1)
+    counter.flush(db)
+    counter.flush(db)  # nothing buffered: no-op
+
+    today = property_views.utc_today()
+    stats = {r.property_id: r.views for r in db.query(models.PropertyViewStats)}
+    assert stats == {1: 4001, 2: 3}
+    assert property_views.property_views(db, 1, today, today) == {
+        "total_views": 4001, "views": 4001, "daily": [{"day": today.isoformat(), "views": 4001}],
+    }
+
+    counter.record(2)
+    models.Base.metadata.drop_all(db.get_bind())  # a failed write keeps the counts for the next flush
+    with pytest.raises(Exception):
+        counter.flush(db)
+    assert counter.pending == 1
+
+
+def test_threads_spread_across_shards(counter):
+    barrier = threading.Barrier(4)  # all alive at once, so no thread ident is reused
+
+    def view():
+        barrier.wait()
+        counter.record(1)
+        barrier.wait()
+
+    threads = [threading.Thread(target=view) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [sum(counts.values()) for _, counts in counter._shards] == [1, 1, 1, 1]
+
+
+def test_view_conversion_and_trending(db, counter):
+    today = property_views.utc_today()
+    for property_id, days_ago, views in ((1, 0, 100), (1, 8, 150), (2, 1, 40), (2, 9, 10), (3, 3, 5)):
+        counter.record(property_id, views=views, day=today - timedelta(days=days_ago))
+    counter.flush(db)
+    LeadIngestionQueue._insert(db, [
+        {"reference": f"lead-{i}", "name": "Lead", "phone": "9876543210", "property_id": 2,
+         "status": "converted" if i == 0 else "new", "created_at": datetime.now(timezone.utc)}
+        for i in range(4)
+    ])
+    db.commit()
+
+    week = view_conversion(db, today - timedelta(days=6), today)
+    assert [(r["title"], r["views"], r["leads"], r["conversions"], r["view_to_lead_rate"]) for r in week] == [
+        ("Flat 1", 100, 0, 0, 0.0), ("Flat 2", 40, 4, 1, 10.0), ("Flat 3", 5, 0, 0, 0.0),
+    ]
+    assert [r["title"] for r in view_conversion(db, today - timedelta(days=6), today, min_views=10, limit=1)] == ["Flat 1"]
+
+    trending = trending_listings(db, days=7, today=today)
+    assert [(r["title"], r["views"], r["previous_views"], r["growth"]) for r in trending] == [
+        ("Flat 2", 40, 10, 300.0), ("Flat 3", 5, 0, None),  # Flat 1's views fell
+    ]
+
+
+def test_view_endpoints_validate_the_window(db):
+    app = FastAPI()
+    app.include_router(analytics.router, prefix="/analytics")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "admin"}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            return [
+                (await c.get("/analytics/properties/views")).status_code,
+                (await c.get("/analytics/properties/views?property_id=1&start_date=2026-10-02&end_date=2026-10-01")).status_code,
+                (await c.get("/analytics/properties/view-conversion?start_date=2020-01-01")).status_code,
+                (await c.get("/analytics/properties/trending?days=0")).status_code,
+            ], (await c.get("/analytics/properties/views?property_id=1&end_date=2026-10-19")).json()
+
+    codes, body = asyncio.run(scenario())
+    assert codes == [422, 400, 400, 422]
+    assert body == {"property_id": 1, "start_date": "2026-09-20", "end_date": "2026-10-19",
+                    "total_views": 0, "views": 0, "daily": []}
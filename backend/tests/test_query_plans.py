@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import create_engine
+
+import query_plan_harness as harness
+
+
+@pytest.fixture(scope="module")
+def report():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    try:
+        yield harness.run_harness(engine, properties=3000, leads=6000, bookings=1500)
+    finally:
+        engine.dispose()
+
+
+def test_no_unexpected_full_scans(report):
+    failures = [f"[{result.label}] {message}: {result.sql}" for result, message in report.failures]
+    assert not failures, "\n".join(failures)
+
+
+def test_every_workload_label_was_explained(report):
+    explained = {result.label for result in report.results}
+    expected = {label for label, _ in harness.build_workload()}
+    assert expected <= explained
+
+
+def test_allowed_scans_are_still_needed(report):
+    # Drop an ALLOWED_SCANS entry as soon as its query stops scanning
+    still_scanning = {result.label for result, _, _ in report.allowed}
+    assert set(harness.ALLOWED_SCANS) <= still_scanning
+
+
+def test_redundant_index_detection(report):
+    redundant = {ix.name: reason for ix, reason in report.redundant_indexes}
+    assert redundant["idx_properties_slug"] == "duplicates ix_properties_slug"
@@ -0,0 +1,189 @@
+import asyncio
+from datetime import date, timedelta
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from app.api.routers import analytics, leads
+from app.core.security import get_current_user
+from app.database import models
+from app.database.connection import get_db
+from app.schemas import schemas
+from app.services import unique_counts
+from app.services.lead_dedupe import LeadDeduplicator
+from app.services.lead_ingestion import LeadQueueFull
+from app.services.lead_velocity import LeadVelocity
+from app.services.unique_counts import INQUIRERS, VISITORS, HyperLogLog, UniqueCounter
+
+
+@pytest.fixture()
+def db(db):
+    db.add_all([
+        models.Property(title="Flat 1", slug="flat-1", price="₹20,000/month", city="Gurgaon"),
+        models.Property(title="Flat 2", slug="flat-2", price="₹25,000/month", city="Gurgaon"),
+    ])
+    db.commit()
+    return db
+
+
+@pytest.fixture()
+def counter(monkeypatch):
+    monkeypatch.setattr(unique_counts.cache, "redis_client", None)
+    return UniqueCounter()
+
+
+def sketch_of(values):
+    sketch = HyperLogLog()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_hyperloglog_estimates_merges_and_round_trips(monkeypatch, numpy):
+    if not numpy:
+        monkeypatch.setattr(unique_counts, "np", None)
+    assert sketch_of([]).count() == 0
+    small = sketch_of(f"v{i % 40}" for i in range(1000))
+    assert small.is_sparse and small.count() == 40
+
+    first = sketch_of(f"v{i}" for i in range(30000))
+    second = sketch_of(f"v{i}" for i in range(20000, 50000))
+    assert not first.is_sparse
+    assert abs(first.count() - 30000) / 30000 < 0.03
+
+    union = HyperLogLog.from_bytes(first.to_bytes()).merge(second)
+    assert abs(union.count() - 50000) / 50000 < 0.03
+    assert union.count() == sketch_of(f"v{i}" for i in range(50000)).count()  # merge is exact union
+    assert HyperLogLog.from_bytes(small.to_bytes()).count() == 40
+    assert len(small.to_bytes()) < len(union.to_bytes())
+
+
+def test_flushed_sketches_answer_windows_per_property_and_city(db, counter):
+    today = unique_counts.utc_today()
+    for day_offset in range(3):
+        day = today - timedelta(days=day_offset)
+        for visitor in range(100):
+            counter.record(VISITORS, f"visitor-{visitor}", 1, "Gurgaon", day)  # same visitors every day
+        counter.record(VISITORS, f"only-{day_offset}", 2, "gurgaon ", day)
+    counter.record_inquiry(1, "+91 98765 43210")
+    counter.record_inquiry(1, "9876543210")
+    counter.record_inquiry(2, "9123456780")
+
+    pending_only = counter.window(db, "city", "Gurgaon", today - timedelta(days=2), today)
+    assert counter.flush(db) > 0 and counter._pending == {}
+    counter.record(VISITORS, "late", 1, "Gurgaon", today)  # buffered, not yet flushed
+
+    assert counter.count(db, VISITORS, "property", 1, today - timedelta(days=2), today) == 101
+    assert counter.count(db, VISITORS, "property", 2, today - timedelta(days=1), today) == 2
+    assert counter.count(db, VISITORS, "property", 1, today - timedelta(days=30), today - timedelta(days=10)) == 0
+    assert counter.count(db, INQUIRERS, "city", "GURGAON", date(2000, 1, 1), date(2100, 1, 1)) == 2  # +91 variants once
+    # No I/O while recording: the inquiries' city is looked up by the flush
+    assert pending_only["unique_visitors"] == 103 and pending_only["unique_inquirers"] == 0
+
+    counter.flush(db)
+    counter.flush(db)  # nothing buffered: no-op
+    window = counter.window(db, "city", "gurgaon", today - timedelta(days=2), today)
+    assert window["unique_visitors"] == 104
+    assert counter.window(db, "property", 1, today, today)["unique_inquirers"] == 1
+    assert counter.prune(db, today=today + timedelta(days=counter.retention_days + 1)) > 0
+
+
+def test_unique_counts_endpoint_validates_the_window(db):
+    app = FastAPI()
+    app.include_router(analytics.router, prefix="/analytics")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "admin"}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            bad = [
+                (await c.get("/analytics/unique-counts")).status_code,
+                (await c.get("/analytics/unique-counts?property_id=1&city=Gurgaon")).status_code,
+                (await c.get("/analytics/unique-counts?city=Gurgaon&start_date=2026-10-02&end_date=2026-10-01")).status_code,
+                (await c.get("/analytics/unique-counts?city=Gurgaon&start_date=2024-01-01&end_date=2026-10-01")).status_code,
+            ]
+            return bad, (await c.get("/analytics/unique-counts?property_id=1&end_date=2026-10-19")).json()
+
+    bad, body = asyncio.run(scenario())
+    assert bad == [400, 400, 400, 400]
+    assert (body["scope"], body["id"], body["start_date"], body["end_date"]) == ("property", 1, "2026-09-20", "2026-10-19")
+    assert body["approximate"] is True
+
+
+def test_only_accepted_inquiries_are_counted(db, counter, monkeypatch):
+    monkeypatch.setattr(leads, "unique_counter", counter)
+    monkeypatch.setattr(leads, "lead_velocity", LeadVelocity(enabled=False))
+    monkeypatch.setattr(leads, "lead_deduplicator", LeadDeduplicator(enabled=False))
+    monkeypatch.setattr(leads, "buffered_ingestion_enabled", lambda: True)
+    lead = schemas.LeadCreate(name="Asha", phone="9876543210", property_id=1)
+
+    async def full(lead_data, reference=None):
+        raise LeadQueueFull()
+
+    monkeypatch.setattr(leads.lead_ingestion, "submit", full)
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(leads.store_lead(lead, db))
+    assert rejected.value.status_code == 503 and counter.stats["recorded"] == 0
+
+    async def queued(lead_data, reference=None):
+        return reference
+
+    monkeypatch.setattr(leads.lead_ingestion, "submit", queued)
+    asyncio.run(leads.store_lead(lead, db))
+    assert counter.stats["recorded"] == 1
+    counter.flush(db)
+    today = unique_counts.utc_today()
+    assert counter.count(db, INQUIRERS, "city", "gurgaon", today, today) == 1
+
+
+class FakeRedis:
+    """Just enough of a Redis client for PFADD/PFCOUNT pipelines"""
+
+    def __init__(self):
+        self.sets, self.calls, self.down = {}, 0, False
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def pfadd(self, name, *values):
+        self.sets.setdefault(name, set()).update(values)
+
+    def expire(self, name, seconds):
+        pass
+
+    def execute(self):
+        self.calls += 1
+
+    def pfcount(self, *names):
+        if self.down:
+            raise ConnectionError("redis down")
+        return len(set().union(*(self.sets.get(name, set()) for name in names)))
+
+
+def test_redis_mode_buffers_until_flush_and_reports_failures(db, monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(unique_counts.cache, "redis_client", redis)
+    counter = UniqueCounter()
+    today = unique_counts.utc_today()
+    for i in range(50):
+        counter.record(VISITORS, f"visitor-{i % 10}", 1, "Gurgaon", day=today)
+    assert redis.calls == 0 and redis.sets == {}  # no I/O on the request path
+
+    assert counter.flush_redis() == 2
+    assert redis.calls == 1
+    assert counter.count(db, VISITORS, "city", "gurgaon", today, today) == 10
+
+    redis.down = True
+    with pytest.raises(unique_counts.UniqueCountsUnavailable):
+        counter.count(db, VISITORS, "property", 1, today, today)
+    app = FastAPI()
+    app.include_router(analytics.router, prefix="/analytics")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "admin"}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            return (await c.get("/analytics/unique-counts?property_id=1")).status_code
+
+    assert asyncio.run(scenario()) == 503
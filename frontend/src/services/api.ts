@@ -78,6 +78,7 @@ export interface Property {
   description?: string
   is_available: boolean
   available_from?: string
+  version?: number
   created_at: string
   updated_at?: string
 }
@@ -154,6 +155,7 @@ export interface PropertySearchRequest {
   bedrooms?: number
   amenities?: string[]
   is_available?: boolean
+  available_between?: string  // 'YYYY-MM-DD,YYYY-MM-DD'
   page?: number
   page_size?: number
 }
@@ -220,6 +222,8 @@ export const propertyService = {
     location?: string
     property_type?: string
     bedrooms?: number
+    available_between?: string  // 'YYYY-MM-DD,YYYY-MM-DD'
+    view?: 'card' | 'full'
   }) => api.get<Property[]>('/properties', { params }),
 
   // Get featured properties